@@ -13,14 +13,39 @@ are needed throughout the whole arni package.
 """
 
 
-class SEUID:
+#: the maximum amount of parsed seuids kept by SEUID.parse
+MAX_PARSED_SEUIDS = 100000
+
+#: identifier -> shared SEUID object of the identifiers parsed so far, all of them valid
+_parsed = {}
+
+#: serialized identifier -> shared SEUID object, kept apart since the serialized forms are no valid seuids
+_aliases = {}
+
+
+def _make_room(cache):
+    """
+    Drops a tenth of the entries of a full SEUID.parse cache, the others stay shared.
+    """
+    if len(cache) >= MAX_PARSED_SEUIDS:
+        # list() copies the keys at once, other threads may add seuids meanwhile
+        for key in list(cache)[:MAX_PARSED_SEUIDS // 10 + 1]:
+            cache.pop(key, None)
+
+
+class SEUID(object):
 
     """
     A class providing several actions for a seuid.
+
+    Use SEUID.parse where the same seuids are seen over and over again, it returns one shared object per
+    identifier instead of validating and splitting the identifier every time.
     """
 
     DELIMITER = "!"
 
+    __slots__ = ("identifier", "host", "topic", "subscriber", "publisher", "node")
+
     def __init__(self, identifier=None):
         """
         Creates a new instance for a given identifier or a Message object
@@ -34,13 +59,56 @@ class SEUID:
                 self.from_message(identifier)
             else:
                 self.identifier = self.__deserialize(identifier)
-            if not self.is_valid():
+            parsed = _parsed.get(self.identifier)
+            if parsed is not None:
+                # validated before, copy the fields instead of splitting again
+                self.identifier = parsed.identifier
+                self.host = parsed.host
+                self.topic = parsed.topic
+                self.subscriber = parsed.subscriber
+                self.publisher = parsed.publisher
+                self.node = parsed.node
+            elif not self.is_valid():
                 raise NameError("Given seuid is not of valid form.")
             else:
                 self.set_fields()
         else:
             self.identifier = identifier
 
+    @classmethod
+    def parse(cls, identifier):
+        """
+        Returns the shared SEUID object of a seuid string or a Message object.
+
+        Identifiers are validated and split only the first time they are seen, up to MAX_PARSED_SEUIDS of them
+        are kept. The returned object is shared with every other caller and must not be modified, e.g. by
+        from_string, from_message or get_field.
+
+        :param identifier: Either a seuid string or a Message object.
+        :raises TypeError: If the given parameter is not an expected message type.
+        :raises NameError: If the seuid from the parameter or the message is invalid.
+        :return: SEUID
+        """
+        if isinstance(identifier, str):
+            key = identifier
+        else:
+            key = _message_identifier(identifier)
+        seuid = _parsed.get(key)
+        if seuid is None:
+            seuid = _aliases.get(key)
+        if seuid is not None:
+            return seuid
+        seuid = cls(key)
+        # interned, so the dictionaries keyed by this seuid share one string and compare it by reference
+        seuid.identifier = intern(seuid.identifier)
+        _make_room(_parsed)
+        # a serialized seuid may have been parsed in its plain form before
+        seuid = _parsed.setdefault(seuid.identifier, seuid)
+        if key != seuid.identifier:
+            _make_room(_aliases)
+            _aliases[key] = seuid
+        return seuid
+
     def set_fields(self):
         self.host = None
         """The host name if SEUID describes a host."""
@@ -82,7 +150,7 @@ class SEUID:
                 return None
             else:
                 starts = "htnnn"
-                return starts[fields.index(field)] + SEUID().DELIMITER + getattr(self, field)
+                return starts[fields.index(field)] + SEUID.DELIMITER + getattr(self, field)
         else:
             raise AttributeError("[SEUID] %s is not a public field" % field)
 
@@ -135,25 +203,12 @@ class SEUID:
         :param sub: if true "--sub" will be appended to the connection seuid
         :raises TypeError: If the parameter is none of the mentioned messagestypes.
         """
-        if isinstance(msg, arni_msgs.msg.HostStatistics):
-            self.identifier = "h" + SEUID_DELIMITER + msg.host
-        elif isinstance(msg, arni_msgs.msg.NodeStatistics):
-            self.identifier = "n" + SEUID_DELIMITER + msg.node
-        elif isinstance(msg, rosgraph_msgs.msg.TopicStatistics):
-            if topic:
-                self.identifier = "t" + SEUID_DELIMITER + msg.topic
-            else:
-                if sub:
-                    self.identifier = "c" + SEUID_DELIMITER + msg.node_sub \
-                              + SEUID_DELIMITER + msg.topic \
-                              + SEUID_DELIMITER + msg.node_pub + "--sub"
-                else:
-                    self.identifier = "c" + SEUID_DELIMITER + msg.node_sub \
-                              + SEUID_DELIMITER + msg.topic \
-                              + SEUID_DELIMITER + msg.node_pub
+        if topic and isinstance(msg, rosgraph_msgs.msg.TopicStatistics):
+            self.identifier = "t" + SEUID_DELIMITER + msg.topic
         else:
-            raise TypeError("Cannot create SEUID from an object other than a HostStatistics,\
-                NodeStatistics or TopicStatistics message.")
+            self.identifier = _message_identifier(msg)
+            if sub and self.identifier[0] == "c":
+                self.identifier += "--sub"
         return self.identifier
 
 
@@ -171,10 +226,9 @@ class SEUID:
             check = self.identifier
         if check is None:
             return False
-        p = re.compile(
-            '^([nhtc])' + SEUID.DELIMITER + '([A-Za-z0-9/]('
-            + SEUID.DELIMITER + '?[a-zA-Z0-9_/.])*)$')
-        m = p.match(check)
+        if check in _parsed:
+            return True
+        m = _SEUID_PATTERN.match(check)
         if m is None:
             return False
         arglen = len(m.group(2).strip().split(SEUID.DELIMITER))
@@ -216,6 +270,34 @@ class SEUID:
 # : the delimiter the seuid uses
 SEUID_DELIMITER = SEUID.DELIMITER
 
+#: matches the form of a seuid, the amount of names is checked separately
+_SEUID_PATTERN = re.compile(
+    '^([nhtc])' + SEUID_DELIMITER + '([A-Za-z0-9/](' + SEUID_DELIMITER + '?[a-zA-Z0-9_/.])*)$')
+
+#: message class -> function building the seuid of a message of this class
+_MESSAGE_IDENTIFIERS = {
+    HostStatistics: lambda msg: "h" + SEUID_DELIMITER + msg.host,
+    NodeStatistics: lambda msg: "n" + SEUID_DELIMITER + msg.node,
+    TopicStatistics: lambda msg: SEUID_DELIMITER.join(("c", msg.node_sub, msg.topic, msg.node_pub)),
+}
+
+
+def _message_identifier(msg):
+    """
+    Returns the seuid of a HostStatistics, NodeStatistics or TopicStatistics message without validating it.
+
+    :raises TypeError: If the parameter is none of the mentioned message types.
+    """
+    try:
+        return _MESSAGE_IDENTIFIERS[msg.__class__](msg)
+    except KeyError:
+        pass
+    for message_class, identifier in _MESSAGE_IDENTIFIERS.iteritems():
+        if isinstance(msg, message_class):
+            return identifier(msg)
+    raise TypeError("Cannot create SEUID from an object other than a HostStatistics,\
+                NodeStatistics or TopicStatistics message.")
+
 
 def is_seuid(seuid):
     """
@@ -224,7 +306,7 @@ def is_seuid(seuid):
     :param seuid: A string presenting a seuid to validate.
     :return: True, if the given parameter is a valid seuid, false if not.
     """
-    return SEUID().is_valid(seuid)
+    return seuid in _parsed or SEUID().is_valid(seuid)
 
 
 def underscore_ip(ip):
@@ -254,31 +336,34 @@ def older_than(time1, duration, time2=None):
     return time2 > time1 and time2 - time1 > duration
 
 
-def generate_seuids_from_master_api_data(master_api_data):
+def connection_seuids(topic, publishers, subscribers):
     """
-    Will only return the seuids of subscribers and publisher, not the of services
+    Returns the seuids of the connections of a topic, one for every pair of publisher and subscriber.
 
-    :param master_api_data:
-    :return:
+    :param topic: The name of the topic.
+    :type topic: str
+    :param publishers: The names of the publishing nodes.
+    :param subscribers: The names of the subscribing nodes.
+    :return: list of str
     """
-    pubs, subs, srvs = master_api_data.pubs, master_api_data.subs, master_api_data.srvs
+    return [SEUID_DELIMITER.join(("c", sub, topic, pub)) for pub in publishers for sub in subscribers]
 
-    conn = TopicStatistics()
-    seuid_helper = SEUID()
 
+def generate_seuids_from_master_api_data(master_api_data):
+    """
+    Will only return the seuids of subscribers and publisher, not the of services
+
+    The subscribers are looked up by topic, so the costs grow with the amount of entries and connections instead of
+    the product of publishing and subscribed topics.
+
+    :param master_api_data: The system state.
+    :type master_api_data: MasterApi
+    :return: The seuids of all connections, list of str.
+    """
+    subscribers = dict((entity.name, entity.content) for entity in master_api_data.subs)
     seuids = []
-    found = False
-
-    for pub in pubs:
-        # add topic
-        for sub in subs:
-            if pub is sub:
-                # found the subscribers and publishers of the same topic, now create n*m connections
-                for real_pub in pub.content:
-                    for real_sub in sub.content:
-                        conn.node_sub = real_sub
-                        conn.node_pub = real_pub
-                        seuid_helper.from_message(conn)
-                        seuids.append(seuid_helper.identifier)
-
-    return seuids
\ No newline at end of file
+    for entity in master_api_data.pubs:
+        subs = subscribers.get(entity.name)
+        if subs:
+            seuids.extend(connection_seuids(entity.name, entity.content, subs))
+    return seuids
@@ -2,16 +2,38 @@ from singleton import *
 from arni_msgs.msg import RatedStatistics, RatedStatisticsEntity
 from helper import SEUID_DELIMITER
 import helper
+from master_graph import get_master_graph
 import re
+import threading
+import time
+import Queue
 
+import rospy
 import rosnode
 import rosgraph
 
+#: returned by HostLookup.lookup for nodes whose host is being resolved
+PENDING = object()
+
+#: the time in seconds after which a host resolved from the master is resolved again in the background
+HOST_TTL = 60.0
+
+#: the time in seconds in which a node unknown to the master is not resolved again
+UNKNOWN_TTL = 5.0
+
+#: the maximum amount of concurrent lookups at the master
+MAX_WORKERS = 8
+
 
 class HostLookup(object):
 
     """Contains a dictionary of all nodes and the hosts they run on.
     Is a singleton.
+
+    Hosts which are not known yet are asked from the master, either blocking by get_host or in the background by
+    lookup and resolve. Hosts resolved from the master are resolved again in the background after HOST_TTL
+    seconds and returned meanwhile, nodes unknown to the master are kept for UNKNOWN_TTL seconds. Hosts added by
+    add_node do not expire.
     """
 
     __metaclass__ = Singleton
@@ -22,29 +44,164 @@ class HostLookup(object):
         #: Contains all nodes which are on a host who has HostStatisticsNode
         #: running.
         self.__node_dict = dict()
+        #: node -> time after which its host is resolved again, only for hosts resolved from the master
+        self.__expiry = dict()
+        #: node -> time until which the node is known to be unknown to the master
+        self.__unknown = dict()
+        #: node -> callbacks waiting for the background lookup of the node
+        self.__pending = dict()
+        self.__lookups = Queue.Queue()
+        self.__workers = []
+        self.__lock = threading.Lock()
 
     def get_host(self, node):
         """Return the host the node runs on.
 
+        Blocks while the master is asked if the host is not known yet.
+
         :param node:    name of the node
         :type:  string
 
         :return:    the host the node runs on. None if the host is unknown.
         :rtype: string
         """
-
+        with self.__lock:
+            host = self.__cached(node, time.time())
+        if host is not PENDING:
+            return host
         # do an call to master if the host is not known yet.
-        if not node in self.__node_dict:
+        host = self.__fetch(node)
+        with self.__lock:
+            self.__store(node, host, time.time())
+        return host
+
+    def lookup(self, node, callback=None):
+        """Return the host the node runs on without blocking.
+
+        If the host is not known yet it is resolved in the background and PENDING is returned. The callback is
+        called with the node and its host, None if the master does not know the node, once the lookup completed.
+        It is called from a worker thread.
+
+        :param node:    name of the node
+        :type:  string
+
+        :param callback:    called with (node, host) when a pending lookup completed
+        :type:  function
+
+        :return:    the host the node runs on, None if the host is unknown, PENDING if it is being resolved.
+        """
+        with self.__lock:
+            host = self.__cached(node, time.time())
+            if host is not PENDING:
+                return host
+            callbacks = self.__enqueue(node)
+            if callback is not None:
+                callbacks.append(callback)
+        return PENDING
+
+    def resolve(self, nodes, callback=None):
+        """Return the hosts of several nodes without blocking, see lookup.
+
+        The unknown hosts are resolved concurrently by up to MAX_WORKERS threads.
+
+        :param nodes:   names of the nodes
+        :type:  list
+
+        :param callback:    called with (node, host) for every pending lookup that completed
+        :type:  function
+
+        :return:    node -> host, None or PENDING
+        :rtype: dict
+        """
+        return dict((node, self.lookup(node, callback)) for node in nodes)
+
+    def __cached(self, node, now):
+        """Return the known host of a node, None if it is known to be unknown, PENDING if it has to be resolved.
+        Expired hosts are still returned while they are resolved again in the background.
+        Has to be called with the lock held.
+        """
+        host = self.__node_dict.get(node)
+        if host is not None:
+            expiry = self.__expiry.get(node)
+            if expiry is not None and expiry <= now:
+                self.__enqueue(node)
+            return host
+        elif self.__unknown.get(node, 0) > now:
+            return None
+        return PENDING
+
+    def __enqueue(self, node):
+        """Queue a node to be resolved in the background unless it is queued already.
+        Has to be called with the lock held.
+
+        :return:    the callbacks waiting for the lookup of the node
+        :rtype: list
+        """
+        callbacks = self.__pending.get(node)
+        if callbacks is None:
+            callbacks = self.__pending[node] = []
+            self.__lookups.put(node)
+            if len(self.__workers) < MAX_WORKERS:
+                worker = threading.Thread(target=self.__work, name="HostLookup-%d" % len(self.__workers))
+                worker.daemon = True
+                self.__workers.append(worker)
+                worker.start()
+        return callbacks
+
+    def __store(self, node, host, now):
+        """Remember the result of a lookup at the master. Has to be called with the lock held."""
+        if host is None:
+            self.__unknown[node] = now + UNKNOWN_TTL
+            if node in self.__expiry:
+                # the node is gone, forget the host resolved before
+                del self.__node_dict[node]
+                del self.__expiry[node]
+        elif node not in self.__node_dict or node in self.__expiry:
+            # hosts added by add_node in the meantime take precedence
+            self.__node_dict[node] = host
+            self.__expiry[node] = now + HOST_TTL
+            self.__unknown.pop(node, None)
+
+    def __fetch(self, node):
+        """Ask the master for the host of a node.
+
+        The uri is taken from the shared master graph, so concurrent lookups cause a single poll of the master.
+        Only nodes which are not in the graph yet are looked up one by one.
+
+        :return:    the host, None if the master does not know the node.
+        """
+        try:
+            info = get_master_graph().snapshot().nodes.get(node)
+        except Exception as e:
+            rospy.logdebug("[HostLookup] The master graph is not available: %s" % e)
+            info = None
+        if info is not None and info.uri:
+            node_api = info.uri
+        else:
             master = rosgraph.Master("")
             node_api = rosnode.get_api_uri(master, node, skip_cache=True)
-            # did we get a valid ip?
-            if node_api is not None and node_api.startswith("http://"):
-                ip = re.search("http://(.*):", str(node_api)).group(1)
-                self.__node_dict[node] = ip
-            else:
-                return None
+        # did we get a valid ip?
+        if node_api is not None and node_api.startswith("http://"):
+            return re.search("http://(.*):", str(node_api)).group(1)
+        return None
 
-        return self.__node_dict.get(node)
+    def __work(self):
+        """Resolve queued nodes until the process ends."""
+        while True:
+            node = self.__lookups.get()
+            try:
+                host = self.__fetch(node)
+            except Exception as e:
+                rospy.logdebug("[HostLookup] Could not resolve the host of %s: %s" % (node, e))
+                host = None
+            with self.__lock:
+                self.__store(node, host, time.time())
+                callbacks = self.__pending.pop(node, [])
+            for callback in callbacks:
+                try:
+                    callback(node, host)
+                except Exception as e:
+                    rospy.logerr("[HostLookup] A lookup callback failed: %s" % e)
 
     def add_node(self, node, host):
         """Add a node - host tuple to the dictionary.
@@ -58,7 +215,10 @@ class HostLookup(object):
         :param host:    ip of the host
         :type:  string
         """
-        self.__node_dict[node] = host
+        with self.__lock:
+            self.__node_dict[node] = host
+            self.__expiry.pop(node, None)
+            self.__unknown.pop(node, None)
 
     def get_node_list(self, host):
         """Return all nodes of a specific host.
@@ -78,7 +238,10 @@ class HostLookup(object):
 
     def clear(self):
         """Remove all elements from the dict."""
-        self.__node_dict = dict()
+        with self.__lock:
+            self.__node_dict = dict()
+            self.__expiry = dict()
+            self.__unknown = dict()
 
     def remove_node(self, node):
         """Remove a node - host tuple.
@@ -86,7 +249,9 @@ class HostLookup(object):
         :param node:    name of the node
         :type:  string
         """
-        del self.__node_dict[node]
+        with self.__lock:
+            del self.__node_dict[node]
+            self.__expiry.pop(node, None)
 
     @staticmethod
     def get_instance():
@@ -104,7 +269,7 @@ class HostLookup(object):
 
         :param message: The message to possibly extract the node - host
                         connection from
-        :type message:  RatedStatistics
+        :type message:  RatedStatistics or RatedStatisticsNumeric
         """
 
         # is it about a node?
@@ -0,0 +1,247 @@
+import rospy
+from arni_msgs.msg import MasterApi, MasterApiDelta, MasterApiEntity
+from helper import older_than, connection_seuids
+
+#: the categories of the system state in the order returned by getSystemState
+CATEGORIES = ("pubs", "subs", "srvs")
+
+#: sequence numbers wrap around like the uint32 field carrying them
+SEQ_MODULO = 2 ** 32
+
+#: the topic the whole system state is published on with every poll
+TOPIC = "/statistics_master"
+
+#: the topic the changes of the system state are published on if /arni/master_api_delta is set
+DELTA_TOPIC = "/statistics_master_delta"
+
+
+def _entities(state):
+    """
+    Converts a category of the system state to MasterApiEntity objects sorted by name.
+
+    :param state: A dictionary mapping names to sets of nodes.
+    :type state: dict
+    :return: list of MasterApiEntity
+    """
+    entities = []
+    for name in sorted(state.keys()):
+        entities.append(MasterApiEntity(name, sorted(state[name])))
+    return entities
+
+
+def master_api_msg(system_state):
+    """
+    Converts a system state to a MasterApi message.
+
+    :param system_state: The (pubs, subs, srvs) tuple returned by getSystemState.
+    :type system_state: tuple
+    :return: MasterApi
+    """
+    msg = MasterApi()
+    for category, entries in zip(CATEGORIES, system_state):
+        setattr(msg, category, [MasterApiEntity(name, list(nodes)) for name, nodes in entries])
+    return msg
+
+
+class MasterApiEncoder:
+    """
+    Encodes the system state polled from the master as MasterApiDelta messages.
+
+    In delta mode a message only contains the publishers, subscribers and services which were added or removed
+    since the previous message, nothing is sent if the state did not change. A keyframe containing the whole
+    state is sent regularly so late joiners can synchronize.
+    """
+
+    def __init__(self, keyframe_interval=rospy.Duration(10), delta=True):
+        """
+        Creates an encoder without any known state.
+
+        :param keyframe_interval: The time after which a keyframe is sent at the latest.
+        :type keyframe_interval: rospy.Duration
+        :param delta: Whether to send changes only, otherwise every message is a keyframe.
+        :type delta: bool
+        """
+        self.__keyframe_interval = keyframe_interval
+        self.__delta = delta
+        self.__state = None
+        self.__seq = 0
+        self.__last_keyframe = None
+
+    def encode(self, system_state):
+        """
+        Encodes a system state.
+
+        :param system_state: The (pubs, subs, srvs) tuple returned by getSystemState.
+        :type system_state: tuple
+        :return: A MasterApiDelta message, None if there is nothing to send.
+        """
+        state = []
+        for category in system_state:
+            state.append(dict((name, frozenset(nodes)) for name, nodes in category))
+        keyframe = not self.__delta or self.__state is None or \
+            older_than(self.__last_keyframe, self.__keyframe_interval)
+        msg = MasterApiDelta()
+        if keyframe:
+            msg.keyframe = True
+            for category, entries in zip(CATEGORIES, state):
+                setattr(msg, category, _entities(entries))
+            self.__last_keyframe = rospy.Time.now()
+        else:
+            changed = False
+            for category, old, new in zip(CATEGORIES, self.__state, state):
+                added, removed = self.__diff(old, new)
+                if added or removed:
+                    changed = True
+                setattr(msg, category, _entities(added))
+                setattr(msg, "removed_" + category, _entities(removed))
+            if not changed:
+                return None
+        self.__state = state
+        msg.seq = self.__seq
+        self.__seq = (self.__seq + 1) % SEQ_MODULO
+        return msg
+
+    def __diff(self, old, new):
+        """
+        Returns the nodes added and removed per name between two states of a category.
+
+        :return: A tuple of two dictionaries mapping names to sets of nodes.
+        """
+        added = {}
+        removed = {}
+        for name, nodes in new.iteritems():
+            previous = old.get(name)
+            if previous is None:
+                added[name] = nodes
+            elif previous != nodes:
+                if nodes - previous:
+                    added[name] = nodes - previous
+                if previous - nodes:
+                    removed[name] = previous - nodes
+        for name, nodes in old.iteritems():
+            if name not in new:
+                removed[name] = nodes
+        return added, removed
+
+
+class MasterApiDecoder:
+    """
+    Rebuilds the system state from MasterApiDelta messages sent by a MasterApiEncoder or MasterApi messages.
+
+    A MasterApi message always contains the whole state. Deltas are only applied on top of a keyframe and without
+    a gap in the sequence numbers, otherwise the decoder waits for the next keyframe.
+    """
+
+    def __init__(self):
+        self.__state = None
+        self.__seq = None
+
+    def is_synchronized(self):
+        """
+        Returns whether the decoder holds the current system state.
+
+        :return: bool
+        """
+        return self.__state is not None
+
+    def apply(self, msg):
+        """
+        Applies a MasterApiDelta or MasterApi message to the system state.
+
+        :param msg: The received message.
+        :type msg: MasterApiDelta
+        :return: True if the decoder is synchronized and the message was applied.
+        """
+        if isinstance(msg, MasterApi):
+            self.__state = []
+            for category in CATEGORIES:
+                self.__state.append(dict((e.name, set(e.content)) for e in getattr(msg, category)))
+            # deltas need a keyframe to start from
+            self.__seq = None
+            return True
+        if msg.keyframe:
+            self.__state = []
+            for category in CATEGORIES:
+                self.__state.append(dict((e.name, set(e.content)) for e in getattr(msg, category)))
+        elif self.__state is None or self.__seq is None:
+            return False
+        elif msg.seq != (self.__seq + 1) % SEQ_MODULO:
+            rospy.logdebug("[MasterApiDecoder] Missed master api messages, waiting for the next keyframe.")
+            self.__state = None
+            return False
+        else:
+            for category, state in zip(CATEGORIES, self.__state):
+                for e in getattr(msg, category):
+                    state.setdefault(e.name, set()).update(e.content)
+                for e in getattr(msg, "removed_" + category):
+                    nodes = state.get(e.name)
+                    if nodes is not None:
+                        nodes.difference_update(e.content)
+                        if not nodes:
+                            del state[e.name]
+        self.__seq = msg.seq
+        return True
+
+    def to_msg(self):
+        """
+        Returns the current system state.
+
+        :return: A MasterApi message, None if the decoder is not synchronized.
+        """
+        if self.__state is None:
+            return None
+        msg = MasterApi()
+        for category, state in zip(CATEGORIES, self.__state):
+            setattr(msg, category, _entities(state))
+        return msg
+
+
+class ConnectionTracker:
+    """
+    Keeps the connection seuids of the latest system state and reports which connections were added or removed.
+
+    The publishers and subscribers of every topic are kept from the previous state, only the connections of topics
+    whose publishers or subscribers changed are generated again.
+    """
+
+    def __init__(self):
+        #: the seuids of all current connections, replaced as a whole on every change
+        self.seuids = frozenset()
+        #: topic -> (publishers, subscribers, connection seuids) of the topics with connections
+        self.__topics = {}
+
+    def update(self, master_api_data):
+        """
+        Replaces the known connections by those of a system state.
+
+        :param master_api_data: The whole system state, e.g. from MasterApiDecoder.to_msg.
+        :type master_api_data: MasterApi
+        :return: A tuple of the sorted lists of added and removed connection seuids.
+        """
+        subscribers = dict((e.name, frozenset(e.content)) for e in master_api_data.subs)
+        topics = {}
+        added = set()
+        removed = set()
+        for entity in master_api_data.pubs:
+            subs = subscribers.get(entity.name)
+            if not subs:
+                continue
+            pubs = frozenset(entity.content)
+            previous = self.__topics.get(entity.name)
+            if previous is not None and previous[0] == pubs and previous[1] == subs:
+                topics[entity.name] = previous
+                continue
+            seuids = frozenset(connection_seuids(entity.name, pubs, subs))
+            topics[entity.name] = (pubs, subs, seuids)
+            if previous is None:
+                added.update(seuids)
+            else:
+                added.update(seuids - previous[2])
+                removed.update(previous[2] - seuids)
+        for name, previous in self.__topics.iteritems():
+            if name not in topics:
+                removed.update(previous[2])
+        self.__topics = topics
+        if added or removed:
+            self.seuids = (self.seuids - removed) | added
+        return sorted(added), sorted(removed)
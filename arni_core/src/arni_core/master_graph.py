@@ -0,0 +1,328 @@
+import socket
+import threading
+import time
+import xmlrpclib
+import Queue
+from collections import namedtuple
+
+import rospy
+import rosgraph.masterapi
+from arni_msgs.msg import MasterGraph as MasterGraphMsg, MasterGraphNode, MasterApiEntity
+from master_api import CATEGORIES
+
+#: the topic the master graph is published on
+TOPIC = "/arni/master_graph"
+
+#: the time in seconds after which an unchanged master graph is published again
+KEEPALIVE = 5.0
+
+#: the time in seconds a node is given to answer for its process id
+PID_TIMEOUT = 1.0
+
+#: the maximum amount of threads asking the nodes for their process ids
+MAX_PID_WORKERS = 4
+
+#: versions wrap around like the uint32 field carrying them
+VERSION_MODULO = 2 ** 32
+
+#: a node of the master graph, uri is empty and pid is 0 if they are unknown
+NodeInfo = namedtuple("NodeInfo", ["name", "uri", "pid"])
+
+#: one state of the master graph: the version increases whenever system_state or nodes changed, stamp is the time
+#: of the poll in seconds, system_state is the (pubs, subs, srvs) tuple like returned by getSystemState and
+#: nodes maps the node names to NodeInfo tuples
+MasterGraphSnapshot = namedtuple("MasterGraphSnapshot", ["version", "stamp", "system_state", "nodes"])
+
+
+class _TimeoutTransport(xmlrpclib.Transport):
+    """
+    A transport giving up after PID_TIMEOUT seconds without changing the default timeout of all sockets.
+    """
+
+    def make_connection(self, host):
+        connection = xmlrpclib.Transport.make_connection(self, host)
+        connection.timeout = PID_TIMEOUT
+        return connection
+
+
+def to_msg(snapshot):
+    """
+    Converts a snapshot to a MasterGraph message.
+
+    :type snapshot: MasterGraphSnapshot
+    :return: MasterGraph
+    """
+    msg = MasterGraphMsg()
+    msg.version = snapshot.version
+    msg.stamp = rospy.Time.from_sec(snapshot.stamp)
+    for category, entries in zip(CATEGORIES, snapshot.system_state):
+        setattr(msg, category, [MasterApiEntity(name, list(nodes)) for name, nodes in entries])
+    msg.nodes = [MasterGraphNode(info.name, info.uri, info.pid) for info in
+                 sorted(snapshot.nodes.itervalues())]
+    return msg
+
+
+def from_msg(msg):
+    """
+    Converts a MasterGraph message to a snapshot.
+
+    :type msg: MasterGraph
+    :return: MasterGraphSnapshot
+    """
+    system_state = tuple([(e.name, e.content) for e in getattr(msg, category)] for category in CATEGORIES)
+    nodes = dict((n.name, NodeInfo(n.name, n.uri, n.pid)) for n in msg.nodes)
+    return MasterGraphSnapshot(msg.version, msg.stamp.to_sec(), system_state, nodes)
+
+
+class MasterGraph(object):
+    """
+    Caches the system state of the master together with the uris and process ids of its nodes.
+
+    The master is polled at most once per refresh interval no matter how many threads ask for a snapshot, a
+    thread asking while another one polls gets the previous snapshot or, if there is none yet, waits for the result.
+    The uri of a node is looked up when it appears and again after node_ttl seconds instead of on every poll. Process
+    ids are asked from the nodes by background threads, so a slow node never delays a poll, and show up in the
+    snapshots once they arrived.
+
+    A process can publish its snapshots on TOPIC, other processes listening to it use the received snapshots
+    instead of polling the master as long as they keep arriving. A cache which publishes never uses received
+    snapshots.
+    """
+
+    def __init__(self, refresh_interval=1.0, node_ttl=30.0, pids=False, master=None):
+        """
+        Creates a cache without any known state.
+
+        :param refresh_interval: The time in seconds after which a snapshot is outdated.
+        :type refresh_interval: float
+        :param node_ttl: The time in seconds after which the uri and pid of a node are looked up again.
+        :type node_ttl: float
+        :param pids: Whether to ask the nodes for their process ids.
+        :type pids: bool
+        :param master: The master to poll, defaults to the master of this process.
+        :type master: rosgraph.masterapi.Master
+        """
+        self.refresh_interval = refresh_interval
+        self.node_ttl = node_ttl
+        self.pids = pids
+        self.__master = master if master is not None else rosgraph.masterapi.Master("")
+        self.__snapshot = None
+        #: node -> time its uri was looked up, nodes whose lookup failed are missing
+        self.__checked = {}
+        self.__refreshing = False
+        self.__condition = threading.Condition()
+        #: the last snapshot received on the topic and the time it arrived
+        self.__received = None
+        self.__received_at = 0
+        self.__publisher = None
+        #: the version and time of the last published snapshot
+        self.__published = (None, 0)
+        #: node -> (uri, pid, time the pid was asked for) of the nodes asked for their pid
+        self.__pids = {}
+        #: the nodes queued to be asked for their pid
+        self.__pid_pending = set()
+        self.__pid_queue = Queue.Queue()
+        self.__pid_workers = []
+        self.__pid_lock = threading.Lock()
+
+    def snapshot(self, max_age=None):
+        """
+        Returns the current snapshot, polls the master if the cached one is outdated.
+
+        :param max_age: The time in seconds after which the cached snapshot is outdated, defaults to the refresh
+            interval.
+        :type max_age: float
+        :return: MasterGraphSnapshot
+        :raises rosgraph.masterapi.MasterException: If the master could not be polled.
+        """
+        if max_age is None:
+            max_age = self.refresh_interval
+        with self.__condition:
+            while True:
+                now = time.time()
+                # a publishing process would keep receiving its own snapshots
+                if self.__publisher is None and self.__received is not None and \
+                        now - self.__received_at <= 2 * KEEPALIVE:
+                    return self.__received
+                if self.__snapshot is not None and (now - self.__snapshot.stamp < max_age or self.__refreshing):
+                    # another thread may be polling, its result is used from the next call on
+                    return self.__snapshot
+                if not self.__refreshing:
+                    self.__refreshing = True
+                    break
+                # the first poll, its result is used if it succeeds
+                self.__condition.wait()
+        try:
+            return self.__refresh()
+        finally:
+            with self.__condition:
+                self.__refreshing = False
+                self.__condition.notify_all()
+
+    def nodes(self, host=None):
+        """
+        Returns the nodes of the current snapshot.
+
+        :param host: Only return the nodes whose uri contains this host.
+        :type host: str
+        :return: list of NodeInfo
+        """
+        nodes = self.snapshot().nodes.values()
+        if host is None:
+            return nodes
+        return [info for info in nodes if host in info.uri]
+
+    def __refresh(self):
+        """
+        Polls the master and looks up the new nodes. Only called by one thread at a time.
+        """
+        state = self.__master.getSystemState()
+        now = time.time()
+        previous = self.__snapshot
+        known = previous.nodes if previous is not None else {}
+        system_state = tuple(sorted((name, sorted(nodes)) for name, nodes in category) for category in state)
+        names = set()
+        for category in system_state:
+            for name, nodes in category:
+                names.update(nodes)
+        nodes = {}
+        for name in names:
+            info = known.get(name)
+            if info is None or now - self.__checked.get(name, 0) > self.node_ttl:
+                looked_up = self.__lookup(name)
+                if looked_up.uri:
+                    self.__checked[name] = now
+                    info = looked_up
+                elif info is None:
+                    # looked up again with the next poll
+                    info = looked_up
+            if self.pids and info.uri:
+                pid = self.__pid(name, info.uri, now)
+                if pid != info.pid:
+                    info = info._replace(pid=pid)
+            nodes[name] = info
+        for name in self.__checked.keys():
+            if name not in nodes:
+                del self.__checked[name]
+        with self.__pid_lock:
+            for name in self.__pids.keys():
+                if name not in nodes:
+                    del self.__pids[name]
+        version = 0
+        if previous is not None:
+            version = previous.version
+            if previous.system_state != system_state or previous.nodes != nodes:
+                version = (version + 1) % VERSION_MODULO
+        snapshot = MasterGraphSnapshot(version, now, system_state, nodes)
+        self.__snapshot = snapshot
+        return snapshot
+
+    def __lookup(self, name):
+        """
+        Looks up the uri of a node, the pid is filled in by __refresh.
+
+        :return: NodeInfo
+        """
+        try:
+            uri = self.__master.lookupNode(name)
+        except (rosgraph.masterapi.MasterError, socket.error) as e:
+            rospy.logdebug("[MasterGraph] Could not look up %s: %s" % (name, e))
+            return NodeInfo(name, "", 0)
+        return NodeInfo(name, uri, 0)
+
+    def __pid(self, name, uri, now):
+        """
+        Returns the known process id of a node and queues asking the node for it if it is unknown or outdated.
+
+        :return: The pid, 0 if it is unknown yet.
+        """
+        with self.__pid_lock:
+            known = self.__pids.get(name)
+            if known is not None and known[0] == uri and now - known[2] <= self.node_ttl:
+                return known[1]
+            if name not in self.__pid_pending:
+                self.__pid_pending.add(name)
+                self.__pid_queue.put((name, uri))
+                if len(self.__pid_workers) < MAX_PID_WORKERS:
+                    worker = threading.Thread(target=self.__ask_pids, name="MasterGraph-%d" % len(self.__pid_workers))
+                    worker.daemon = True
+                    self.__pid_workers.append(worker)
+                    worker.start()
+            # the previous pid stays valid while the node is asked again
+            return known[1] if known is not None and known[0] == uri else 0
+
+    def __ask_pids(self):
+        """
+        Asks the queued nodes for their process ids until the process ends.
+        """
+        while True:
+            name, uri = self.__pid_queue.get()
+            pid = 0
+            try:
+                code, msg, value = xmlrpclib.ServerProxy(uri, transport=_TimeoutTransport()).getPid(rospy.get_name())
+                if code == 1:
+                    pid = value
+            except (socket.error, xmlrpclib.Error) as e:
+                rospy.logdebug("[MasterGraph] Node %s is unreachable: %s" % (name, e))
+            with self.__pid_lock:
+                self.__pids[name] = (uri, pid, time.time())
+                self.__pid_pending.discard(name)
+
+    def listen(self, topic=TOPIC):
+        """
+        Uses the snapshots published on a topic instead of polling the master while they keep arriving.
+
+        :param topic: The topic the snapshots are published on.
+        :type topic: str
+        """
+        rospy.Subscriber(topic, MasterGraphMsg, self.__receive)
+
+    def __receive(self, msg):
+        snapshot = from_msg(msg)
+        with self.__condition:
+            self.__received = snapshot
+            self.__received_at = time.time()
+
+    def publish(self, snapshot=None, topic=TOPIC):
+        """
+        Publishes a snapshot if it changed since the last one published or the last one is older than KEEPALIVE.
+
+        :param snapshot: The snapshot, defaults to the current one.
+        :type snapshot: MasterGraphSnapshot
+        :param topic: The topic to publish on.
+        :type topic: str
+        :return: Whether the snapshot was published.
+        """
+        if snapshot is None:
+            snapshot = self.snapshot()
+        if self.__publisher is None:
+            self.__publisher = rospy.Publisher(topic, MasterGraphMsg, queue_size=1, latch=True)
+        now = time.time()
+        if snapshot.version == self.__published[0] and now - self.__published[1] < KEEPALIVE:
+            return False
+        self.__publisher.publish(to_msg(snapshot))
+        self.__published = (snapshot.version, now)
+        return True
+
+
+#: the master graph shared by all ARNI components of a process
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_master_graph():
+    """
+    Returns the MasterGraph shared by all ARNI components of a process. It is configured by the parameters in
+    /arni/master_graph and listens to the snapshots published on TOPIC unless /arni/master_graph/listen is false.
+
+    :return: MasterGraph
+    """
+    global _graph
+    with _graph_lock:
+        if _graph is None:
+            _graph = MasterGraph(rospy.get_param("/arni/master_graph/refresh_interval", 1.0),
+                                 rospy.get_param("/arni/master_graph/node_ttl", 30.0),
+                                 rospy.get_param("/arni/master_graph/pids", False))
+            if rospy.get_param("/arni/master_graph/listen", True):
+                _graph.listen()
+    return _graph
@@ -0,0 +1,110 @@
+import copy
+import threading
+import time
+import rospy
+from rospy.impl.paramserver import get_param_server_cache
+
+_unspecified = object()
+
+
+class ParameterCache(object):
+    """
+    Serves parameters from memory instead of asking the parameter server on every read.
+
+    A parameter is subscribed at the master the first time it is read, rospy then keeps its value up to date
+    through parameter updates. If the subscription fails, e.g. because the master is not reachable, the
+    parameter is read again once its value is older than *ttl* seconds.
+    """
+
+    def __init__(self, ttl=10.0):
+        """
+        Creates an empty cache.
+
+        :param ttl: The time in seconds after which parameters which could not be subscribed are read again.
+        :type ttl: float
+        """
+        self.ttl = ttl
+        #: resolved names of the subscribed parameters
+        self.__subscribed = set()
+        #: resolved name -> (value or _unspecified, expiry) of the parameters which could not be subscribed
+        self.__polled = {}
+        self.__lock = threading.Lock()
+
+    def get(self, name, default=_unspecified):
+        """
+        Returns the value of a parameter like rospy.get_param.
+
+        :param name: The name of the parameter, relative and private names are resolved like by rospy.
+        :type name: str
+        :param default: The value returned if the parameter is not set.
+        :raises KeyError: If the parameter is not set and no default is given.
+        """
+        key = rospy.resolve_name(name)
+        if key in self.__subscribed:
+            value = self.__cached(key)
+        else:
+            value = self.__fetch(key)
+        if value is _unspecified:
+            if default is _unspecified:
+                raise KeyError(name)
+            return default
+        # the value is shared with the cache
+        return copy.deepcopy(value) if isinstance(value, (list, dict)) else value
+
+    def __cached(self, key):
+        try:
+            value = get_param_server_cache().get_value(key)
+        except KeyError:
+            return _unspecified
+        # deleted and unset parameters are updated to an empty dictionary
+        return _unspecified if isinstance(value, dict) and not value else value
+
+    def __fetch(self, key):
+        """
+        Subscribes a parameter and returns its value, falls back to reading it every ttl seconds.
+        """
+        now = time.time()
+        with self.__lock:
+            polled = self.__polled.get(key)
+            if polled is not None and polled[1] > now:
+                return polled[0]
+        try:
+            value = rospy.get_param_cached(key)
+        except KeyError:
+            value = _unspecified
+        except Exception as e:
+            rospy.logdebug("[ParameterCache] Could not subscribe %s: %s" % (key, e))
+            try:
+                value = rospy.get_param(key)
+            except KeyError:
+                value = _unspecified
+            except Exception:
+                # keep the last known value until the master is reachable again
+                value = polled[0] if polled is not None else _unspecified
+        with self.__lock:
+            try:
+                # the subscription succeeded if rospy cached the parameter, even if it is not set
+                get_param_server_cache().get_value(key)
+                self.__subscribed.add(key)
+                self.__polled.pop(key, None)
+            except KeyError:
+                self.__polled[key] = (value, now + self.ttl)
+        return value
+
+    def clear(self):
+        """
+        Forgets the parameters which could not be subscribed, so they are read again on their next access.
+        """
+        with self.__lock:
+            self.__polled.clear()
+
+
+#: the cache shared by all ARNI components of a process
+_cache = ParameterCache()
+
+
+def get_param(name, default=_unspecified):
+    """
+    Returns the value of a parameter from the shared ParameterCache, see ParameterCache.get.
+    """
+    return _cache.get(name, default)
@@ -0,0 +1,204 @@
+import threading
+import rospy
+from arni_msgs.msg import SeuidMapping
+from helper import older_than
+
+#: the topic the ids of a process are published on
+TOPIC = "/arni/seuid_mapping"
+
+
+class SeuidRegistry(object):
+    """
+    Assigns dense integer ids to seuids, the first seuid gets 0, the next one 1 and so on.
+
+    Every holder of an id, e.g. an entry in a dictionary keyed by ids, acquires it and releases it once the entry
+    is dropped. An id is kept while it is held and freed once its last holder released it, freed ids are reused for
+    new seuids. So only the seuids still referenced somewhere are kept, anonymous and restarted nodes do not grow
+    the registry forever. Ids are only meaningful within the process which assigned them, a process can publish
+    its ids on TOPIC so other processes can translate the ids in messages received from it.
+    """
+
+    def __init__(self):
+        #: seuid -> id
+        self.__ids = {}
+        #: id -> seuid, None for freed ids
+        self.__seuids = []
+        #: id -> amount of holders
+        self.__holders = []
+        #: the freed ids
+        self.__free = []
+        self.__lock = threading.Lock()
+        self.__publisher = None
+        #: the amount of ids published so far
+        self.__published = 0
+        self.__last_complete = None
+
+    def __len__(self):
+        return len(self.__ids)
+
+    def acquire(self, seuid):
+        """
+        Returns the id of a seuid and holds it until release is called, assigns a free id if it has none yet.
+
+        :param seuid: The seuid.
+        :type seuid: str
+        :return: int
+        """
+        with self.__lock:
+            ident = self.__ids.get(seuid)
+            if ident is not None:
+                self.__holders[ident] += 1
+            elif self.__free:
+                ident = self.__free.pop()
+                self.__seuids[ident] = seuid
+                self.__holders[ident] = 1
+                self.__ids[seuid] = ident
+                # the id was published for another seuid before
+                self.__last_complete = None
+            else:
+                ident = len(self.__seuids)
+                self.__seuids.append(seuid)
+                self.__holders.append(1)
+                self.__ids[seuid] = ident
+            return ident
+
+    def release(self, ident):
+        """
+        Stops holding an id acquired before, frees it once it has no holders left.
+
+        :param ident: The id.
+        :type ident: int
+        :raises IndexError: If the id is not held.
+        """
+        with self.__lock:
+            if self.__seuids[ident] is None:
+                raise IndexError("[SeuidRegistry] The id %d is not held." % ident)
+            self.__holders[ident] -= 1
+            if not self.__holders[ident]:
+                del self.__ids[self.__seuids[ident]]
+                self.__seuids[ident] = None
+                self.__free.append(ident)
+
+    def find(self, seuid):
+        """
+        Returns the id of a seuid without assigning one.
+
+        :param seuid: The seuid.
+        :type seuid: str
+        :return: The id, None if the seuid has none.
+        """
+        return self.__ids.get(seuid)
+
+    def seuid(self, ident):
+        """
+        Returns the seuid of an id.
+
+        :param ident: The id.
+        :type ident: int
+        :return: str
+        :raises IndexError: If the id is not assigned.
+        """
+        seuid = self.__seuids[ident]
+        if seuid is None:
+            raise IndexError("[SeuidRegistry] The id %d is not assigned." % ident)
+        return seuid
+
+    def publish(self, keyframe_interval=rospy.Duration(10), topic=TOPIC):
+        """
+        Publishes the ids assigned since the previous call, all of them if the last complete mapping is older than
+        the keyframe interval or a freed id was reused. Nothing is published if no ids were assigned in the meantime.
+
+        :param keyframe_interval: The time after which all ids are published again for late joiners.
+        :type keyframe_interval: rospy.Duration
+        :param topic: The topic to publish on.
+        :type topic: str
+        :return: Whether a message was published.
+        """
+        if self.__publisher is None:
+            self.__publisher = rospy.Publisher(topic, SeuidMapping, queue_size=10, latch=True)
+        msg = SeuidMapping()
+        msg.node = rospy.get_name()
+        with self.__lock:
+            assigned = len(self.__seuids)
+            if self.__last_complete is None or older_than(self.__last_complete, keyframe_interval):
+                msg.complete = True
+                msg.first_id = 0
+                self.__last_complete = rospy.Time.now()
+            elif assigned > self.__published:
+                msg.first_id = self.__published
+            else:
+                return False
+            msg.seuids = [seuid if seuid is not None else "" for seuid in self.__seuids[msg.first_id:assigned]]
+            self.__published = assigned
+        self.__publisher.publish(msg)
+        return True
+
+
+class SeuidMappingListener(object):
+    """
+    Translates the ids published by other processes back to seuids.
+
+    The ids of a node are known once a complete mapping of it arrived. If a message of the node got lost its ids
+    are unknown until the next complete mapping.
+    """
+
+    def __init__(self):
+        #: node -> list of its seuids indexed by id
+        self.__nodes = {}
+        self.__lock = threading.Lock()
+
+    def listen(self, topic=TOPIC):
+        """
+        Subscribes the mappings published on a topic.
+
+        :param topic: The topic the mappings are published on.
+        :type topic: str
+        """
+        rospy.Subscriber(topic, SeuidMapping, self.receive)
+
+    def receive(self, msg):
+        """
+        Applies a received mapping.
+
+        :type msg: SeuidMapping
+        """
+        with self.__lock:
+            seuids = self.__nodes.get(msg.node)
+            if msg.complete:
+                self.__nodes[msg.node] = list(msg.seuids)
+            elif seuids is None:
+                return
+            elif msg.first_id == len(seuids):
+                seuids.extend(msg.seuids)
+            elif msg.first_id > len(seuids):
+                rospy.logdebug("[SeuidMappingListener] Missed ids of %s, waiting for a complete mapping." % msg.node)
+                del self.__nodes[msg.node]
+
+    def seuid(self, node, ident):
+        """
+        Returns the seuid a node assigned an id to.
+
+        :param node: The name of the node which assigned the id.
+        :type node: str
+        :param ident: The id.
+        :type ident: int
+        :return: The seuid, None if it is unknown.
+        """
+        seuids = self.__nodes.get(node)
+        if seuids is None or not 0 <= ident < len(seuids):
+            return None
+        # freed ids are published as empty strings
+        return seuids[ident] or None
+
+
+#: the registry shared by all ARNI components of a process
+_registry = SeuidRegistry()
+
+
+def get_registry():
+    """
+    Returns the SeuidRegistry shared by all ARNI components of a process.
+
+    :return: SeuidRegistry
+    """
+    return _registry
@@ -1,8 +1,11 @@
 PKG = 'arni_core'
 NAME = 'host_lookup_test'
 
+import threading
+import time
 import unittest
 
+import host_lookup
 from host_lookup import *
 from helper import SEUID_DELIMITER
 
@@ -43,6 +46,59 @@ class TestHostLookup(unittest.TestCase):
         node_list = lookup.get_node_list("host1")
         self.assertItemsEqual(node_list, node_orig_list)
 
+    def test_lookup_pending(self):
+        """Test if unknown hosts are resolved in the background."""
+        lookup = HostLookup()
+        get_api_uri = host_lookup.rosnode.get_api_uri
+        uris = {"/pending1": "http://10.0.0.1:4711/", "/pending2": None}
+        done = threading.Event()
+        results = {}
+
+        def callback(node, host):
+            results[node] = host
+            if len(results) == len(uris):
+                done.set()
+
+        host_lookup.rosnode.get_api_uri = lambda master, node, skip_cache=False: uris[node]
+        try:
+            hosts = lookup.resolve(uris.keys(), callback)
+            self.assertTrue(all(host is PENDING for host in hosts.values()))
+            done.wait(5)
+        finally:
+            host_lookup.rosnode.get_api_uri = get_api_uri
+        self.assertEqual(results, {"/pending1": "10.0.0.1", "/pending2": None})
+        # both results are cached, the master is not asked again
+        self.assertEqual(lookup.lookup("/pending1"), "10.0.0.1")
+        self.assertEqual(lookup.lookup("/pending2"), None)
+        self.assertEqual(lookup.get_host("/pending1"), "10.0.0.1")
+
+    def test_stale_host_refreshed(self):
+        """Test if an expired host is still returned while it is resolved again in the background."""
+        lookup = HostLookup()
+        get_api_uri = host_lookup.rosnode.get_api_uri
+        host_ttl = host_lookup.HOST_TTL
+        uris = {"/stale": "http://10.0.0.1:4711/"}
+        host_lookup.rosnode.get_api_uri = lambda master, node, skip_cache=False: uris[node]
+        # every resolved host expires at once
+        host_lookup.HOST_TTL = -1.0
+        try:
+            self.assertEqual(lookup.get_host("/stale"), "10.0.0.1")
+            uris["/stale"] = "http://10.0.0.2:4711/"
+            self.assertEqual(lookup.lookup("/stale"), "10.0.0.1")
+            deadline = time.time() + 5
+            while lookup.lookup("/stale") != "10.0.0.2" and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(lookup.lookup("/stale"), "10.0.0.2")
+        finally:
+            host_lookup.rosnode.get_api_uri = get_api_uri
+            host_lookup.HOST_TTL = host_ttl
+
+    def test_added_node_cached(self):
+        """Test if added nodes are returned without a lookup."""
+        lookup = HostLookup()
+        lookup.add_node("/added", "host2")
+        self.assertEqual(lookup.lookup("/added"), "host2")
+
 
 if __name__ == '__main__':
     unittest.main()
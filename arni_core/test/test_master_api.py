@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+
+import unittest
+import rospy
+from arni_core.master_api import MasterApiEncoder, MasterApiDecoder, ConnectionTracker, master_api_msg
+from arni_core.helper import generate_seuids_from_master_api_data
+
+PKG = "arni_core"
+
+
+class TestMasterApi(unittest.TestCase):
+
+    def setUp(self):
+        self.encoder = MasterApiEncoder(rospy.Duration(3600))
+        self.decoder = MasterApiDecoder()
+
+    def test_keyframe_first(self):
+        msg = self.encoder.encode(([["/a", ["/n1"]]], [], []))
+        self.assertTrue(msg.keyframe)
+        self.assertEqual(msg.seq, 0)
+        self.assertTrue(self.decoder.apply(msg))
+        self.assertEqual(self.decoder.to_msg().pubs[0].content, ["/n1"])
+
+    def test_unchanged(self):
+        self.encoder.encode(([["/a", ["/n1"]]], [], []))
+        self.assertEqual(self.encoder.encode(([["/a", ["/n1"]]], [], [])), None)
+
+    def test_delta(self):
+        self.decoder.apply(self.encoder.encode(([["/a", ["/n1"]]], [["/a", ["/n2"]]], [])))
+        msg = self.encoder.encode(([["/a", ["/n1", "/n3"]]], [], [["/srv", ["/n2"]]]))
+        self.assertFalse(msg.keyframe)
+        self.assertEqual(msg.seq, 1)
+        self.assertEqual([(e.name, e.content) for e in msg.pubs], [("/a", ["/n3"])])
+        self.assertEqual([(e.name, e.content) for e in msg.removed_subs], [("/a", ["/n2"])])
+        self.assertTrue(self.decoder.apply(msg))
+        state = self.decoder.to_msg()
+        self.assertEqual([(e.name, e.content) for e in state.pubs], [("/a", ["/n1", "/n3"])])
+        self.assertEqual(state.subs, [])
+        self.assertEqual([(e.name, e.content) for e in state.srvs], [("/srv", ["/n2"])])
+
+    def test_resynchronize(self):
+        self.decoder.apply(self.encoder.encode(([["/a", ["/n1"]]], [], [])))
+        self.encoder.encode(([["/a", ["/n1", "/n2"]]], [], []))
+        # the second message got lost
+        msg = self.encoder.encode(([["/a", ["/n2"]]], [], []))
+        self.assertFalse(self.decoder.apply(msg))
+        self.assertFalse(self.decoder.is_synchronized())
+        self.assertFalse(MasterApiDecoder().apply(msg))
+        keyframe = MasterApiEncoder(rospy.Duration(0), False).encode(([["/a", ["/n2"]]], [], []))
+        self.assertTrue(self.decoder.apply(keyframe))
+        self.assertEqual(self.decoder.to_msg().pubs[0].content, ["/n2"])
+
+    def test_full_state(self):
+        msg = master_api_msg(([["/a", ["/n1"]]], [["/a", ["/n2"]]], []))
+        self.assertFalse(hasattr(msg, "keyframe"))
+        self.assertTrue(self.decoder.apply(msg))
+        self.assertEqual([(e.name, e.content) for e in self.decoder.to_msg().subs], [("/a", ["/n2"])])
+        # deltas need a keyframe to start from
+        self.encoder.encode(([["/a", ["/n1"]]], [], []))
+        self.assertFalse(self.decoder.apply(self.encoder.encode(([["/a", ["/n1", "/n3"]]], [], []))))
+
+    def test_generate_seuids(self):
+        state = master_api_msg(
+            ([["/a", ["/p1", "/p2"]], ["/b", ["/p1"]], ["/c", ["/p3"]]], [["/a", ["/s1"]], ["/b", ["/s1", "/s2"]]],
+             [["/srv", ["/p1"]]]))
+        self.assertEqual(sorted(generate_seuids_from_master_api_data(state)),
+                         ["c!/s1!/a!/p1", "c!/s1!/a!/p2", "c!/s1!/b!/p1", "c!/s2!/b!/p1"])
+
+    def test_connection_changes(self):
+        tracker = ConnectionTracker()
+        added, removed = tracker.update(master_api_msg(([["/a", ["/p1"]], ["/b", ["/p1"]]],
+                                                        [["/a", ["/s1"]], ["/b", ["/s1"]]], [])))
+        self.assertEqual(added, ["c!/s1!/a!/p1", "c!/s1!/b!/p1"])
+        self.assertEqual(removed, [])
+        state = master_api_msg(([["/a", ["/p1", "/p2"]], ["/b", ["/p1"]]], [["/a", ["/s1"]]], []))
+        added, removed = tracker.update(state)
+        self.assertEqual(added, ["c!/s1!/a!/p2"])
+        self.assertEqual(removed, ["c!/s1!/b!/p1"])
+        self.assertEqual(tracker.update(state), ([], []))
+        self.assertEqual(tracker.seuids, frozenset(["c!/s1!/a!/p1", "c!/s1!/a!/p2"]))
+
+
+if __name__ == '__main__':
+    import rostest
+
+    rospy.init_node("test_master_api", anonymous=True)
+    rostest.rosrun(PKG, 'test_master_api', TestMasterApi)
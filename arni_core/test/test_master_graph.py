@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+
+import threading
+import time
+import unittest
+import rospy
+import rosgraph.masterapi
+from arni_core import master_graph
+from arni_core.master_graph import MasterGraph, NodeInfo, to_msg, from_msg
+
+PKG = "arni_core"
+
+
+class FakeMaster(object):
+    """
+    Answers like the master api with a given system state and counts the calls.
+    """
+
+    def __init__(self, state, delay=0):
+        self.state = state
+        self.delay = delay
+        self.polls = 0
+        self.lookups = []
+        self.unknown = set()
+
+    def getSystemState(self):
+        self.polls += 1
+        time.sleep(self.delay)
+        return self.state
+
+    def lookupNode(self, name):
+        self.lookups.append(name)
+        if name in self.unknown:
+            raise rosgraph.masterapi.MasterError("unknown node")
+        return "http://host_%s:1234/" % name.strip("/")
+
+
+class SlowNode(object):
+    """
+    Answers getPid like a node after a delay.
+    """
+
+    delay = 0.5
+
+    def __init__(self, uri, transport=None):
+        self.uri = uri
+
+    def getPid(self, caller_id):
+        time.sleep(SlowNode.delay)
+        return 1, "", 42
+
+
+class TestMasterGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.master = FakeMaster(([["/a", ["/n1"]]], [["/a", ["/n2"]]], [["/srv", ["/n1"]]]))
+        self.server_proxy = master_graph.xmlrpclib.ServerProxy
+        master_graph.xmlrpclib.ServerProxy = SlowNode
+
+    def tearDown(self):
+        master_graph.xmlrpclib.ServerProxy = self.server_proxy
+
+    def test_snapshot(self):
+        graph = MasterGraph(3600, master=self.master)
+        snapshot = graph.snapshot()
+        self.assertEqual(snapshot.system_state[0], [("/a", ["/n1"])])
+        self.assertEqual(snapshot.nodes["/n2"], NodeInfo("/n2", "http://host_n2:1234/", 0))
+        self.assertEqual(graph.nodes("host_n1"), [snapshot.nodes["/n1"]])
+        self.assertIs(graph.snapshot(), snapshot)
+        self.assertEqual(self.master.polls, 1)
+
+    def test_coalesce(self):
+        self.master.delay = 0.2
+        graph = MasterGraph(3600, master=self.master)
+        snapshots = []
+        threads = [threading.Thread(target=lambda: snapshots.append(graph.snapshot())) for i in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.master.polls, 1)
+        self.assertEqual(len(set(id(s) for s in snapshots)), 1)
+
+    def test_versions(self):
+        graph = MasterGraph(3600, master=self.master)
+        version = graph.snapshot(0).version
+        self.assertEqual(graph.snapshot(0).version, version)
+        self.master.state = ([["/a", ["/n1", "/n3"]]], [["/a", ["/n2"]]], [])
+        self.assertEqual(graph.snapshot(0).version, version + 1)
+        # only the new node is looked up
+        self.assertEqual(sorted(self.master.lookups), ["/n1", "/n2", "/n3"])
+
+    def test_failed_lookup(self):
+        self.master.unknown.add("/n2")
+        graph = MasterGraph(3600, master=self.master)
+        self.assertEqual(graph.snapshot(0).nodes["/n2"].uri, "")
+        self.master.unknown.clear()
+        self.assertEqual(graph.snapshot(0).nodes["/n2"].uri, "http://host_n2:1234/")
+
+    def test_pids_in_background(self):
+        graph = MasterGraph(3600, pids=True, master=self.master)
+        start = time.time()
+        snapshot = graph.snapshot(0)
+        # the slow nodes do not delay the poll
+        self.assertLess(time.time() - start, SlowNode.delay)
+        self.assertEqual(snapshot.nodes["/n1"].pid, 0)
+        time.sleep(2 * SlowNode.delay)
+        snapshot = graph.snapshot(0)
+        self.assertEqual(snapshot.nodes["/n1"].pid, 42)
+        self.assertEqual(snapshot.version, 1)
+
+    def test_stale_while_refreshing(self):
+        graph = MasterGraph(3600, master=self.master)
+        first = graph.snapshot()
+        self.master.delay = 0.5
+        thread = threading.Thread(target=graph.snapshot, args=(0,))
+        thread.start()
+        time.sleep(0.1)
+        # the poll in progress does not block
+        self.assertIs(graph.snapshot(0), first)
+        thread.join()
+        self.assertIsNot(graph.snapshot(), first)
+
+    def test_msg(self):
+        snapshot = MasterGraph(3600, master=self.master).snapshot()
+        received = from_msg(to_msg(snapshot))
+        self.assertEqual(received.version, snapshot.version)
+        self.assertEqual(received.system_state, snapshot.system_state)
+        self.assertEqual(received.nodes, snapshot.nodes)
+
+
+if __name__ == '__main__':
+    import rostest
+
+    rospy.init_node("test_master_graph", anonymous=True)
+    rostest.rosrun(PKG, 'test_master_graph', TestMasterGraph)
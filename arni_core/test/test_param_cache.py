@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+
+import time
+import unittest
+import rospy
+from arni_core.param_cache import ParameterCache
+
+PKG = "arni_core"
+
+
+class TestParamCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = ParameterCache(ttl=0.5)
+
+    def wait_for(self, name, expected, timeout=5):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.cache.get(name, None) == expected:
+                return True
+            time.sleep(0.05)
+        return False
+
+    def test_missing(self):
+        self.assertEqual(self.cache.get("/test_param_cache/missing", 3), 3)
+        self.assertRaises(KeyError, self.cache.get, "/test_param_cache/missing")
+
+    def test_updates(self):
+        rospy.set_param("/test_param_cache/enabled", False)
+        self.assertEqual(self.cache.get("/test_param_cache/enabled"), False)
+        rospy.set_param("/test_param_cache/enabled", True)
+        self.assertTrue(self.wait_for("/test_param_cache/enabled", True))
+        rospy.delete_param("/test_param_cache/enabled")
+        self.assertTrue(self.wait_for("/test_param_cache/enabled", None))
+
+    def test_set_later(self):
+        self.assertIsNone(self.cache.get("/test_param_cache/later", None))
+        rospy.set_param("/test_param_cache/later", 10)
+        self.assertTrue(self.wait_for("/test_param_cache/later", 10))
+
+    def test_private(self):
+        rospy.set_param("~interval", 5)
+        self.assertEqual(self.cache.get("~interval"), 5)
+
+    def test_copies(self):
+        rospy.set_param("/test_param_cache/list", [1, 2])
+        self.cache.get("/test_param_cache/list").append(3)
+        self.assertEqual(self.cache.get("/test_param_cache/list"), [1, 2])
+
+
+if __name__ == '__main__':
+    import rostest
+
+    rospy.init_node("test_param_cache", anonymous=True)
+    rostest.rosrun(PKG, 'test_param_cache', TestParamCache)
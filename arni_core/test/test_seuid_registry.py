@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+
+import unittest
+import rospy
+from arni_msgs.msg import SeuidMapping
+from arni_core.seuid_registry import SeuidRegistry, SeuidMappingListener, get_registry
+
+PKG = "arni_core"
+
+
+class TestSeuidRegistry(unittest.TestCase):
+
+    def test_ids(self):
+        registry = SeuidRegistry()
+        self.assertEqual(registry.acquire("n!/a"), 0)
+        self.assertEqual(registry.acquire("n!/b"), 1)
+        self.assertEqual(registry.acquire("n!/a"), 0)
+        self.assertEqual(registry.seuid(1), "n!/b")
+        self.assertEqual(len(registry), 2)
+        self.assertRaises(IndexError, registry.seuid, 2)
+
+    def test_find(self):
+        registry = SeuidRegistry()
+        self.assertIsNone(registry.find("n!/a"))
+        self.assertEqual(len(registry), 0)
+        ident = registry.acquire("n!/a")
+        self.assertEqual(registry.find("n!/a"), ident)
+
+    def test_release(self):
+        registry = SeuidRegistry()
+        a = registry.acquire("n!/a")
+        registry.acquire("n!/a")
+        b = registry.acquire("n!/b")
+        registry.release(a)
+        self.assertEqual(registry.find("n!/a"), a)
+        registry.release(a)
+        self.assertIsNone(registry.find("n!/a"))
+        self.assertRaises(IndexError, registry.seuid, a)
+        self.assertRaises(IndexError, registry.release, a)
+        self.assertEqual(len(registry), 1)
+        # freed ids are reused
+        self.assertEqual(registry.acquire("n!/c"), a)
+        self.assertEqual(registry.seuid(a), "n!/c")
+        self.assertEqual(registry.seuid(b), "n!/b")
+
+    def test_shared(self):
+        self.assertIs(get_registry(), get_registry())
+
+    def test_listener(self):
+        listener = SeuidMappingListener()
+        # deltas are ignored until a complete mapping arrived
+        listener.receive(SeuidMapping("/n", False, 0, ["n!/a"]))
+        self.assertIsNone(listener.seuid("/n", 0))
+        listener.receive(SeuidMapping("/n", True, 0, ["n!/a", "n!/b"]))
+        self.assertEqual(listener.seuid("/n", 1), "n!/b")
+        listener.receive(SeuidMapping("/n", False, 2, ["t!/c"]))
+        self.assertEqual(listener.seuid("/n", 2), "t!/c")
+        self.assertIsNone(listener.seuid("/n", 3))
+        self.assertIsNone(listener.seuid("/other", 0))
+        listener.receive(SeuidMapping("/n", True, 0, ["", "n!/b"]))
+        self.assertIsNone(listener.seuid("/n", 0))
+
+    def test_listener_gap(self):
+        listener = SeuidMappingListener()
+        listener.receive(SeuidMapping("/n", True, 0, ["n!/a"]))
+        # the ids 1 to 4 got lost
+        listener.receive(SeuidMapping("/n", False, 5, ["n!/f"]))
+        self.assertIsNone(listener.seuid("/n", 0))
+        listener.receive(SeuidMapping("/n", True, 0, ["n!/a", "n!/b"]))
+        self.assertEqual(listener.seuid("/n", 0), "n!/a")
+
+
+if __name__ == '__main__':
+    import rostest
+
+    rospy.init_node("test_seuid_registry", anonymous=True)
+    rostest.rosrun(PKG, 'test_seuid_registry', TestSeuidRegistry)
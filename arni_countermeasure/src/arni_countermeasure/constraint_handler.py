@@ -16,6 +16,7 @@ from reaction_stop_node import *
 
 from outcome import *
 import arni_core
+from arni_core.helper import SEUID
 
 import rospy
 import helper
@@ -324,13 +325,13 @@ class ConstraintHandler(object):
             # lets create a leaf (or a list of leafes)
             leaf_list = list()
             # itemtype is not and,or..? must be a leaf
-            seuid = item_type
-
-            # better check if its a seuid
-            if not arni_core.helper.is_seuid(seuid):
+            # better check if its a seuid, the leaves share the parsed identifier
+            try:
+                seuid = SEUID.parse(str(item_type)).identifier
+            except (NameError, UnicodeError):
                 rospy.logwarn(
                     "There is a wrongly formatted seuid '%s'."
-                    % seuid
+                    % item_type
                     + " Found while parsing a constraint.")
                 return None
 
@@ -1,8 +1,10 @@
 from constraint_handler import *
 from rated_statistic_storage import *
 import rospy
-from arni_msgs.msg import RatedStatistics
+from arni_msgs.msg import RatedStatistics, RatedStatisticsNumeric
+from arni_msgs.msg import RatedStatisticsArray, RatedStatisticsNumericArray
 from arni_core.host_lookup import *
+from arni_core import param_cache
 from std_srvs.srv import Empty
 import helper
 import time
@@ -41,13 +43,34 @@ class CountermeasureNode(object):
         self.__register_services()
 
     def __register_subscriber(self):
-        """Register to the rated statistics."""
-        rospy.Subscriber(
-            "/statistics_rated", RatedStatistics,
-            self.__rated_statistic_storage.callback_rated_statistic)
-        rospy.Subscriber(
-            "/statistics_rated", RatedStatistics,
-            HostLookup().callback_rated)
+        """Register to the rated statistics.
+        Uses the numeric format unless the monitoring node
+        only publishes strings and the batched topics if enabled."""
+        if rospy.get_param(
+                "/arni/rated_statistics_format", "both") == "string":
+            topic, msg_type = "/statistics_rated", RatedStatistics
+            array_type = RatedStatisticsArray
+            self.__callback_rated = (self.__rated_statistic_storage.
+                                     callback_rated_statistic)
+        else:
+            topic, msg_type = "/statistics_rated_numeric", RatedStatisticsNumeric
+            array_type = RatedStatisticsNumericArray
+            self.__callback_rated = (self.__rated_statistic_storage.
+                                     callback_rated_statistic_numeric)
+        if rospy.get_param("/arni/rated_statistics_batched", False):
+            rospy.Subscriber(
+                topic + "_array", array_type, self.__callback_rated_array)
+        else:
+            rospy.Subscriber(topic, msg_type, self.__callback_rated)
+            rospy.Subscriber(topic, msg_type, HostLookup().callback_rated)
+
+    def __callback_rated_array(self, msg):
+        """Hand every rated statistic of a batch
+        to the storage and the host lookup."""
+        host_lookup = HostLookup()
+        for rated in msg.rated_statistics:
+            self.__callback_rated(rated)
+            host_lookup.callback_rated(rated)
 
     def __register_services(self):
         """Register all services"""
@@ -90,7 +113,7 @@ class CountermeasureNode(object):
 
     def __callback_enable(self, event):
         """Simple callback to check if statistics are enabled."""
-        self.__enabled = rospy.get_param("/enable_statistics", False)
+        self.__enabled = param_cache.get_param("/enable_statistics", False)
 
     def __init_params(self):
         """Initializes params on the parameter server,
@@ -3,6 +3,7 @@ from outcome import *
 from arni_msgs.msg import RatedStatistics, RatedStatisticsEntity
 import helper
 import time
+from arni_core.seuid_registry import get_registry
 
 
 class RatedStatisticStorage(object):
@@ -17,8 +18,12 @@ class RatedStatisticStorage(object):
         #: A dictionary containing all rated statis tic
         #: information with their outcome and an timestamp
         #: when they got added / updated to the dictionary.
+        #: The seuids are kept by their ids from the SeuidRegistry,
+        #: an id is held while its seuid has an entry.
         self.__statistic_storage = dict()
 
+        self.__ids = get_registry()
+
         #: The timeout after which an item in ratedstatistic
         #: is declared too old and should be removed
         #: from the dict.
@@ -38,15 +43,15 @@ class RatedStatisticStorage(object):
         todelete = list()
 
         # grab all old statistics
-        for seuid in store:
-            for statistic_type in store[seuid]:
-                timestamp = store[seuid][statistic_type][1]
+        for ident in store:
+            for statistic_type in store[ident]:
+                timestamp = store[ident][statistic_type][1]
                 if curtime - timestamp >= self.__timeout:
-                    todelete.append((seuid, statistic_type))
+                    todelete.append((ident, statistic_type))
 
         # remove them
-        for seuid, statistic_type in todelete:
-            self.__remove_item(seuid, statistic_type)
+        for ident, statistic_type in todelete:
+            self.__remove_item(ident, statistic_type)
 
     def callback_rated_statistic(self, msg):
         """Callback for incoming rated statistics.
@@ -60,31 +65,68 @@ class RatedStatisticStorage(object):
         seuid = msg.seuid
 
         for entity in msg.rated_statistics_entity:
-            stat_type = entity.statistic_type
-
             # check if actual value, state, expected value have the same size
             if (len(entity.actual_value) == len(entity.state)
                     and
                     len(entity.actual_value) == len(entity.expected_value)):
-
-                # its not an array, so treat it differently
-                if len(entity.actual_value) == 1:
-                    self.__add_single_outcome(
-                        seuid, stat_type,
-                        ord(entity.state[0]), msg.window_stop)
-                else:
-                    # split the array in a lot of entries
-                    for i in range(len(entity.actual_value)):
-                        self.__add_single_outcome(
-                            seuid, "%s_%d" % (stat_type, i),
-                            ord(entity.state[i]),
-                            msg.window_stop)
+                self.__add_entity(seuid, entity, msg.window_stop)
             else:
                 rospy.logwarn(
                     "Inconsistency in received data packet: actual_value, "
                     + "expected_value, state have to have the same size."
                     + " Happened in a rated msg  of type %s from %s"
-                    % (stat_type, seuid))
+                    % (entity.statistic_type, seuid))
+
+    def callback_rated_statistic_numeric(self, msg):
+        """Callback for incoming rated statistics in the numeric format.
+        Behaves like callback_rated_statistic.
+
+        :param msg: The rated statistic to be added to the storage.
+        :type msg:  RatedStatisticsNumeric
+        """
+        seuid = msg.seuid
+
+        for entity in msg.rated_statistics_entity:
+            # check if actual value, state and bounds have the same size
+            if (len(entity.actual_value) == len(entity.state)
+                    and
+                    len(entity.actual_value) == len(entity.lower_bound)
+                    and
+                    len(entity.actual_value) == len(entity.upper_bound)):
+                self.__add_entity(seuid, entity, msg.window_stop)
+            else:
+                rospy.logwarn(
+                    "Inconsistency in received data packet: actual_value, "
+                    + "lower_bound, upper_bound, state have to have the same size."
+                    + " Happened in a rated msg  of type %s from %s"
+                    % (entity.statistic_type, seuid))
+
+    def __add_entity(self, seuid, entity, timestamp):
+        """Add the outcomes of a rated statistics entity to the storage.
+
+        :param seuid:   The seuid from the entity.
+        :type seuid:    string
+
+        :param entity:  The entity with the states to add.
+        :type entity:   RatedStatisticsEntity or RatedStatisticsNumericEntity
+
+        :param timestamp:   The time when this outcome was send.
+        :type timestamp:    rospy.Time
+        """
+        stat_type = entity.statistic_type
+
+        # its not an array, so treat it differently
+        if len(entity.actual_value) == 1:
+            self.__add_single_outcome(
+                seuid, stat_type,
+                ord(entity.state[0]), timestamp)
+        else:
+            # split the array in a lot of entries
+            for i in range(len(entity.actual_value)):
+                self.__add_single_outcome(
+                    seuid, "%s_%d" % (stat_type, i),
+                    ord(entity.state[i]),
+                    timestamp)
 
     def __add_single_outcome(
             self, seuid, statistic_type, outcome, timestamp):
@@ -105,11 +147,10 @@ class RatedStatisticStorage(object):
         """
         # thats just too long..
         store = self.__statistic_storage
-        if seuid not in store:
-            store[seuid] = dict()
+        ident = self.__ids.find(seuid)
 
         # the dictionary for a specific entity having the specified entity
-        entity_dict = store[seuid]
+        entity_dict = store.get(ident, {})
 
         # check if there is an entry thats newer:
         if (
@@ -117,6 +158,9 @@ class RatedStatisticStorage(object):
                 entity_dict[statistic_type][1] < timestamp)) and (
                 rospy.Time.now() - timestamp < self.__timeout)):
 
+            if ident not in store:
+                ident = self.__ids.acquire(seuid)
+                store[ident] = entity_dict
             entity_dict[statistic_type] = outcome, timestamp
 
     def get_outcome(self, seuid, statistic_type):
@@ -140,8 +184,9 @@ class RatedStatisticStorage(object):
                                 entering the outcome into the storage.
 
         """
+        ident = self.__ids.find(seuid)
         try:
-            type_dict = self.__statistic_storage[seuid]
+            type_dict = self.__statistic_storage[ident]
             outTuple = type_dict[statistic_type]
 
             outcome = outTuple[0]
@@ -149,7 +194,7 @@ class RatedStatisticStorage(object):
 
             # check if the item is too old
             if rospy.get_rostime() - timestamp >= self.__timeout:
-                self.__remove_item(seuid, statistic_type)
+                self.__remove_item(ident, statistic_type)
                 return Outcome.UNKNOWN
 
             elif Outcome.is_valid(outcome):
@@ -159,11 +204,11 @@ class RatedStatisticStorage(object):
         except KeyError:
             return Outcome.UNKNOWN
 
-    def __remove_item(self, seuid, statistic_type):
+    def __remove_item(self, ident, statistic_type):
         """Remove an statistic_type from an entity from the storage.
 
-        :param seuid:   The seuid of the entity.
-        :type seuid:    string
+        :param ident:   The id of the entity's seuid.
+        :type ident:    int
 
         :param statistic_type:  The type to be removed.
         :type statistic_type:   string
@@ -172,7 +217,10 @@ class RatedStatisticStorage(object):
                             in the storage.
         """
         try:
-            del self.__statistic_storage[seuid][statistic_type]
+            del self.__statistic_storage[ident][statistic_type]
+            if not self.__statistic_storage[ident]:
+                del self.__statistic_storage[ident]
+                self.__ids.release(ident)
         except KeyError:
             rospy.logdebug(
                 "Tried to delete"
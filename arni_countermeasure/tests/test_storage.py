@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 import unittest
 from arni_countermeasure.rated_statistic_storage import *
+from arni_msgs.msg import RatedStatisticsNumeric, RatedStatisticsNumericEntity
 from rosgraph_msgs.msg import Clock
 from arni_countermeasure.outcome import *
 import rospy
@@ -116,6 +117,29 @@ class TestStorage(unittest.TestCase):
         self.assertEqual(
             store.get_outcome("n!node", "ram_usage_max"), Outcome.LOW)
 
+    def test_callback_numeric(self):
+        """Test a callback with a numeric rated statistic."""
+        TestStorage.set_timeout(20)
+        TestStorage.set_time(100)
+        store = RatedStatisticStorage()
+        entity = RatedStatisticsNumericEntity()
+        entity.statistic_type = "ram_usage_mean"
+        entity.actual_value = [20.0, 40.0]
+        entity.lower_bound = [30.0, 10.0]
+        entity.upper_bound = [50.0, 30.0]
+        entity.state = [chr(Outcome.LOW), chr(Outcome.HIGH)]
+        msg = RatedStatisticsNumeric()
+        msg.seuid = "n!node"
+        msg.window_start = rospy.Time(99)
+        msg.window_stop = rospy.Time(100)
+        msg.rated_statistics_entity = [entity]
+        store.callback_rated_statistic_numeric(msg)
+
+        self.assertEqual(
+            store.get_outcome("n!node", "ram_usage_mean_0"), Outcome.LOW)
+        self.assertEqual(
+            store.get_outcome("n!node", "ram_usage_mean_1"), Outcome.HIGH)
+
     @classmethod
     def _gen_entity(TestStorage, statistic_type, value, outcome):
         msgEntity = RatedStatisticsEntity()
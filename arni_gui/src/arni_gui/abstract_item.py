@@ -6,7 +6,7 @@ from rospy.rostime import Duration, Time
 from python_qt_binding.QtCore import QTranslator, QObject
 
 from helper_functions import prepare_number_for_representation, topic_statistics_state_to_string, \
-    ALIVE_TIMER_CALLBACK, MAXIMUM_OFFLINE_TIME, WARNING_TIMEOUT
+    numeric_entity_to_values, ALIVE_TIMER_CALLBACK, MAXIMUM_OFFLINE_TIME, WARNING_TIMEOUT
 
 
 class AbstractItem(QObject):
@@ -182,7 +182,7 @@ class AbstractItem(QObject):
         Appends data to the rated_data of the AbstractItem.
 
         :param data: the data to append in key value form
-        :type data: RatedStatistics
+        :type data: RatedStatistics or RatedStatisticsNumeric
         :raises KeyError: if an entry is in the rated dictionary but not found in the message
         """
         self._rated_data_lock.acquire()
@@ -194,8 +194,12 @@ class AbstractItem(QObject):
         new_state = "unknown"
 
         for element in data.rated_statistics_entity:
-            self._rated_data[element.statistic_type + ".actual_value"].append(element.actual_value)
-            self._rated_data[element.statistic_type + ".expected_value"].append(element.expected_value)
+            if hasattr(element, "lower_bound"):
+                actual_value, expected_value = numeric_entity_to_values(element)
+            else:
+                actual_value, expected_value = element.actual_value, element.expected_value
+            self._rated_data[element.statistic_type + ".actual_value"].append(actual_value)
+            self._rated_data[element.statistic_type + ".expected_value"].append(expected_value)
 
             for i in range(0, len(element.state)):
                 state = topic_statistics_state_to_string(element, element.state[i])
@@ -631,7 +635,7 @@ class AbstractItem(QObject):
                             self._rated_data["alive.actual_value"][-1][0]) + "</span>" + \
                                    "<br>"
                         content += self.tr("alive expected_value:") + \
-                                   " <span class=\"erroneous_entry\">" + str(
+                                   " <span class=\"erroneous_entry\">" + prepare_number_for_representation(
                             self._rated_data["alive.expected_value"][-1][0]) + "</span>" + \
                                    "<br>"
                         content += self.tr("alive state:") + \
@@ -649,7 +653,7 @@ class AbstractItem(QObject):
                                        self.tr(entry + "_unit") + "<br>"
                             content += self.tr(entry) + \
                                        self.tr(" expected_value:") + \
-                                       " <span class=\"erroneous_entry\">" + str(
+                                       " <span class=\"erroneous_entry\">" + prepare_number_for_representation(
                                 self._rated_data[entry + ".expected_value"][-1][0]) + "</span> " + \
                                        self.tr(entry + "_unit") + "<br>"
                             content += self.tr(entry) + \
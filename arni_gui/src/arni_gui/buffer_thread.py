@@ -8,14 +8,16 @@ from rospy.impl.tcpros_service import ServiceProxy
 from rospy.service import ServiceException
 from rosgraph_msgs.msg import TopicStatistics
 
-from arni_msgs.msg import RatedStatistics
+from arni_msgs.msg import RatedStatistics, RatedStatisticsNumeric
+from arni_msgs.msg import RatedStatisticsArray, RatedStatisticsNumericArray
 from arni_msgs.msg import NodeStatistics
 from arni_msgs.msg import HostStatistics
-from arni_msgs.srv import StatisticHistory
-from arni_msgs.msg import MasterApi
+from arni_msgs.srv import StatisticHistory, StatisticHistoryPage
+from arni_msgs.msg import MasterApi, MasterApiDelta
+from arni_core.master_api import MasterApiDecoder, TOPIC as MASTER_API_TOPIC, DELTA_TOPIC as MASTER_API_DELTA_TOPIC
 
 from ros_model import *
-from helper_functions import UPDATE_FREQUENCY
+from helper_functions import UPDATE_FREQUENCY, HISTORY_PAGE_SIZE, MAXIMUM_AMOUNT_OF_ENTRIES
 
 
 class BufferThread(Thread):
@@ -39,6 +41,7 @@ class BufferThread(Thread):
         self.__running = False
         self.__model = model
         self.__master_api_data = None
+        self.__master_api_decoder = MasterApiDecoder()
         self.__data_lock = Lock()
 
 
@@ -61,6 +64,42 @@ class BufferThread(Thread):
     def __get_history(self):
         """
         For fetching the history from the monitoring_node.
+        The history is fetched in pages, newest first, until it is exhausted or the model would be full anyway.
+        """
+        try:
+            rospy.wait_for_service('monitoring_node/get_statistic_history_page', timeout=1)
+        except rospy.ROSException:
+            self.__get_full_history()
+            return
+        try:
+            get_statistic_history_page = rospy.ServiceProxy('monitoring_node/get_statistic_history_page',
+                                                            StatisticHistoryPage)
+            rated, topic, host, node = [], [], [], []
+            cursor = ""
+            while len(topic) + len(host) + len(node) < MAXIMUM_AMOUNT_OF_ENTRIES:
+                response = get_statistic_history_page("", rospy.Time(0), rospy.Time(0), HISTORY_PAGE_SIZE, cursor)
+                rated += response.rated_topic_statistics + response.rated_node_statistics + \
+                    response.rated_host_statistics + response.rated_topics
+                topic += response.topic_statistics
+                host += response.host_statistics
+                node += response.node_statistics
+                cursor = response.next_cursor
+                if not cursor:
+                    break
+            # pages arrive newest first but the items expect their data in chronological order
+            self.__rated_statistics_buffer = rated[::-1]
+            self.__topic_statistics_buffer = topic[::-1]
+            self.__host_statistics_buffer = host[::-1]
+            self.__node_statistics_buffer = node[::-1]
+            self.__update_model(None)
+        except ServiceException as msg:
+            self.__model.get_logger().log("info", Time.now(), "BufferThread",
+                                          "get_statistic_history_page is not available, probably monitoring_node is "
+                                          "not running. Will continue without the information about the past")
+
+    def __get_full_history(self):
+        """
+        For fetching the whole history at once from monitoring_nodes without paging support.
         """
         try:
             get_statistic_history = rospy.ServiceProxy('monitoring_node/get_statistic_history', StatisticHistory)
@@ -82,9 +121,19 @@ class BufferThread(Thread):
         """
         Registers to the services needed to get fresh data.
         """
-        rospy.Subscriber(
-            "/statistics_rated", RatedStatistics,
-            self.__add_rated_statistics_item)
+        if rospy.get_param("/arni/rated_statistics_format", "both") == "string":
+            topic, msg_type, array_type = "/statistics_rated", RatedStatistics, RatedStatisticsArray
+        else:
+            topic, msg_type, array_type = "/statistics_rated_numeric", RatedStatisticsNumeric, \
+                RatedStatisticsNumericArray
+        if rospy.get_param("/arni/rated_statistics_batched", False):
+            rospy.Subscriber(
+                topic + "_array", array_type,
+                self.__add_rated_statistics_items)
+        else:
+            rospy.Subscriber(
+                topic, msg_type,
+                self.__add_rated_statistics_item)
         rospy.Subscriber(
             "/statistics", TopicStatistics,
             self.__add_topic_statistics_item)
@@ -94,15 +143,19 @@ class BufferThread(Thread):
         rospy.Subscriber(
             "/statistics_host", HostStatistics,
             self.__add_host_statistics_item)
-        rospy.Subscriber('/statistics_master', MasterApi, self.receive_master_api_data)
+        if rospy.get_param("/arni/master_api_delta", False):
+            rospy.Subscriber(MASTER_API_DELTA_TOPIC, MasterApiDelta, self.receive_master_api_data)
+        else:
+            rospy.Subscriber(MASTER_API_TOPIC, MasterApi, self.receive_master_api_data)
 
 
     def receive_master_api_data(self, data):
         """
-        Topic callback for incoming master api messages.
+        Topic callback for incoming master api messages. Applies the changes to the system state.
         """
         self.__data_lock.acquire()
-        self.__master_api_data = data
+        if self.__master_api_decoder.apply(data):
+            self.__master_api_data = self.__master_api_decoder.to_msg()
         self.__data_lock.release()
 
     def __update_model(self, event):
@@ -119,13 +172,25 @@ class BufferThread(Thread):
         Adds the item to the buffer list. Will be called whenever data from the topics is available.
 
         :param item: the item which will be added to the buffer
-        :type item: RatedStatistics
+        :type item: RatedStatistics or RatedStatisticsNumeric
         """
         self.__data_lock.acquire()
         self.__rated_statistics_buffer.append(item)
         self.__data_lock.release()
 
 
+    def __add_rated_statistics_items(self, items):
+        """
+        Adds all rated statistics of a batch to the buffer list.
+
+        :param items: the batch of items which will be added to the buffer
+        :type items: RatedStatisticsArray or RatedStatisticsNumericArray
+        """
+        self.__data_lock.acquire()
+        self.__rated_statistics_buffer.extend(items.rated_statistics)
+        self.__data_lock.release()
+
+
     def __add_topic_statistics_item(self, item):
         """
         Adds the item to the buffer list. Will be called whenever data from the topics is available.
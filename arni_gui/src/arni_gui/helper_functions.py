@@ -1,4 +1,5 @@
 import time
+import math
 import genpy
 
 import pyqtgraph as pg
@@ -53,6 +54,11 @@ Defines how long warning will be displayed after an error occured.
 """
 WARNING_TIMEOUT = 5
 
+"""
+The amount of statistics fetched per call when loading the history from the monitoring_node.
+"""
+HISTORY_PAGE_SIZE = 500
+
 """
 The amount of digits to which the GUI typically rounds. Might not be used everywhere yet.
 """
@@ -191,6 +197,29 @@ def topic_statistics_state_to_string(element, state):
             return "unknown"
     raise TypeError("the state of the element is None or not known")
     
+def numeric_entity_to_values(element):
+    """
+    Converts the values of a RatedStatisticsNumericEntity to the form of a RatedStatisticsEntity.
+    Expected values become [lower, upper] lists, None if unknown. Alive values become "True" or "False".
+
+    :param element: the numeric entity
+    :type element: RatedStatisticsNumericEntity
+    :returns: a tuple of the actual values and the expected values
+    :rtype: tuple
+    """
+    expected_value = []
+    for lower, upper in zip(element.lower_bound, element.upper_bound):
+        if math.isnan(lower) or math.isnan(upper):
+            expected_value.append(None)
+        else:
+            expected_value.append([lower, upper])
+    actual_value = list(element.actual_value)
+    if element.statistic_type == "alive":
+        actual_value = [str(bool(value)) for value in actual_value]
+        expected_value = [str(bool(value[0])) if value is not None else None for value in expected_value]
+    return actual_value, expected_value
+
+
 ## CARSON ADDED
 def change_number_exp(old_exp, new_exp, number):
     exponent = old_exp - new_exp
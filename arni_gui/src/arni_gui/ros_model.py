@@ -19,8 +19,10 @@ import rosgraph.impl.graph
 import rosgraph.masterapi
 from rosgraph_msgs.msg import TopicStatistics
 
-from arni_core.host_lookup import HostLookup
-from arni_core.helper import SEUID, SEUID_DELIMITER, generate_seuids_from_master_api_data
+from arni_core.host_lookup import HostLookup, PENDING
+from arni_core.helper import SEUID, SEUID_DELIMITER
+from arni_core.master_api import ConnectionTracker
+from arni_core.seuid_registry import get_registry
 from arni_core.singleton import Singleton
 
 import arni_msgs
@@ -47,6 +49,9 @@ from helper_functions import UPDATE_FREQUENCY, MAXIMUM_AMOUNT_OF_ENTRIES, MINIMU
 
 _ROS_NAME = ''
 
+#: the key of the root item in the identifier dict, the SeuidRegistry assigns no negative ids
+_ROOT_KEY = -1
+
 
 class QAbstractItemModelSingleton(Singleton, type(QAbstractItemModel)):
     """
@@ -98,7 +103,9 @@ class ROSModel(QAbstractItemModel):
         TreeConnectionItems where the identifier_dict only contains the connectionitem. This allows to push
         data into one item but to show it at two places in the Qt GUI.
         """
-        self.__identifier_dict = {"root": self.__root_item}
+        self.__ids = get_registry()
+        #: the items by the ids of their seuids, the ids are held as long as the model lives
+        self.__identifier_dict = {_ROOT_KEY: self.__root_item}
         self.__item_delegate = SizeDelegate()
 
         # CAUTION: Do not change this mapping if not absolutely necessary. If you change it remember to change
@@ -113,9 +120,15 @@ class ROSModel(QAbstractItemModel):
         self.__last_time_error_occured = 0
         self.__logger.log("info", Time.now(), "ROSModel", "ROSModel initialization finished")
 
-        self.__seuid_helper = SEUID()
+        self.__master_connections = ConnectionTracker()
 
         self.__find_host = HostLookup()
+        #: seuids which could not be added because the host of one of their nodes was being looked up
+        self.__deferred_seuids = set()
+        #: set by the lookup threads when a host lookup completed
+        self.__hosts_resolved = False
+        #: set when adding an item had to wait for a host lookup
+        self.__lookup_pending = False
 
         self.__buffer_thread = BufferThread(self)
         self.__buffer_thread.start()
@@ -345,6 +358,12 @@ class ROSModel(QAbstractItemModel):
             if master_api_data is not None:
                 self.__transform_master_api_data(master_api_data)
 
+            if self.__hosts_resolved:
+                self.__hosts_resolved = False
+                deferred, self.__deferred_seuids = self.__deferred_seuids, set()
+                for seuid in deferred:
+                    self.__add_or_defer(seuid)
+
             # rating last because it needs the time of the items before
             for item in rated_statistics:
                 self.__transform_rated_statistics_item(item)
@@ -481,15 +500,16 @@ class ROSModel(QAbstractItemModel):
         """
         # get identifier
         seuid = item.seuid
+        ident = self.__ids.find(seuid)
         if item.seuid == "t!/image_raw":
-            tmp = self.__identifier_dict[seuid]
+            tmp = self.__identifier_dict[ident]
             for i in range(0, len(item.rated_statistics_entity)):
                 if item.rated_statistics_entity[i].statistic_type == "frequency":
                     print(item.rated_statistics_entity[i].actual_value)
                     print(tmp.get_latest_data()["frequency"])
 
         # check if avaiable
-        if seuid not in self.__identifier_dict:
+        if ident not in self.__identifier_dict:
             # having a problem, item doesn't exist but should not be created here
             self.__logger.log("Warning", Time.now(), "RosModel", "A rating was received for an item the gui does not "
                                                                  "know about. This typically means a dead node/ host "
@@ -497,7 +517,7 @@ class ROSModel(QAbstractItemModel):
                                                                  "startup you can typically ignore it. ")
         else:
             # update it
-            current_item = self.__identifier_dict[seuid]
+            current_item = self.__identifier_dict[ident]
             current_item.update_rated_data(item)
 
     def __transform_master_api_data(self, master_api_data):
@@ -507,12 +527,36 @@ class ROSModel(QAbstractItemModel):
         any data.
         :type master_api_data: MasterApi
         """
-        # pubs, subs, srvs = master_api_data.pubs, master_api_data.subs, master_api_data.srvs
+        # items are never removed from the model, so only the new connections have to be added
+        added, removed = self.__master_connections.update(master_api_data)
+
+        # look up the hosts of all new nodes at once instead of one after the other
+        nodes = set()
+        for seuid in added:
+            parts = seuid.split(SEUID_DELIMITER)
+            nodes.add(parts[1])
+            nodes.add(parts[3])
+        self.__find_host.resolve(nodes, self.__host_resolved)
+
+        for seuid in added:
+            self.__add_or_defer(seuid)
+
+    def __add_or_defer(self, seuid):
+        """
+        Adds the item of a seuid or remembers it to be added once the pending host lookups completed.
 
-        seuids = generate_seuids_from_master_api_data(master_api_data)
+        :param seuid: the seuid of the item
+        :type seuid: str
+        """
+        self.__lookup_pending = False
+        if self.get_or_add_item_by_seuid(seuid) is None and self.__lookup_pending:
+            self.__deferred_seuids.add(seuid)
 
-        for seuid in seuids:
-            self.get_or_add_item_by_seuid(seuid)
+    def __host_resolved(self, node, host):
+        """
+        Called by HostLookup from its lookup threads, the deferred items are added with the next update.
+        """
+        self.__hosts_resolved = True
 
     def __transform_topic_statistics_item(self, item):
         """
@@ -521,8 +565,7 @@ class ROSModel(QAbstractItemModel):
         :param item: the TopicStatistics item
         :type item: TopicStatistics
         """
-        topic_seuid = self.__seuid_helper.from_message(item)
-        connection_seuid = self.__seuid_helper.from_message(item)
+        connection_seuid = SEUID.parse(item).identifier
 
         connection_item = self.get_or_add_item_by_seuid(connection_seuid)
         if connection_item is not None:
@@ -535,7 +578,9 @@ class ROSModel(QAbstractItemModel):
         :param item: the NodeStatistics item
         :type item: NodeStatistics
         """
-        node_seuid = self.__seuid_helper.from_message(item)
+        node_seuid = SEUID.parse(item).identifier
+        # the message tells the host of the node, no need to ask the master
+        self.__find_host.add_node(item.node, item.host)
         node_item = self.get_or_add_item_by_seuid(node_seuid)
         if node_item is not None:
             node_item.append_data(item)
@@ -547,7 +592,7 @@ class ROSModel(QAbstractItemModel):
         :param item: the HostStatistics item
         :type item: HostStatistics
         """
-        host_seuid = self.__seuid_helper.from_message(item)
+        host_seuid = SEUID.parse(item).identifier
         host_item = self.get_or_add_item_by_seuid(host_seuid)
         host_item.append_data(item)
 
@@ -608,7 +653,8 @@ class ROSModel(QAbstractItemModel):
         """
         if seuid is None:
             raise UserWarning("seuid was None!")
-        if seuid not in self.__identifier_dict or seuid[0] is 't':
+        ident = self.__ids.find(seuid)
+        if ident not in self.__identifier_dict or seuid[0] is 't':
             parent = None
             item = None
             if seuid[0] == "h":
@@ -619,14 +665,18 @@ class ROSModel(QAbstractItemModel):
             elif seuid[0] == "n":
                 # does host exist
                 # call helper to get the host
-                node = self.__seuid_helper.get_field("n", seuid)
-                host = self.__find_host.get_host(node)
-                if host is None:
+                node = SEUID.parse(seuid).node
+                host = self.__find_host.lookup(node, self.__host_resolved)
+                if host is PENDING:
+                    # added once the host is known
+                    self.__lookup_pending = True
+                    item = None
+                elif host is None:
                     self.__logger.log("Warning", Time.now(), "RosModel", "The node " + node + " does probably no longer"
                                       " exist (Cannot find its host). Therefore it was not added to the GUI.")
                     item = None
                 else:
-                    host_seuid = self.__seuid_helper.from_string("h", host)
+                    host_seuid = "h" + SEUID_DELIMITER + host
                     parent = self.get_or_add_item_by_seuid(host_seuid)
                     if parent is None:
                         return None
@@ -637,14 +687,14 @@ class ROSModel(QAbstractItemModel):
                     raise UserWarning("node was empty - topic does not know its parent!")
                 else:
                     # use node information - first add publisher
-                    node_seuid = self.__seuid_helper.from_string("n", node1)
+                    node_seuid = "n" + SEUID_DELIMITER + node1
                     parent = self.get_or_add_item_by_seuid(node_seuid)
                     if parent is None:
                         return None
-                    if seuid not in self.__identifier_dict:
+                    if ident not in self.__identifier_dict:
                         item = TopicItem(self.__logger, seuid, None, parent)
                     else:
-                        item = self.__identifier_dict[seuid]
+                        item = self.__identifier_dict[ident]
 
                     found = False
                     for child in parent.get_childs():
@@ -656,7 +706,7 @@ class ROSModel(QAbstractItemModel):
                         parent.append_child(topic_item1)
                         item.tree_items.append(topic_item1)
 
-                    node_seuid = self.__seuid_helper.from_string("n", node2)
+                    node_seuid = "n" + SEUID_DELIMITER + node2
                     parent = self.get_or_add_item_by_seuid(node_seuid)
                     if parent is None:
                         return None
@@ -672,12 +722,13 @@ class ROSModel(QAbstractItemModel):
                         item.tree_items.append(topic_item2)
 
             elif seuid[0] == "c":
-                topic_seuid = self.__seuid_helper.from_string("t", self.__seuid_helper.get_field("t", seuid))
-                if self.__seuid_helper.publisher is None:
+                connection = SEUID.parse(seuid)
+                topic_seuid = "t" + SEUID_DELIMITER + connection.topic
+                if connection.publisher is None:
                     raise UserWarning()
                 # getting back the logical parent - a TopicItem
-                pub = self.__seuid_helper.publisher
-                sub = self.__seuid_helper.subscriber
+                pub = connection.publisher
+                sub = connection.subscriber
                 parent = self.get_or_add_item_by_seuid(topic_seuid, pub, sub)
                 if parent is None:
                     return None
@@ -687,18 +738,18 @@ class ROSModel(QAbstractItemModel):
                 found = 0
                 for tree_item in parent.tree_items:
                     # item is a TreeTopicItem
-                    if tree_item.parent().seuid == self.__seuid_helper.from_string("n", pub):
+                    if tree_item.parent().seuid == "n" + SEUID_DELIMITER + pub:
                         found += 1
                         tree_item.tree_item1 = TreeConnectionItem(tree_item, item, False)
                         tree_item.append_child(tree_item.tree_item1)
-                    if tree_item.parent().seuid == self.__seuid_helper.from_string("n", sub):
+                    if tree_item.parent().seuid == "n" + SEUID_DELIMITER + sub:
                         found += 1
                         tree_item.tree_item2 = TreeConnectionItem(tree_item, item, True)
                         tree_item.append_child(tree_item.tree_item2)
                 if found != 2:
                     raise UserWarning()
-            if item is not None:
-                self.__identifier_dict[seuid] = item
+            if item is not None and ident not in self.__identifier_dict:
+                self.__identifier_dict[self.__ids.acquire(seuid)] = item
             return item
         else:
-            return self.__identifier_dict[seuid]
+            return self.__identifier_dict[ident]
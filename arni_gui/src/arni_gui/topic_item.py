@@ -8,6 +8,7 @@ from helper_functions import prepare_number_for_representation, bytes_to_kb, \
     UPDATE_FREQUENCY, TOPIC_AGGREGATION_FREQUENCY, \
     ROUND_DIGITS, MAXIMUM_OFFLINE_TIME
 from arni_core.helper import SEUID, SEUID_DELIMITER
+from arni_core import param_cache
 from node_item import NodeItem
 
 from rospy.timer import Timer
@@ -70,7 +71,7 @@ class TopicItem(AbstractItem):
         self.__timer = Timer(Duration(nsecs=TOPIC_AGGREGATION_FREQUENCY), self.__aggregate_topic_data)
 
         self.tree_items = []
-        self.__aggregation_window = rospy.get_param("~aggregation_window", 5)
+        self.__aggregation_window = param_cache.get_param("~aggregation_window", 5)
         
         ### CARSON ADDED ###o
         self.throttle = None
@@ -110,15 +111,9 @@ class TopicItem(AbstractItem):
             # item.
             seuid = parent.get_seuid()
 
-            seuid_helper = SEUID()
-            seuid_helper.identifier = seuid
-            seuid_helper.set_fields()
-            node = seuid_helper.node
+            node = SEUID.parse(seuid).node
             for child in self.get_childs():
-                child_seuid = child.get_seuid()
-                seuid_helper.identifier = child_seuid
-                seuid_helper.set_fields()
-                node_comp = seuid_helper.publisher
+                node_comp = SEUID.parse(child.get_seuid()).publisher
                 # do the check on the publisher
                 if node == node_comp:
                     # match.
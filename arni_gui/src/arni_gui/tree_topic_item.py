@@ -220,15 +220,9 @@ class TreeTopicItem(QObject):
             # item.
             seuid = parent.get_seuid()
 
-            seuid_helper = SEUID()
-            seuid_helper.identifier = seuid
-            seuid_helper.set_fields()
-            node = seuid_helper.node
+            node = SEUID.parse(seuid).node
             for child in self.get_childs():
-                child_seuid = child.get_seuid()
-                seuid_helper.identifier = child_seuid
-                seuid_helper.set_fields()
-                node_comp = seuid_helper.publisher
+                node_comp = SEUID.parse(child.get_seuid()).publisher
                 # do the check on the publisher
                 if node == node_comp:
                     # match.
@@ -8,8 +8,9 @@ from arni_msgs.msg import HostStatistics
 from arni_msgs.srv import NodeReaction
 import xmlrpclib
 import socket
-import rosnode
 import rospy
+from arni_core import param_cache
+from arni_core.master_graph import get_master_graph
 import sys
 import threading
 
@@ -53,6 +54,8 @@ class HostStatisticsHandler(StatisticsHandler):
         self.__register_service()
         self.__lock = threading.Lock()
         self.__dict_lock = threading.Lock()
+        #: the nodes of all hosts, shared with the monitoring node instead of polling the master
+        self.__master_graph = get_master_graph()
 
         self.pub = rospy.Publisher('/statistics_host', HostStatistics, queue_size=500)
         #: Used to store information about the host's status.
@@ -299,33 +302,28 @@ class HostStatisticsHandler(StatisticsHandler):
             pass
 
         if self.__is_enabled:
-            nodes = []
-            for node_name in rosnode.get_node_names():
-                try:
-                    node_api = rosnode.get_api_uri(rospy.get_master(), node_name, skip_cache=True)
-                    if self._id in node_api[2]:
-                        nodes.append(node_name)
-                except :
-                    pass
-
-            for node in nodes:
-                if node not in self.__node_list:
-                    """TODO currently not catching the exception here - master not running is a hard error so it does
-                    not make sense to continue running.."""
-                    node_api = rosnode.get_api_uri(rospy.get_master(), node, skip_cache=True)
-
+            try:
+                node_infos = self.__master_graph.nodes(self._id)
+            except Exception as e:
+                rospy.logwarn("could not get the nodes from the master: %s" % e)
+                return
+            nodes = [info.name for info in node_infos]
+
+            for info in node_infos:
+                if info.name not in self.__node_list:
                     try:
-                        pid = self.get_node_pid(node_api, node)
+                        # the pid is known if the monitoring node looked it up
+                        pid = info.pid or self.get_node_pid(info.uri, info.name)
                         if not pid:
                             continue
                         node_process = psutil.Process(pid)
                         new_node = NodeStatisticsHandler(
-                            self._id, node, node_process)
+                            self._id, info.name, node_process)
                         self.__dict_lock.acquire(True)
-                        self.__node_list[node] = new_node
+                        self.__node_list[info.name] = new_node
                         self.__dict_lock.release()
                     except psutil.NoSuchProcess:
-                        rospy.loginfo('pid of node %s could not be fetched' % node)
+                        rospy.loginfo('pid of node %s could not be fetched' % info.name)
                         continue
 
             self.__dict_lock.acquire()
@@ -343,14 +341,14 @@ class HostStatisticsHandler(StatisticsHandler):
         Use the xmlrpclib Server Proxy to get
         node- pid
         :param node_api: API URI used for ServerProxy
-        :type node_api: list
+        :type node_api: string
         :param node:  name of the node
         :type node: string
         """
         socket.setdefaulttimeout(1)
         try:
             code, msg, pid = xmlrpclib.ServerProxy(
-                node_api[2]).getPid('/NODEINFO')
+                node_api).getPid('/NODEINFO')
 
             return pid
         except socket.error:
@@ -402,7 +400,7 @@ class HostStatisticsHandler(StatisticsHandler):
         """
         #rospy.logdebug('checking if enable_statistics is true')
         try:
-            self.__is_enabled = rospy.get_param('/enable_statistics', False)
+            self.__is_enabled = param_cache.get_param('/enable_statistics', False)
         except:
             pass
         #rospy.logdebug('enable_statistics is %s' % self.__is_enabled)
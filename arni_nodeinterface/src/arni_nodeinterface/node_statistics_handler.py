@@ -5,6 +5,7 @@ from rosgraph_msgs.msg import TopicStatistics
 import psutil
 import subprocess
 import rospy
+from arni_core import param_cache
 
 
 class NodeStatisticsHandler(StatisticsHandler):
@@ -28,8 +29,8 @@ class NodeStatisticsHandler(StatisticsHandler):
 
         self.__node_process = node_process
         self.pub = rospy.Publisher('/statistics_node', NodeStatistics, queue_size=2)
-        self.update_interval = rospy.get_param('~publish_interval', 10) /\
-            float(rospy.get_param('~window_max_elements', 10))
+        self.update_interval = param_cache.get_param('~publish_interval', 10) /\
+            float(param_cache.get_param('~window_max_elements', 10))
         self.register_subscriber()
         self.__write_base = self.__node_process.io_counters().write_bytes
         self.__read_base = self.__node_process.io_counters().read_bytes
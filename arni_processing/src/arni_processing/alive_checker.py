@@ -0,0 +1,251 @@
+import heapq
+import threading
+import rospy
+from arni_core.seuid_registry import get_registry
+
+
+class AliveChecker:
+    """
+    Tracks when messages of a seuid arrived last and finds the seuids whose messages stopped arriving.
+
+    Every tracked seuid has one valid entry in a priority queue ordered by the time it becomes overdue.
+    Reporting a seuid only updates its last arrival, its entry is moved when it comes up in the queue.
+    Checking therefore only touches the expired and refreshed entries. The seuids are kept by the ids the process
+    wide SeuidRegistry assigns to them, an id is held while its seuid is tracked.
+
+    A held seuid, e.g. a connection known to the master, is alive until it is released and has no entry in the
+    queue meanwhile.
+    """
+
+    def __init__(self, timeout_for, forget_after=None):
+        """
+        Creates an empty checker.
+
+        :param timeout_for: Called with a seuid the first time it is reported, returns its rospy.Duration timeout.
+            It is called without holding the lock of the checker.
+        :type timeout_for: callable
+        :param forget_after: Seuids which are not permanent are no longer tracked once they did not arrive for
+            their timeout plus this duration. None keeps them forever.
+        :type forget_after: rospy.Duration
+        """
+        self.__timeout_for = timeout_for
+        self.__forget_after = forget_after
+        self.__lock = threading.Lock()
+        self.__ids = get_registry()
+        #: the deadline queue with (deadline, seuid id) tuples
+        self.__deadlines = []
+        #: seuid id -> [last arrival, timeout, permanent, deadline of its entry in the queue, held]
+        self.__entries = {}
+        #: ids of the seuids which are overdue, they are reported on every check until they arrive again
+        self.__expired = set()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def set_timeout(self, seuid, timeout, permanent=True, now=None):
+        """
+        Sets the timeout of a seuid and starts tracking it if it is not tracked yet.
+
+        :param seuid: The seuid.
+        :type seuid: str
+        :param timeout: The time after which the seuid is overdue.
+        :type timeout: rospy.Duration
+        :param permanent: Whether the seuid is tracked forever, e.g. because it has a specification.
+        :type permanent: bool
+        :param now: The time the seuid is tracked from if it is not tracked yet, defaults to rospy.Time.now().
+        :type now: rospy.Time
+        """
+        if now is None:
+            now = rospy.Time.now()
+        with self.__lock:
+            ident = self.__ids.find(seuid)
+            entry = self.__entries.get(ident)
+            if entry is None:
+                ident = self.__ids.acquire(seuid)
+                entry = [now, timeout, permanent, None, False]
+                self.__entries[ident] = entry
+            else:
+                entry[1] = timeout
+                entry[2] = permanent
+            if ident not in self.__expired and not entry[4]:
+                self.__schedule(ident, entry, entry[0] + timeout)
+
+    def report(self, seuid, now=None):
+        """
+        Reports that a message of the given seuid arrived.
+
+        :param seuid: The seuid.
+        :type seuid: str
+        :param now: The arrival time, defaults to rospy.Time.now().
+        :type now: rospy.Time
+        """
+        if now is None:
+            now = rospy.Time.now()
+        with self.__lock:
+            ident = self.__ids.find(seuid)
+            entry = self.__entries.get(ident)
+            if entry is not None:
+                self.__arrived(ident, entry, now)
+                return
+        timeout = self.__timeout_for(seuid)
+        with self.__lock:
+            ident = self.__ids.find(seuid)
+            entry = self.__entries.get(ident)
+            if entry is not None:
+                # tracked by another thread in the meantime
+                self.__arrived(ident, entry, now)
+                return
+            ident = self.__ids.acquire(seuid)
+            entry = [now, timeout, False, None, False]
+            self.__entries[ident] = entry
+            self.__schedule(ident, entry, now + timeout)
+
+    def __arrived(self, ident, entry, now):
+        """
+        Updates the last arrival of a tracked seuid, the lock has to be held.
+        """
+        entry[0] = now
+        if ident in self.__expired:
+            self.__expired.discard(ident)
+            self.__schedule(ident, entry, now + entry[1])
+
+    def hold(self, seuid, now=None):
+        """
+        Keeps a seuid alive until it is released, tracks it if it is not tracked yet.
+
+        :param seuid: The seuid.
+        :type seuid: str
+        :param now: The time the seuid is tracked from if it is not tracked yet, defaults to rospy.Time.now().
+        :type now: rospy.Time
+        """
+        if now is None:
+            now = rospy.Time.now()
+        with self.__lock:
+            ident = self.__ids.find(seuid)
+            entry = self.__entries.get(ident)
+            if entry is not None:
+                self.__hold(ident, entry)
+                return
+        timeout = self.__timeout_for(seuid)
+        with self.__lock:
+            ident = self.__ids.find(seuid)
+            entry = self.__entries.get(ident)
+            if entry is not None:
+                # tracked by another thread in the meantime
+                self.__hold(ident, entry)
+                return
+            self.__entries[self.__ids.acquire(seuid)] = [now, timeout, False, None, True]
+
+    def __hold(self, ident, entry):
+        """
+        Keeps a tracked seuid alive, the lock has to be held.
+        """
+        entry[4] = True
+        # its entry in the queue is skipped once it comes up
+        entry[3] = None
+        self.__expired.discard(ident)
+
+    def release(self, seuid, now=None):
+        """
+        Stops keeping a held seuid alive, it is overdue after its timeout from now on unless it arrives.
+
+        :param seuid: The seuid.
+        :type seuid: str
+        :param now: The time the seuid was released, defaults to rospy.Time.now().
+        :type now: rospy.Time
+        """
+        if now is None:
+            now = rospy.Time.now()
+        with self.__lock:
+            ident = self.__ids.find(seuid)
+            entry = self.__entries.get(ident)
+            if entry is None or not entry[4]:
+                return
+            entry[4] = False
+            if entry[0] < now:
+                entry[0] = now
+            self.__schedule(ident, entry, entry[0] + entry[1])
+
+    def seuids(self):
+        """
+        Returns all tracked seuids.
+
+        :return: list
+        """
+        with self.__lock:
+            return [self.__ids.seuid(ident) for ident in self.__entries.keys()]
+
+    def discard(self, seuid):
+        """
+        Stops tracking a seuid. Its entry in the queue is skipped once it comes up.
+
+        :param seuid: The seuid.
+        :type seuid: str
+        """
+        with self.__lock:
+            ident = self.__ids.find(seuid)
+            if self.__entries.pop(ident, None) is not None:
+                self.__expired.discard(ident)
+                self.__ids.release(ident)
+
+    def __schedule(self, ident, entry, deadline):
+        """
+        Queues the seuid id at the given deadline, replacing its previous entry in the queue.
+        """
+        entry[3] = deadline
+        heapq.heappush(self.__deadlines, (deadline, ident))
+
+    def check(self, now=None):
+        """
+        Returns all overdue seuids.
+
+        :param now: The current time, defaults to rospy.Time.now().
+        :type now: rospy.Time
+        :return: A list of (seuid, last arrival) tuples.
+        """
+        if now is None:
+            now = rospy.Time.now()
+        with self.__lock:
+            deadlines = self.__deadlines
+            while deadlines and deadlines[0][0] <= now:
+                deadline, ident = heapq.heappop(deadlines)
+                entry = self.__entries.get(ident)
+                if entry is None or entry[3] != deadline:
+                    # replaced by a newer entry
+                    continue
+                actual = entry[0] + entry[1]
+                if actual > now:
+                    # arrived again in the meantime
+                    self.__schedule(ident, entry, actual)
+                else:
+                    entry[3] = None
+                    self.__expired.add(ident)
+            result = []
+            for ident in list(self.__expired):
+                entry = self.__entries[ident]
+                if not entry[2] and self.__forget_after is not None and \
+                        now > entry[0] + entry[1] + self.__forget_after:
+                    self.__expired.discard(ident)
+                    del self.__entries[ident]
+                    self.__ids.release(ident)
+                else:
+                    result.append((self.__ids.seuid(ident), entry[0]))
+            return result
+
+    def is_alive(self, seuid, now=None):
+        """
+        Returns whether messages of the seuid arrived within its timeout. Untracked seuids count as alive.
+
+        :param seuid: The seuid.
+        :type seuid: str
+        :param now: The current time, defaults to rospy.Time.now().
+        :type now: rospy.Time
+        :return: bool
+        """
+        if now is None:
+            now = rospy.Time.now()
+        with self.__lock:
+            entry = self.__entries.get(self.__ids.find(seuid))
+            if entry is None or entry[4]:
+                return True
+            return now < entry[0] + entry[1]
@@ -0,0 +1,77 @@
+import threading
+import rospy
+
+
+class BatchPublisher:
+    """
+    Collects messages and publishes them together in one array message.
+
+    A batch is published as soon as it holds *max_entries* messages or, checked twice per *max_delay*,
+    once its oldest message waited for *max_delay*. Without a positive *max_delay* every message is published
+    right away.
+    """
+
+    def __init__(self, topic, array_class, max_entries=100, max_delay=rospy.Duration(0.1), queue_size=10):
+        """
+        Advertises the topic of the array messages and starts the flush timer if *max_delay* is positive.
+
+        :param topic: The topic to publish the array messages on.
+        :type topic: str
+        :param array_class: The array message class, its *rated_statistics* field holds the messages.
+        :param max_entries: The maximum amount of messages in one batch.
+        :type max_entries: int
+        :param max_delay: The maximum time a message waits for its batch to be published.
+        :type max_delay: rospy.Duration
+        :param queue_size: The queue size of the publisher.
+        :type queue_size: int
+        """
+        self.__publisher = rospy.Publisher(topic, array_class, queue_size=queue_size)
+        self.__array_class = array_class
+        self.max_entries = max_entries
+        self.max_delay = max_delay
+        self.__batch = []
+        self.__batch_start = None
+        self.__lock = threading.Lock()
+        self.__timer = None
+        if max_delay.to_sec() > 0:
+            self.__timer = rospy.Timer(rospy.Duration(max_delay.to_sec() / 2), self.__flush_timer)
+
+    def publish(self, msg):
+        """
+        Adds a message to the current batch and publishes the batch if it is full.
+
+        :param msg: The message to publish.
+        """
+        with self.__lock:
+            if not self.__batch:
+                self.__batch_start = rospy.Time.now()
+            self.__batch.append(msg)
+            if len(self.__batch) < self.max_entries and self.__timer is not None:
+                return
+            batch = self.__take()
+        self.__publish(batch)
+
+    def flush(self):
+        """
+        Publishes the current batch right away.
+        """
+        with self.__lock:
+            batch = self.__take()
+        self.__publish(batch)
+
+    def __flush_timer(self, event):
+        with self.__lock:
+            if not self.__batch or rospy.Time.now() - self.__batch_start < self.max_delay:
+                return
+            batch = self.__take()
+        self.__publish(batch)
+
+    def __take(self):
+        batch = self.__batch
+        self.__batch = []
+        self.__batch_start = None
+        return batch
+
+    def __publish(self, batch):
+        if batch:
+            self.__publisher.publish(self.__array_class(batch))
@@ -0,0 +1,115 @@
+import threading
+import rospy
+from rated_statistics import META_FIELDS, to_float
+
+#: the amount of heartbeats after which the last published rating of a seuid is forgotten
+EXPIRE_HEARTBEATS = 3
+
+
+class ChangeFilter:
+    """
+    Decides whether a rating is worth publishing, compared to the last published rating of the same seuid.
+
+    A rating is published if any state changed, if any actual value changed by more than the relative tolerance
+    or if the last published rating of the seuid is older than the heartbeat. Subscribers timing out ratings,
+    like the countermeasure node with its storage_timeout, need a heartbeat shorter than their timeout.
+    """
+
+    def __init__(self, tolerance=0.1, heartbeat=rospy.Duration(5)):
+        """
+        Creates a filter without any published ratings.
+
+        :param tolerance: The relative change of an actual value which is published, e.g. 0.1 for 10 percent.
+        :type tolerance: float
+        :param heartbeat: The time after which a rating is published even if nothing changed.
+        :type heartbeat: rospy.Duration
+        """
+        self.tolerance = tolerance
+        self.heartbeat = heartbeat
+        #: seuid -> (states, values, publish time) of the last published rating
+        self.__published = {}
+        self.__lock = threading.Lock()
+        #: the amount of ratings which were not published
+        self.suppressed = 0
+
+    def __summarize(self, container):
+        """
+        Flattens the states and actual values of a RatedStatisticsContainer.
+
+        :return: A tuple of the states and the actual values.
+        """
+        states = []
+        values = []
+        for index, metatype in enumerate(container.metatype):
+            if metatype in META_FIELDS:
+                continue
+            state = container.state[index]
+            actual = container.actual[index]
+            if isinstance(actual, (list, tuple)):
+                values.extend(to_float(v) for v in actual)
+                if isinstance(state, (list, tuple)):
+                    states.extend(state)
+                else:
+                    states.append(state)
+            else:
+                values.append(to_float(actual))
+                states.append(state)
+        return tuple(states), values
+
+    def __changed(self, old, new):
+        if len(old) != len(new):
+            return True
+        for a, b in zip(old, new):
+            if a != b and abs(a - b) > self.tolerance * max(abs(a), abs(b)):
+                return True
+        return False
+
+    def should_publish(self, container, now=None):
+        """
+        Returns whether a rating has to be published and remembers it if so.
+
+        :param container: The rating.
+        :type container: RatedStatisticsContainer
+        :param now: The current time, defaults to rospy.Time.now().
+        :type now: rospy.Time
+        :return: bool
+        """
+        if now is None:
+            now = rospy.Time.now()
+        states, values = self.__summarize(container)
+        with self.__lock:
+            last = self.__published.get(container.seuid)
+            if last is not None and last[0] == states and now - last[2] < self.heartbeat and \
+                    not self.__changed(last[1], values):
+                self.suppressed += 1
+                return False
+            self.__published[container.seuid] = (states, values, now)
+            return True
+
+    def expire(self, now=None):
+        """
+        Forgets the published ratings of the seuids which did not publish for EXPIRE_HEARTBEATS heartbeats,
+        e.g. because their node is gone. Their next rating is published.
+
+        :param now: The current time, defaults to rospy.Time.now().
+        :type now: rospy.Time
+        :return: The amount of forgotten ratings.
+        """
+        if now is None:
+            now = rospy.Time.now()
+        timeout = self.heartbeat * EXPIRE_HEARTBEATS
+        with self.__lock:
+            expired = [seuid for seuid, last in self.__published.iteritems() if now - last[2] >= timeout]
+            for seuid in expired:
+                del self.__published[seuid]
+        return len(expired)
+
+    def __len__(self):
+        return len(self.__published)
+
+    def clear(self):
+        """
+        Forgets all published ratings, so the next rating of every seuid is published.
+        """
+        with self.__lock:
+            self.__published.clear()
@@ -0,0 +1,192 @@
+import base64
+import json
+import threading
+import rospy
+import rosgraph
+from arni_core.master_graph import get_master_graph
+from arni_msgs.srv import StatisticHistory, StatisticHistoryResponse, StatisticHistoryPage, StatisticHistoryPageResponse
+from metadata_storage import encode_cursor as encode_shard_cursor
+
+#: the fields of the StatisticHistory responses which are merged
+HISTORY_FIELDS = ("host_statistics", "node_statistics", "topic_statistics",
+                  "rated_host_statistics", "rated_node_statistics", "rated_topic_statistics")
+
+#: the type of a seuid -> the fields of a history page which hold its statistics
+PAGE_FIELDS = {"h": ("host_statistics", "rated_host_statistics"),
+               "n": ("node_statistics", "rated_node_statistics"),
+               "c": ("topic_statistics", "rated_topic_statistics"),
+               "t": ("rated_topics",)}
+
+
+def encode_cursor(cursors):
+    """
+    Encodes the cursors of the shards into one cursor.
+
+    :param cursors: shard -> cursor of the shard, None for shards without further pages.
+    :type cursors: dict
+    :return: str
+    """
+    if all(c is None for c in cursors.itervalues()):
+        return ""
+    return base64.urlsafe_b64encode(json.dumps(cursors, sort_keys=True))
+
+
+def decode_cursor(cursor):
+    """
+    Decodes a cursor created by encode_cursor.
+
+    :param cursor: The cursor, empty for the first page.
+    :type cursor: str
+    :return: A dict of the cursors of the shards.
+    :raises ValueError: If the cursor is invalid.
+    """
+    if not cursor:
+        return {}
+    try:
+        cursors = json.loads(base64.urlsafe_b64decode(str(cursor)))
+    except (TypeError, ValueError):
+        raise ValueError("[HistoryMerger] Invalid cursor %s" % cursor)
+    if not isinstance(cursors, dict):
+        raise ValueError("[HistoryMerger] Invalid cursor %s" % cursor)
+    return dict((str(shard), str(c) if c is not None else None) for shard, c in cursors.iteritems())
+
+
+class HistoryMerger:
+    """
+    Provides the statistic history services of a single monitoring node for a group of monitoring node shards.
+
+    The shards are the nodes providing a get_shard_status service, they are looked up on every request.
+    Requests are forwarded to every shard and the responses are concatenated. For a page every shard which has
+    further pages is asked for the requested amount of items, the newest of them are merged into the page and the
+    cursor of each shard continues after the items taken from it. Shards which do not answer are left out of the
+    response.
+    """
+
+    def __init__(self):
+        self.__timeout = rospy.get_param("~shard_timeout", 5)
+        self.__history_page_size = rospy.get_param("~history_page_size", 500)
+        #: service name -> [lock, persistent ServiceProxy]
+        self.__proxies = {}
+        self.__proxies_lock = threading.Lock()
+
+    def shards(self):
+        """
+        Returns the names of the monitoring node shards.
+
+        :return: A sorted list of node names.
+        """
+        try:
+            state = get_master_graph().snapshot().system_state
+        except rosgraph.masterapi.MasterException as e:
+            rospy.logerr("[HistoryMerger] Could not look up the shards: %s" % e)
+            return []
+        shards = set()
+        for service, providers in state[2]:
+            if service.endswith("/get_shard_status"):
+                shards.update(p for p in providers if service == p + "/get_shard_status")
+        with self.__proxies_lock:
+            for name in [n for n in self.__proxies if n.rsplit("/", 1)[0] not in shards]:
+                self.__proxies.pop(name)[1].close()
+        return sorted(shards)
+
+    def __call(self, shard, service, service_class, *args):
+        """
+        Calls a service of a shard over a persistent connection, which is rebuilt after a failure.
+
+        :return: The response, None if the shard did not answer.
+        """
+        name = shard + "/" + service
+        with self.__proxies_lock:
+            entry = self.__proxies.setdefault(name, [threading.Lock(), None])
+        with entry[0]:
+            try:
+                if entry[1] is None:
+                    rospy.wait_for_service(name, self.__timeout)
+                    entry[1] = rospy.ServiceProxy(name, service_class, persistent=True)
+                return entry[1](*args)
+            except (rospy.ROSException, rospy.ServiceException) as e:
+                if entry[1] is not None:
+                    entry[1].close()
+                    entry[1] = None
+                rospy.logwarn("[HistoryMerger] Shard %s did not answer: %s" % (shard, e))
+                return None
+
+    def __merge(self, response, part):
+        for field in HISTORY_FIELDS:
+            getattr(response, field).extend(getattr(part, field))
+
+    def storage_server(self, request):
+        """
+        Returns the StorageContainer objects of all shards on request.
+
+        :param request: The request containing a timestamp.
+        :type request: StatisticHistoryRequest.
+        :returns: StatisticHistoryResponse
+        """
+        response = StatisticHistoryResponse()
+        for shard in self.shards():
+            part = self.__call(shard, "get_statistic_history", StatisticHistory, request.timestamp)
+            if part is not None:
+                self.__merge(response, part)
+        return response
+
+    def history_page_server(self, request):
+        """
+        Returns one page of the StorageContainer objects of all shards on request, newest first.
+
+        :param request: The request containing a seuid pattern, a time range, a page size and a cursor.
+        :type request: StatisticHistoryPageRequest.
+        :returns: StatisticHistoryPageResponse
+        :raises rospy.ServiceException: If the cursor is invalid.
+        """
+        try:
+            cursors = decode_cursor(request.cursor)
+        except ValueError as e:
+            rospy.logwarn("[HistoryMerger] Rejected a history page request: %s" % e)
+            raise rospy.ServiceException("%s, request the first page with an empty cursor." % e)
+        # shards which joined while paging start from their first page, shards which left are dropped
+        cursors = dict((shard, cursors.get(shard, "")) for shard in self.shards())
+        active = sorted(shard for shard, cursor in cursors.iteritems() if cursor is not None)
+        response = StatisticHistoryPageResponse()
+        if not active:
+            return response
+        max_items = request.max_items if request.max_items > 0 else self.__history_page_size
+        parts = {}
+        items = []
+        for shard in active:
+            part = self.__call(shard, "get_statistic_history_page", StatisticHistoryPage, request.seuid_pattern,
+                               request.start, request.stop, max_items, cursors[shard])
+            if part is None:
+                continue
+            parts[shard] = part
+            # the position of every statistic within the list of its type
+            positions = dict.fromkeys(PAGE_FIELDS, 0)
+            for stamp, seuid in zip(part.stamps, part.seuids):
+                items.append((stamp, seuid, shard, positions[seuid[0]]))
+                positions[seuid[0]] += 1
+        # every shard sent its newest items, so the newest of all of them are the newest overall
+        items.sort(key=lambda item: (item[0], item[1]), reverse=True)
+        taken = dict.fromkeys(parts, 0)
+        last = {}
+        for stamp, seuid, shard, position in items[:max_items]:
+            for field in PAGE_FIELDS[seuid[0]]:
+                getattr(response, field).append(getattr(parts[shard], field)[position])
+            response.stamps.append(stamp)
+            response.seuids.append(seuid)
+            taken[shard] += 1
+            last[shard] = (stamp, seuid)
+        for shard, part in parts.iteritems():
+            if taken[shard] == len(part.seuids):
+                cursors[shard] = part.next_cursor if part.next_cursor else None
+            elif taken[shard]:
+                cursors[shard] = encode_shard_cursor(*last[shard])
+        response.next_cursor = encode_cursor(cursors)
+        return response
+
+    def listener(self):
+        """
+        Sets up the services.
+        """
+        rospy.Service('~get_statistic_history', StatisticHistory, self.storage_server)
+        rospy.Service('~get_statistic_history_page', StatisticHistoryPage, self.history_page_server)
+        rospy.spin()
@@ -1,15 +1,41 @@
 from arni_core.helper import older_than
+from arni_core import param_cache
+from arni_core.seuid_registry import get_registry
+from fnmatch import fnmatchcase
+import base64
 import rospy
 import threading
 from threading import Timer
 import thread
 from storage_container import StorageContainer
+from storage_buffer import StorageBuffer
+from segment_store import SegmentStore
+from rollup import Rollup, RollupTier
+
+#: the rollup tiers as [resolution, retention] in seconds, 10 second windows for an hour and minutes for six hours
+DEFAULT_ROLLUP_TIERS = [[10, 3600], [60, 21600]]
+
+
+def encode_cursor(timestamp, identifier):
+    """
+    Returns the cursor of the history page which continues after the given StorageContainer.
+
+    :param timestamp: The timestamp of the StorageContainer.
+    :type timestamp: rospy.Time.
+    :param identifier: The seuid of the StorageContainer.
+    :type identifier: str.
+    :return: str
+    """
+    return base64.urlsafe_b64encode("%d:%d:%s" % (timestamp.secs, timestamp.nsecs, identifier))
 
 
 class MetadataStorage:
     """
     The MetadataStorage holds StorageContainer objects with raw topic data and the rated values
     and can provide them on request.
+
+    The buffers are kept by the ids the process wide SeuidRegistry assigns to the seuids, an id is held while its
+    seuid has a buffer.
     """
     storage = {}
 
@@ -17,8 +43,8 @@ class MetadataStorage:
         last_cleanup = rospy.Time.now()
         sleeptime = rospy.Duration(0.5)
         while not rospy.is_shutdown():
-            if rospy.get_param('~storage/auto_cleanup', True) and \
-                    older_than(last_cleanup, rospy.Duration(rospy.get_param('~storage/cleanup_timer', 30))):
+            if param_cache.get_param('~storage/auto_cleanup', True) and \
+                    older_than(last_cleanup, rospy.Duration(param_cache.get_param('~storage/cleanup_timer', 30))):
                     # not rospy.Duration(
                     #         rospy.get_param('/arni/storage/cleanup_timer', 30)) > rospy.Time.now() - last_cleanup:
                 last_cleanup = rospy.Time.now()
@@ -29,26 +55,76 @@ class MetadataStorage:
     def __clean_up(self):
         """
         Automatically removes all objects in the storage older than *duration*.
+        Only the expired head of each seuid's buffer is touched.
         """
+        now = rospy.Time.now()
+        duration = rospy.Duration(self.duration)
+        if now.to_sec() <= duration.to_sec():
+            return
+        oldest = now - duration
         counter = 0
-        for ident in self.storage.keys():
-            for stamp in self.storage[ident].keys():
-                if older_than(stamp, rospy.Duration(self.duration)):
-                # if rospy.Time.now() - stamp > rospy.Duration(self.duration):
-                    del self.storage[ident][stamp]
-                    counter += 1
+        with self.__lock:
+            for ident in self.storage.keys():
+                counter += self.storage[ident].expire(oldest)
+                if not len(self.storage[ident]):
+                    del self.storage[ident]
+                    self.__ids.release(ident)
         rospy.logdebug("[MetadataStorage] Cleared storage, removed %s packages." % counter)
+        for tier in self.tiers:
+            tier.expire(now)
+        if self.segments is not None:
+            try:
+                deleted = self.segments.expire(now)
+                rospy.logdebug("[MetadataStorage] Deleted %s history segments." % deleted)
+            except (IOError, OSError) as e:
+                rospy.logwarn("[MetadataStorage] Could not delete history segments: %s" % e)
 
-    def store(self, container):
+    def store(self, container, data_raw=None):
         """
         Stores a given StorageContainer object.
 
         :param container: The data to store.
         :type container: StorageContainer
+        :param data_raw: Optionally the raw message of the container, saves rebuilding it for the rollups.
         """
-        if not container.identifier in self.storage:
-            self.storage[container.identifier] = {}
-        self.storage[container.identifier][container.timestamp] = container
+        with self.__lock:
+            buff = self.storage.get(self.__ids.find(container.identifier))
+            if buff is None:
+                buff = self.storage[self.__ids.acquire(container.identifier)] = StorageBuffer(self.max_entries)
+            buff.add(container.timestamp, container)
+            if self.__first_stored is None:
+                self.__first_stored = container.timestamp
+        if container.raw_buffer is not None and self.tiers:
+            if data_raw is None:
+                data_raw = container.data_raw
+            for tier in self.tiers:
+                tier.add(container.timestamp, container.identifier, data_raw)
+        if self.segments is not None:
+            try:
+                self.segments.append(container)
+            except (IOError, OSError) as e:
+                rospy.logwarn("[MetadataStorage] Could not write history segment: %s" % e)
+
+    def __memory_start(self, buffers):
+        """
+        Returns the point in time from which on the given buffers are complete in memory, older data is read from
+        disk. Besides the expired statistics a buffer misses the ones dropped because it was full and the ones
+        stored before the start of this process.
+
+        :param buffers: The StorageBuffer objects read, the lock has to be held.
+        """
+        now = rospy.Time.now()
+        if self.__first_stored is None:
+            # nothing stored since the start, the whole history is on disk
+            return now
+        duration = rospy.Duration(self.duration)
+        start = self.__first_stored
+        if now.to_sec() > duration.to_sec() and now - duration > start:
+            start = now - duration
+        for buff in buffers:
+            if buff.evicted is not None and buff.evicted >= start:
+                start = buff.evicted + rospy.Duration(0, 1)
+        return start
 
     def get(self, identifier="*", timestamp=rospy.Time(0)):
         """
@@ -59,32 +135,188 @@ class MetadataStorage:
         :param timestamp: A timestamp marking the point of the oldest data you want. 0 returns all.
         :type timestamp: rospy.Time.
         """
+        memory = []
+        since = timestamp
+        with self.__lock:
+            if identifier == "*":
+                buffers = self.storage.values()
+            else:
+                buff = self.storage.get(self.__ids.find(identifier))
+                buffers = [buff] if buff is not None else []
+            if self.segments is not None:
+                since = max(timestamp, self.__memory_start(buffers))
+            for buff in buffers:
+                memory.extend(buff.since(since))
         results = []
-        for ident in self.storage.keys():
-            if ident == identifier or identifier == "*":
-                for stamp in self.storage[ident].keys():
-                    if stamp >= timestamp:
-                        results.append(self.storage[ident][stamp])
+        if since > timestamp:
+            results.extend(self.__read_segments(identifier, timestamp, since - rospy.Duration(0, 1)))
+        results.extend(memory)
         return results
 
+    def __read_segments(self, pattern, start, stop, limit=None, skip=None):
+        try:
+            return self.segments.read(pattern, start, stop, limit, skip)
+        except (IOError, OSError) as e:
+            rospy.logwarn("[MetadataStorage] Could not read history segments: %s" % e)
+            return []
+
+    def get_page(self, pattern="*", start=rospy.Time(0), stop=None, max_items=500, cursor=""):
+        """
+        Returns one page of StorageContainers matching the given pattern within the given time range, newest first.
+
+        :param pattern: A glob pattern the identifiers have to match.
+        :type pattern: str.
+        :param start: The oldest timestamp to include.
+        :type start: rospy.Time.
+        :param stop: The newest timestamp to include, None for no limit.
+        :type stop: rospy.Time.
+        :param max_items: The maximum amount of StorageContainers to return.
+        :type max_items: int.
+        :param cursor: The cursor returned with the previous page, empty for the first page.
+        :type cursor: str.
+        :returns: A tuple of the list of StorageContainers and the cursor for the next page (empty if there is none).
+        :raises ValueError: If the cursor is malformed.
+        """
+        bound = self.__decode_cursor(cursor) if cursor else None
+        upper = stop
+        if bound is not None and (upper is None or bound[0] < upper):
+            upper = bound[0]
+        memory_start = start
+        candidates = []
+        with self.__lock:
+            buffers = [(self.__ids.seuid(ident), buff) for ident, buff in self.storage.iteritems()]
+            buffers = [(seuid, buff) for seuid, buff in buffers if fnmatchcase(seuid, pattern)]
+            if self.segments is not None:
+                memory_start = max(start, self.__memory_start(buff for seuid, buff in buffers))
+            for seuid, buff in buffers:
+                if upper is None:
+                    items = buff.since(memory_start)
+                else:
+                    items = buff.between(memory_start, upper)
+                if bound is not None and seuid >= bound[1]:
+                    while items and items[-1].timestamp == bound[0]:
+                        items = items[:-1]
+                # one more than needed to find out whether there is another page
+                candidates.extend(items[-(max_items + 1):])
+        if memory_start > start and len(candidates) <= max_items and (upper is None or upper >= start):
+            # everything on disk is older than the data in memory
+            stop_disk = memory_start - rospy.Duration(0, 1)
+            if upper is not None and upper < stop_disk:
+                stop_disk = upper
+            skip = None
+            if bound is not None:
+                skip = lambda timestamp, ident: timestamp == bound[0] and ident >= bound[1]
+            candidates.extend(self.__read_segments(pattern, start, stop_disk, max_items + 1 - len(candidates), skip))
+        candidates.sort(key=lambda c: (c.timestamp, c.identifier), reverse=True)
+        if len(candidates) > max_items:
+            page = candidates[:max_items]
+            return page, encode_cursor(page[-1].timestamp, page[-1].identifier) if page else ""
+        return candidates, ""
+
+    def get_rollups(self, pattern="*", start=rospy.Time(0), stop=None, max_points=0):
+        """
+        Returns the statistics matching the given pattern within the given time range, rolled up to one tier.
+
+        The unaggregated statistics in memory are used if they cover the time range and no seuid has more than
+        *max_points* of them, otherwise the finest rollup tier which covers it. If *max_points* is given, tiers which
+        would return more windows per seuid are skipped. If no tier fits the coarsest one is used. Without tiers the
+        unaggregated statistics are returned regardless of *max_points*. Coarser tiers are kept longer, so the
+        coarsest tier covering a range would always be the last one and the finer tiers would never be used.
+
+        :param pattern: A glob pattern the identifiers have to match.
+        :type pattern: str.
+        :param start: The start of the time range.
+        :type start: rospy.Time.
+        :param stop: The end of the time range, None for up to now.
+        :type stop: rospy.Time.
+        :param max_points: The maximum amount of windows per seuid, 0 for no limit.
+        :type max_points: int.
+        :returns: A tuple of the resolution in seconds (0 for unaggregated statistics) and a list of
+            (seuid, Rollup) tuples ordered by seuid and time.
+        """
+        now = rospy.Time.now()
+        span = ((stop if stop is not None else now) - start).to_sec()
+        if now.to_sec() - start.to_sec() <= self.duration:
+            stored = []
+            with self.__lock:
+                for seuid, buff in sorted((self.__ids.seuid(i), b) for i, b in self.storage.iteritems()):
+                    if fnmatchcase(seuid, pattern):
+                        containers = buff.since(start) if stop is None else buff.between(start, stop)
+                        stored.append((seuid, [c for c in containers if c.raw_buffer is not None]))
+            # the statistics arrive at the rate of their sources, so their amount is counted instead of the span
+            if not max_points or not self.tiers or all(len(containers) <= max_points for seuid, containers in stored):
+                results = []
+                for seuid, containers in stored:
+                    for container in containers:
+                        rollup = Rollup(container.timestamp, container.timestamp)
+                        rollup.add(container.data_raw)
+                        results.append((seuid, rollup))
+                return 0, results
+        if not self.tiers:
+            return 0, []
+        tier = self.tiers[-1]
+        for candidate in self.tiers:
+            if candidate.covers(start, now) and (not max_points or span / candidate.resolution <= max_points):
+                tier = candidate
+                break
+        return tier.resolution, tier.get(pattern, start, stop)
+
+    def __decode_cursor(self, cursor):
+        try:
+            secs, nsecs, identifier = base64.urlsafe_b64decode(str(cursor)).split(":", 2)
+            return rospy.Time(int(secs), int(nsecs)), identifier
+        except (TypeError, ValueError):
+            raise ValueError("[MetadataStorage] Invalid history cursor %s." % cursor)
+
+    def size(self):
+        """
+        Returns the amount of seuids and StorageContainer objects kept in memory.
+
+        :returns: A tuple of the amount of seuids and the amount of containers.
+        """
+        with self.__lock:
+            return len(self.storage), sum(len(buff) for buff in self.storage.itervalues())
+
     def clear(self):
         """
         Clears the whole storage.
         """
-        self.storage.clear()
+        with self.__lock:
+            self.storage.clear()
 
-    def __init__(self, duration=300):
+    def __init__(self, duration=300, max_entries=1000):
         """
         Saves received metadata packages for a given period of time and can provide them on request.
 
         :param duration: Optional the duration to keep objects in storage. Set to 5 minutes by default.
         :type duration: int.
+        :param max_entries: Optional the maximum amount of objects kept per seuid. Set to 1000 by default.
+        :type max_entries: int.
         """
+        #: seuid id -> StorageBuffer
         self.storage = {}
+        self.__ids = get_registry()
         self.duration = rospy.get_param('~/storage/timeout', duration)
+        self.max_entries = rospy.get_param('~storage/max_entries', max_entries)
+        #: the RollupTier objects ordered by their resolution, an empty list disables the rollups
+        self.tiers = sorted([RollupTier(resolution, retention) for resolution, retention in
+                             rospy.get_param('~storage/rollup/tiers', DEFAULT_ROLLUP_TIERS)],
+                            key=lambda t: t.resolution)
+        #: the optional SegmentStore keeping the history on disk
+        self.segments = None
+        if rospy.get_param('~storage/disk/enabled', False):
+            self.segments = SegmentStore(rospy.get_param('~storage/disk/path', '~/.ros/arni/history'),
+                                         rospy.get_param('~storage/disk/segment_duration', 600),
+                                         rospy.get_param('~storage/disk/max_age', 21600),
+                                         rospy.get_param('~storage/disk/max_size', 1024) * 1024 * 1024)
+        self.__lock = threading.Lock()
+        #: the timestamp of the first StorageContainer stored by this process
+        self.__first_stored = None
         self.timer_running = True
         thr = threading.Thread(target=self.__cleanup_timer)
         thr.start()
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.timer_running = False
+        if self.segments is not None:
+            self.segments.close()
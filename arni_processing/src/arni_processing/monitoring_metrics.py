@@ -0,0 +1,173 @@
+from bisect import bisect_left
+import threading
+import rospy
+from arni_msgs.msg import MonitoringMetrics as MonitoringMetricsMsg, LatencyHistogram as LatencyHistogramMsg
+
+#: the processing stages of the monitoring node which are measured
+STAGES = ("parse", "compare", "compare_topic", "store", "publish")
+
+#: upper bucket bounds in seconds, doubling from one microsecond to about one second
+DEFAULT_BOUNDS = tuple(0.000001 * 2 ** i for i in range(21))
+
+
+class LatencyHistogram:
+    """
+    Counts measured durations in buckets with fixed bounds.
+
+    Recording a duration costs a binary search over the bounds and a few additions, so histograms can be kept
+    on the hot path. Percentiles are estimated as the upper bound of the bucket they fall into.
+    """
+
+    def __init__(self, bounds=DEFAULT_BOUNDS):
+        """
+        Creates an empty histogram.
+
+        :param bounds: The ascending upper bounds of the buckets in seconds.
+        :type bounds: tuple
+        """
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.__lock = threading.Lock()
+
+    def record(self, duration):
+        """
+        Adds a measured duration.
+
+        :param duration: The duration in seconds.
+        :type duration: float
+        """
+        index = bisect_left(self.bounds, duration)
+        with self.__lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += duration
+            if duration > self.max:
+                self.max = duration
+
+    def percentile(self, fraction):
+        """
+        Returns the estimated duration below which the given fraction of the measurements lies.
+
+        :param fraction: The fraction like 0.99.
+        :type fraction: float
+        :return: The duration in seconds, 0 if nothing was measured.
+        """
+        with self.__lock:
+            counts = list(self.counts)
+            total = self.count
+            maximum = self.max
+        if not total:
+            return 0.0
+        rank = fraction * total
+        seen = 0
+        for index, count in enumerate(counts):
+            seen += count
+            if seen >= rank:
+                return self.bounds[index] if index < len(self.bounds) else maximum
+        return maximum
+
+    def to_msg(self, stage):
+        """
+        Returns the histogram as a LatencyHistogram message.
+
+        :param stage: The name of the measured stage.
+        :type stage: str
+        """
+        msg = LatencyHistogramMsg()
+        msg.stage = stage
+        with self.__lock:
+            msg.count = self.count
+            msg.sum = self.sum
+            msg.max = self.max
+            msg.counts = list(self.counts)
+        msg.bounds = list(self.bounds)
+        msg.p50 = self.percentile(0.5)
+        msg.p90 = self.percentile(0.9)
+        msg.p99 = self.percentile(0.99)
+        return msg
+
+
+class MonitoringMetrics:
+    """
+    Collects the latency histograms of the processing stages and the message counters of a monitoring node.
+    Rates are measured between two snapshots, the histograms and counters accumulate since the node started.
+    """
+
+    def __init__(self, node, bounds=DEFAULT_BOUNDS):
+        """
+        Creates empty metrics.
+
+        :param node: The name of the monitoring node.
+        :type node: str
+        :param bounds: The bucket bounds of the histograms in seconds.
+        :type bounds: tuple
+        """
+        self.node = node
+        self.histograms = dict((stage, LatencyHistogram(bounds)) for stage in STAGES)
+        #: the amount of statistics messages received
+        self.received = 0
+        #: the amount of statistics messages rated
+        self.rated = 0
+        self.__counter_lock = threading.Lock()
+        self.__window_start = rospy.Time.now()
+        self.__window_counts = (0, 0)
+
+    def record(self, stage, duration):
+        """
+        Adds the duration of a processing stage.
+
+        :param stage: One of STAGES.
+        :type stage: str
+        :param duration: The duration in seconds.
+        :type duration: float
+        """
+        self.histograms[stage].record(duration)
+
+    def count_received(self):
+        """
+        Counts a received statistics message.
+        """
+        with self.__counter_lock:
+            self.received += 1
+
+    def count_rated(self):
+        """
+        Counts a rated statistics message.
+        """
+        with self.__counter_lock:
+            self.rated += 1
+
+    def snapshot(self, gauges=None, now=None, reset=True):
+        """
+        Returns the current metrics and optionally starts a new rate window.
+
+        :param gauges: Values of the other MonitoringMetrics message fields like rating_queue_depth.
+        :type gauges: dict
+        :param now: The end of the rate window, defaults to rospy.Time.now().
+        :type now: rospy.Time
+        :param reset: Whether the next rate window starts now.
+        :type reset: bool
+        :return: A MonitoringMetrics message.
+        """
+        if now is None:
+            now = rospy.Time.now()
+        msg = MonitoringMetricsMsg()
+        msg.node = self.node
+        msg.window_start = self.__window_start
+        msg.window_stop = now
+        with self.__counter_lock:
+            received, rated = self.received, self.rated
+        elapsed = (now - self.__window_start).to_sec()
+        if elapsed > 0:
+            msg.received_per_second = (received - self.__window_counts[0]) / elapsed
+            msg.rated_per_second = (rated - self.__window_counts[1]) / elapsed
+        if reset:
+            self.__window_start = now
+            self.__window_counts = (received, rated)
+        for field, value in (gauges or {}).iteritems():
+            setattr(msg, field, value)
+        msg.latencies = [self.histograms[stage].to_msg(stage) for stage in STAGES]
+        return msg
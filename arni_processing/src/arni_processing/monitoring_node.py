@@ -1,17 +1,37 @@
 import rospy
+import threading
+import time
 import traceback
 import rosgraph_msgs
 import std_srvs.srv
 from std_srvs.srv import Empty
 import arni_msgs
 from arni_msgs.msg import HostStatistics, NodeStatistics, RatedStatistics, RatedStatisticsEntity, MasterApi, MasterApiEntity
-from arni_msgs.srv import StatisticHistory, StatisticHistoryResponse
+from arni_msgs.msg import RatedStatisticsNumeric, StatisticRollup, RatedStatisticsArray, RatedStatisticsNumericArray
+from arni_msgs.srv import StatisticHistory, StatisticHistoryResponse, StatisticHistoryPage, StatisticHistoryPageResponse
+from arni_msgs.srv import StatisticRollupHistory, StatisticRollupHistoryResponse
+from arni_msgs.srv import MonitoringMetricsSnapshot, MonitoringMetricsSnapshotResponse
+from arni_msgs.srv import ReloadSpecifications, ReloadSpecificationsResponse
 from arni_core.helper import *
+from arni_core.master_api import MasterApiEncoder, MasterApiDecoder, ConnectionTracker, master_api_msg
+from arni_core import master_api
+from arni_core.master_graph import MasterGraph
+from arni_core.seuid_registry import get_registry
+from arni_core import param_cache
 from rosgraph_msgs.msg import TopicStatistics
 from metadata_storage import MetadataStorage
 from specification_handler import SpecificationHandler
+from specification_index import is_pattern
 from rated_statistics import RatedStatisticsContainer
 from storage_container import StorageContainer
+from rating_queue import RatingQueue
+from topic_aggregator import TopicAggregator
+from alive_checker import AliveChecker
+from change_filter import ChangeFilter
+from batch_publisher import BatchPublisher
+from shard_ring import ShardRing, shard_key, peek_shard_key
+from monitoring_metrics import MonitoringMetrics
+import struct
 import rosgraph
 
 class MonitoringNode:
@@ -23,94 +43,265 @@ class MonitoringNode:
     def __init__(self):
         self.__metadata_storage = MetadataStorage()
         self.__specification_handler = SpecificationHandler()
-        self.__publisher = rospy.Publisher('/statistics_rated', arni_msgs.msg.RatedStatistics, queue_size=50)
-        self.__master_api_publisher = rospy.Publisher('/statistics_master', arni_msgs.msg.MasterApi, queue_size=10)
+        self.__rated_format = rospy.get_param("/arni/rated_statistics_format", "both")
+        if self.__rated_format not in ("string", "numeric", "both"):
+            rospy.logerr("[MonitoringNode] Unknown rated statistics format %s, publishing both." % self.__rated_format)
+            self.__rated_format = "both"
+        self.__publisher = None
+        self.__numeric_publisher = None
+        if self.__rated_format != "numeric":
+            self.__publisher = rospy.Publisher('/statistics_rated', arni_msgs.msg.RatedStatistics, queue_size=50)
+        if self.__rated_format != "string":
+            self.__numeric_publisher = rospy.Publisher('/statistics_rated_numeric', RatedStatisticsNumeric,
+                                                       queue_size=50)
+        self.__batch_publisher = None
+        self.__numeric_batch_publisher = None
+        if rospy.get_param("/arni/rated_statistics_batched", False):
+            max_entries = rospy.get_param("~rated_batch/max_entries", 100)
+            max_delay = rospy.Duration(rospy.get_param("~rated_batch/max_delay_ms", 100) / 1000.0)
+            if self.__publisher is not None:
+                self.__batch_publisher = BatchPublisher('/statistics_rated_array', RatedStatisticsArray,
+                                                        max_entries, max_delay)
+            if self.__numeric_publisher is not None:
+                self.__numeric_batch_publisher = BatchPublisher('/statistics_rated_numeric_array',
+                                                                RatedStatisticsNumericArray, max_entries, max_delay)
+        self.__master_api_publisher = rospy.Publisher(master_api.TOPIC, arni_msgs.msg.MasterApi, queue_size=10)
+        # the changes of the system state are published additionally if enabled, the ARNI components use them then
+        self.__master_api_delta = rospy.get_param("/arni/master_api_delta", False)
+        self.__master_api_delta_publisher = None
+        if self.__master_api_delta:
+            self.__master_api_delta_publisher = rospy.Publisher(master_api.DELTA_TOPIC, arni_msgs.msg.MasterApiDelta,
+                                                                queue_size=10)
         self.__pub_queue = []
         self.__master_api_queue =[]
-        self.__aggregate = []
+        self.__change_filter = None
+        if rospy.get_param("~publish_on_change/enabled", False):
+            self.__change_filter = ChangeFilter(rospy.get_param("~publish_on_change/tolerance", 0.1),
+                                                rospy.Duration(rospy.get_param("~publish_on_change/heartbeat", 5)))
+        # polled by the master api timer, the first shard publishes it for the other ARNI components
+        self.__master_graph = MasterGraph(pids=rospy.get_param("~master_graph/pids", False))
+        self.__master_api_encoder = None
+        self.__master_api_decoder = MasterApiDecoder()
+        self.__master_connections = ConnectionTracker()
+        self.__shard_ring = None
+        self.__shard_name = rospy.get_name()
+        self.__foreign = 0
+        if rospy.get_param("~shard/enabled", False):
+            self.__shard_ring = ShardRing(rospy.get_param("~shard/replicas", 64))
+            self.__shard_ring.set_members([self.__shard_name])
+        self.__aggregate = TopicAggregator()
+        self.__aggregate_lock = threading.Lock()
         self.__aggregation_window = rospy.get_param("~aggregation_window", 3)
         self.__aggregate_start = rospy.Time.now()
         self.__processing_enabled = rospy.get_param("/enable_statistics", False)
-        self.__alive_timers = {}
-        self.__alive_countdown = {}
+        self.__alive_checker = AliveChecker(self.__alive_timeout,
+                                            rospy.Duration(rospy.get_param("~alive_forget_after", 60)))
+        self.__register_alive_timeouts()
+        self.__history_page_size = rospy.get_param("~history_page_size", 500)
+        # every seuid is rated by the same worker, so its messages are rated and stored in the order they arrived
+        workers = max(1, rospy.get_param("~rating_queue/workers", 2))
+        queue_size = max(1, rospy.get_param("~rating_queue/size", 1000) // workers)
+        policy = rospy.get_param("~rating_queue/overload_policy", "latest_per_seuid")
+        self.__rating_queues = [RatingQueue(queue_size, policy) for i in range(workers)]
+        self.__reported_drops = 0
+        self.__metrics = None
+        if rospy.get_param("~metrics/enabled", True):
+            self.__metrics = MonitoringMetrics(rospy.get_name())
+            self.__metrics_publisher = rospy.Publisher('/arni/monitoring_metrics', arni_msgs.msg.MonitoringMetrics,
+                                                       queue_size=10)
+            rospy.Timer(rospy.Duration(rospy.get_param("~metrics/publish_interval", 5)), self.__publish_metrics)
         rospy.Timer(rospy.Duration(rospy.get_param("~publish_interval", 5)), self.__publish_queue)
         rospy.Timer(rospy.Duration(rospy.get_param("~alive_interval", 5)), self.__check_alive)
         rospy.Timer(rospy.Duration(rospy.get_param("~master_api_publish_interval", 1)), self.__pollMasterAPI)
         rospy.Timer(rospy.Duration(rospy.get_param("/arni/check_enabled_interval", 10)), self.__update_enabled)
+        self.__seuid_keyframe_interval = rospy.Duration(rospy.get_param("~seuid_mapping/keyframe_interval", 10))
+        rospy.Timer(rospy.Duration(rospy.get_param("~seuid_mapping/publish_interval", 1)), self.__publish_seuid_mapping)
 
     def __pollMasterAPI(self, event):
         """
         Regularly polls the master api to get the most recent system state from rosgraph. This data is then published
-        on the /statistics_master topic.
+        on the /statistics_master topic, the changes since the last poll and regular keyframes on the
+        /statistics_master_delta topic if enabled and the whole master graph with the uris and pids of the nodes on
+        the /arni/master_graph topic.
         """
         # poll master api and get most recent data
-        self.master = rosgraph.masterapi.Master("")
-        state = None
+        snapshot = None
         try:
-            state = self.master.getSystemState()
+            snapshot = self.__master_graph.snapshot(0)
         except rosgraph.masterapi.MasterException as e:
             rospy.logerr("an error occured trying to connect to the master:\n%s\n%s" % (str(e), traceback.format_exc()))
             return
 
-        pubs, subs, srvs = state
-        msg = MasterApi()
-        ent = MasterApiEntity()
-        for (topic, publisher) in pubs:
-            ent.name = topic
-            ent.content = publisher
-            msg.pubs.append(ent)
-        for (topic, subscriber) in subs:
-            ent.name = topic
-            ent.content = subscriber
-            msg.subs.append(ent)
-        for (service, provider) in srvs:
-            ent.name = service
-            ent.content = provider
-            msg.srvs.append(ent)
-
+        state = snapshot.system_state
+        if self.__shard_ring is not None and not self.__update_shards(state):
+            # only the first shard publishes the master api, a new encoder starts with a keyframe once it takes over
+            self.__master_api_encoder = None
+            return
         # publish this data on /statistics_master
-        self.__master_api_publisher.publish(msg)
+        self.__master_api_publisher.publish(master_api_msg(state))
+        if self.__master_api_delta:
+            if self.__master_api_encoder is None:
+                self.__master_api_encoder = MasterApiEncoder(
+                    rospy.Duration(param_cache.get_param("~master_api_keyframe_interval", 10)))
+            # publish the changes or a keyframe on /statistics_master_delta
+            msg = self.__master_api_encoder.encode(state)
+            if msg is not None:
+                self.__master_api_delta_publisher.publish(msg)
+        self.__master_graph.publish(snapshot)
+
+    def __update_shards(self, state):
+        """
+        Updates the shard ring with the monitoring nodes currently providing the shard status service and moves
+        the alive tracking to the new owners if the shards changed.
+
+        :param state: The system state as returned by the master api.
+        :return: Whether this node is the first shard.
+        """
+        shards = [self.__shard_name]
+        for service, providers in state[2]:
+            if service.endswith("/get_shard_status"):
+                shards.extend(p for p in providers if service == p + "/get_shard_status")
+        if self.__shard_ring.set_members(shards):
+            rospy.loginfo("[MonitoringNode] Shards changed to %s." % ", ".join(self.__shard_ring.members))
+            for seuid in self.__alive_checker.seuids():
+                if not self.__owns(seuid):
+                    self.__alive_checker.discard(seuid)
+            self.__register_alive_timeouts()
+            for seuid in self.__master_connections.seuids:
+                if self.__owns(seuid):
+                    self.__alive_checker.hold(seuid)
+            if self.__change_filter is not None:
+                self.__change_filter.clear()
+        return self.__shard_ring.members[0] == self.__shard_name
+
+    def __owns(self, seuid):
+        """
+        Returns whether this node rates the given seuid, which is always the case if sharding is disabled.
+        """
+        return self.__shard_ring is None or self.__shard_ring.owner(shard_key(seuid)) == self.__shard_name
 
     def __update_enabled(self, event):
-        self.__processing_enabled = rospy.get_param("/enable_statistics", False)
+        self.__processing_enabled = param_cache.get_param("/enable_statistics", False)
 
     def receive_master_api_data(self, data):
         """
         Topic callback for incoming master api messages.
         """
-        # pubs, subs, srvs = data.pubs, data.subs, data.srvs
+        if self.__master_api_decoder.apply(data):
+            added, removed = self.__master_connections.update(self.__master_api_decoder.to_msg())
+            if added or removed:
+                rospy.logdebug("[MonitoringNode] master api: %d connections added, %d removed" % (len(added), len(removed)))
+            # the connections known to the master are alive - even though they might no longer transport any data
+            for seuid in added:
+                if self.__owns(seuid):
+                    self.__alive_checker.hold(seuid)
+            for seuid in removed:
+                self.__alive_checker.release(seuid)
 
-        seuids = generate_seuids_from_master_api_data(data)
+    def receive_serialized_data(self, data, message_class):
+        """
+        Topic callback for serialized statistics messages when sharding is enabled.
+        Messages of seuids assigned to another shard are dropped before they are deserialized.
 
-        for seuid in seuids:
-            # for now only report that this connection is still alive - even though it might no longer transport
-            # any data
-            # TODO does this change the current behaviour of the program? And how could I prevent it
-            self.__report_alive(seuid)
+        :param data: The serialized message.
+        :type data: rospy.AnyMsg
+        :param message_class: The class of the statistics message.
+        """
+        if not self.__processing_enabled:
+            return
+        try:
+            key = peek_shard_key(message_class, data._buff)
+        except struct.error as msg:
+            rospy.logerr("received a truncated %s message: %s" % (message_class.__name__, msg))
+            return
+        if self.__shard_ring.owner(key) != self.__shard_name:
+            self.__foreign += 1
+            return
+        self.receive_data(message_class().deserialize(data._buff))
 
     def receive_data(self, data):
         """
         Topic callback method.
-        Receives data from the topic, sends them to the storage,
-        lets them process and finally publishes the comparison result.
+        Receives data from the topic and queues them for the rating workers,
+        which process them and finally publish the comparison result.
 
         :param data: The data received from the topic.
         """
         if self.__processing_enabled:
             try:
-                seuid = SEUID(data)
+                start = time.time()
+                seuid = SEUID.parse(data)
+                if self.__metrics is not None:
+                    self.__metrics.record("parse", time.time() - start)
+                    self.__metrics.count_received()
                 self.__report_alive(str(seuid))
                 if seuid.topic is not None:
                     self.__report_alive(str(seuid.get_seuid("topic")))
-                try:
-                    self.__process_data(data, seuid)
-                except Exception as msg:
-                    rospy.logerr("an error occured processing the data:\n%s\n%s" % (msg, traceback.format_exc()))
+                identifier = str(seuid)
+                self.__rating_queues[hash(identifier) % len(self.__rating_queues)].put(identifier, (data, seuid))
             except TypeError as msg:
                 rospy.logerr("received invalid message type:\n%s\n%s" % (msg, traceback.format_exc()))
             except NameError as msg:
                 rospy.logerr("received invalid message type (%s):\n%s\n%s" % (type(data), msg, traceback.format_exc()))
 
+    def __rating_worker(self, queue):
+        """
+        Takes received data from a rating queue and processes it until shutdown.
+
+        :param queue: The RatingQueue of this worker.
+        :type queue: RatingQueue
+        """
+        while not rospy.is_shutdown():
+            item = queue.get(0.5)
+            if item is None:
+                continue
+            data, seuid = item[1]
+            try:
+                self.__process_data(data, seuid)
+            except Exception as msg:
+                rospy.logerr("an error occured processing the data:\n%s\n%s" % (msg, traceback.format_exc()))
+
+    def queue_statistics_server(self, request):
+        """
+        Returns the counters of the rating queue and the amount of unchanged ratings not published on request.
+
+        :param request: An empty request.
+        :type request: TriggerRequest.
+        :returns: TriggerResponse
+        """
+        stats = self.__rating_queue_statistics()
+        if self.__change_filter is not None:
+            stats["unchanged"] = self.__change_filter.suppressed
+        message = ", ".join("%s: %s" % (k, stats[k]) for k in sorted(stats.keys()))
+        return std_srvs.srv.TriggerResponse(True, message)
+
+    def __rating_queue_statistics(self):
+        """
+        Returns the counters of all rating queues, the maximum depth is the one of the fullest queue.
+
+        :return: A dictionary like RatingQueue.statistics.
+        """
+        stats = {}
+        for queue in self.__rating_queues:
+            for key, value in queue.statistics().iteritems():
+                if key == "max_depth":
+                    stats[key] = max(stats.get(key, 0), value)
+                else:
+                    stats[key] = stats.get(key, 0) + value
+        return stats
+
+    def shard_status_server(self, request):
+        """
+        Returns the shards and the amount of messages dropped because they belong to another shard on request.
+        Monitoring nodes providing this service are the members of the shard ring.
+
+        :param request: An empty request.
+        :type request: TriggerRequest.
+        :returns: TriggerResponse
+        """
+        message = "shards: %s, foreign: %s" % (", ".join(self.__shard_ring.members), self.__foreign)
+        return std_srvs.srv.TriggerResponse(True, message)
+
     def __process_data(self, data, identifier):
         """
         Kicks off the processing of the received data.
@@ -123,34 +314,91 @@ class MonitoringNode:
         """
         if str(identifier)[0] == "c":
             self.__aggregate_data(data, identifier)
-        result = self.__specification_handler.compare(data, str(identifier)).to_msg_type()
-        container = StorageContainer(rospy.Time.now(), str(identifier), data, result)
-        self.__metadata_storage.store(container)
-        self.__publish_data(result, False)
+        start = time.time()
+        result = self.__specification_handler.compare(data, str(identifier))
+        rated = result.to_msg_type()
+        container = StorageContainer(rospy.Time.now(), str(identifier), data, rated)
+        self.__store(container, data, start)
+        self.__publish_rated(result, rated)
+        if self.__metrics is not None:
+            self.__metrics.count_rated()
         return result
 
+    def __store(self, container, data, start):
+        """
+        Stores a rating and measures the time spent comparing and storing.
+
+        :param container: The StorageContainer of the rating.
+        :type container: StorageContainer
+        :param data: The raw message of the container, None for topics.
+        :param start: The time the comparison started.
+        :type start: float
+        """
+        if self.__metrics is None:
+            self.__metadata_storage.store(container, data)
+            return
+        stored = time.time()
+        self.__metrics.record("compare_topic" if data is None else "compare", stored - start)
+        self.__metadata_storage.store(container, data)
+        self.__metrics.record("store", time.time() - stored)
+
     def __check_alive(self, event):
         """
-        Iterates over all registered specifications and sends an error if no package is received but was expected.
+        Sends an error for every seuid of which no package is received but was expected
+        and forgets the published ratings of seuids which stopped publishing.
+        """
+        for seuid, last_arrival in self.__alive_checker.check():
+            r = RatedStatisticsContainer(seuid)
+            r.add_value("alive", ["False"], ["True"], [1])
+            r.add_value("window_start", last_arrival, None, None)
+            r.add_value("window_stop", rospy.Time.now(), None, None)
+            self.__publish_data(r)
+        if self.__change_filter is not None:
+            self.__change_filter.expire()
+
+    def __alive_timeout(self, seuid):
+        """
+        Returns the time after which a seuid is not alive anymore if no package arrives.
+
+        :param seuid: The seuid.
+        :type seuid: str
+        :return: rospy.Duration
+        """
+        spec = self.__specification_handler.get(seuid)
+        alive_timer = spec.get("alive_timer") if spec is not None else None
+        if not alive_timer:
+            alive_timer = param_cache.get_param("~alive_timer", 10)
+        else:
+            alive_timer = alive_timer[1]
+        return rospy.Duration(alive_timer)
+
+    def __register_alive_timeouts(self):
+        """
+        Tracks all seuids with a loaded specification, so they are reported even if no package ever arrives.
         """
         for seuid in self.__specification_handler.loaded_specifications():
-            if seuid not in self.__alive_timers.keys():
-                spec = self.__specification_handler.get(seuid)
-                alive_timer = spec.get("alive_timer")
-                if not alive_timer:
-                    alive_timer = rospy.get_param("~alive_timer", 10)
-                else:
-                    alive_timer = alive_timer[1]
-                self.__alive_timers[seuid] = rospy.Duration(alive_timer)
-            if seuid not in self.__alive_countdown.keys():
-                self.__alive_countdown[seuid] = rospy.Time.now()
-            if rospy.Time.now() >= self.__alive_countdown[seuid] + self.__alive_timers[seuid]:
-                r = RatedStatisticsContainer(seuid)
-                r.add_value("alive", ["False"], ["True"], [1])
-                r.add_value("window_start", self.__alive_countdown[seuid], None, None)
-                r.add_value("window_stop", rospy.Time.now(), None, None)
-                msg = r.to_msg_type()
-                self.__publish_data(msg)
+            if self.__owns(seuid):
+                self.__alive_checker.set_timeout(seuid, self.__alive_timeout(seuid))
+
+    def reload_specifications(self, msg=None):
+        """
+        Reloads all specifications and updates the alive timeouts of the changed seuids accordingly.
+
+        :param msg: An empty request.
+        :type msg: ReloadSpecificationsRequest.
+        :returns: ReloadSpecificationsResponse listing the changes.
+        """
+        changes = self.__specification_handler.reload_specifications(msg)
+        for seuid in changes.added + changes.changed:
+            if not is_pattern(seuid) and self.__owns(seuid):
+                self.__alive_checker.set_timeout(seuid, self.__alive_timeout(seuid))
+        for seuid in changes.removed:
+            if not is_pattern(seuid) and self.__owns(seuid):
+                # tracked like any other seuid from now on, forgotten once it stops arriving
+                self.__alive_checker.set_timeout(seuid, self.__alive_timeout(seuid), False)
+        if self.__change_filter is not None and (changes.added or changes.removed or changes.changed):
+            self.__change_filter.clear()
+        return ReloadSpecificationsResponse(changes.version, changes.added, changes.removed, changes.changed)
 
     def __report_alive(self, seuid):
         """
@@ -158,39 +406,63 @@ class MonitoringNode:
 
         :param seuid: The seuid of the message that arrived.
         """
-        self.__alive_countdown[seuid] = rospy.Time.now()
+        self.__alive_checker.report(seuid)
 
     def __aggregate_data(self, data, identifier):
         """
-        Collect topic data and send them to get rated after a while.
+        Collect topic data and send them to get rated once per aggregation window.
 
         :param data: A statistics message object
+        :param identifier: The seuid of the connection the message describes.
         """
-        res = self.__specification_handler.compare_topic(self.__aggregate)
-        if self.__aggregate is None or \
-                older_than(self.__aggregate_start, rospy.Duration(self.__aggregation_window)):
-            for r in res:
-                container = StorageContainer(rospy.Time.now(), str(identifier), data, r)
-                self.__metadata_storage.store(container)
-                self.__publish_data(r, False)
-            current_data = []
-            for message in self.__aggregate:
-              if not older_than(message.window_stop, rospy.Duration(self.__aggregation_window)):
-                current_data.append(message)
-            self.__aggregate = current_data
-            self.__aggregate_start = rospy.Time.now()
-        self.__aggregate.append(data)
+        with self.__aggregate_lock:
+            if older_than(self.__aggregate_start, rospy.Duration(self.__aggregation_window)):
+                for topic, values in self.__aggregate.emit().iteritems():
+                    start = time.time()
+                    r = self.__specification_handler.rate_topic(topic, values)
+                    rated = r.to_msg_type()
+                    container = StorageContainer(rospy.Time.now(), topic, None, rated)
+                    self.__store(container, None, start)
+                    self.__publish_rated(r, rated)
+                self.__aggregate_start = rospy.Time.now()
+            self.__aggregate.add(data, str(identifier))
 
     def __publish_data(self, data, queue=True):
         """
-        Pushes a RatedStatistics object to the queue to publish.
+        Pushes a RatedStatisticsContainer object to the queue to publish.
 
-        :param data: RatedStatistics object
+        :param data: RatedStatisticsContainer object
+        :param queue: Whether to publish the data with the next queue publishing or right away.
         """
         if queue:
             self.__pub_queue.append(data)
         else:
-            self.__publisher.publish(data)
+            self.__publish_rated(data)
+
+    def __publish_rated(self, data, message=None):
+        """
+        Publishes a RatedStatisticsContainer object in the configured rated statistics formats,
+        additionally batched if configured. In publish-on-change mode ratings which did not change are skipped.
+
+        :param data: RatedStatisticsContainer object
+        :param message: Optionally the RatedStatistics message already created from the data.
+        """
+        if self.__change_filter is not None and not self.__change_filter.should_publish(data):
+            return
+        start = time.time()
+        if self.__publisher is not None:
+            if message is None:
+                message = data.to_msg_type()
+            self.__publisher.publish(message)
+            if self.__batch_publisher is not None:
+                self.__batch_publisher.publish(message)
+        if self.__numeric_publisher is not None:
+            numeric = data.to_numeric_msg_type()
+            self.__numeric_publisher.publish(numeric)
+            if self.__numeric_batch_publisher is not None:
+                self.__numeric_batch_publisher.publish(numeric)
+        if self.__metrics is not None:
+            self.__metrics.record("publish", time.time() - start)
 
     def __publish_queue(self, event):
         """
@@ -199,8 +471,54 @@ class MonitoringNode:
         :param event: rospy.TimerEvent
         """
         for data in self.__pub_queue:
-            self.__publisher.publish(data)
+            self.__publish_rated(data)
         self.__pub_queue = []
+        dropped = sum(queue.dropped for queue in self.__rating_queues)
+        if dropped > self.__reported_drops:
+            rospy.logwarn("[MonitoringNode] Rating queue overloaded, dropped %s messages (%s in total)."
+                          % (dropped - self.__reported_drops, dropped))
+            self.__reported_drops = dropped
+
+    def __metrics_snapshot(self, reset):
+        """
+        Returns the current MonitoringMetrics message.
+
+        :param reset: Whether the next rate window starts now.
+        """
+        seuids, statistics = self.__metadata_storage.size()
+        queues = self.__rating_queue_statistics()
+        return self.__metrics.snapshot({
+            "rating_queue_depth": queues["depth"],
+            "publish_queue_depth": len(self.__pub_queue),
+            "rating_queue_dropped": queues["dropped"],
+            "stored_seuids": seuids,
+            "stored_statistics": statistics}, reset=reset)
+
+    def __publish_metrics(self, event):
+        """
+        Publishes the metrics of this node on /arni/monitoring_metrics.
+
+        :param event: rospy.TimerEvent
+        """
+        self.__metrics_publisher.publish(self.__metrics_snapshot(True))
+
+    def __publish_seuid_mapping(self, event):
+        """
+        Publishes the ids this process assigned to seuids on /arni/seuid_mapping.
+
+        :param event: rospy.TimerEvent
+        """
+        get_registry().publish(self.__seuid_keyframe_interval)
+
+    def metrics_server(self, request):
+        """
+        Returns the metrics of this node on request, the rates are measured since they were last published.
+
+        :param request: An empty request.
+        :type request: MonitoringMetricsSnapshotRequest.
+        :returns: MonitoringMetricsSnapshotResponse
+        """
+        return MonitoringMetricsSnapshotResponse(self.__metrics_snapshot(False))
 
     def storage_server(self, request):
         """
@@ -213,39 +531,116 @@ class MonitoringNode:
         data = self.__metadata_storage.get("*", request.timestamp)
         response = StatisticHistoryResponse()
         for container in data:
-            if container.identifier[0] == "h":
-                if rospy.Time.now() >= self.__alive_countdown[container.identifier] + self.__alive_timers[container.identifier]:
-                    print("no longer alive - not reporting.")
-                else:
-                    response.host_statistics.append(container.data_raw)
-                    response.rated_host_statistics.append(container.data_rated)
-            elif container.identifier[0] == "n":
-                if rospy.Time.now() >= self.__alive_countdown[container.identifier] + self.__alive_timers[container.identifier]:
-                    print("no longer alive - not reporting.")
-                else:
-                    response.node_statistics.append(container.data_raw)
-                    response.rated_node_statistics.append(container.data_rated)
-            elif container.identifier[0] == "c":
-                if rospy.Time.now() >= self.__alive_countdown[container.identifier] + self.__alive_timers[container.identifier]:
-                    print("no longer alive - not reporting.")
-                else:
-                    response.topic_statistics.append(container.data_raw)
-                    response.rated_topic_statistics.append(container.data_rated)
-            elif container.identifier[0] == "t":
-                if rospy.Time.now() >= self.__alive_countdown[container.identifier] + self.__alive_timers[container.identifier]:
-                    print("no longer alive - not reporting.")
-                else:
-                    response.rated_topic_statistics.append(container.data_rated)
+            self.__add_to_history_response(response, container)
+        return response
+
+    def history_page_server(self, request):
+        """
+        Returns one page of StorageContainer objects on request, newest first.
+
+        :param request: The request containing a seuid pattern, a time range, a page size and a cursor.
+        :type request: StatisticHistoryPageRequest.
+        :returns: StatisticHistoryPageResponse
+        :raises rospy.ServiceException: If the cursor is invalid.
+        """
+        pattern = request.seuid_pattern if request.seuid_pattern else "*"
+        stop = request.stop if not request.stop.is_zero() else None
+        max_items = request.max_items if request.max_items > 0 else self.__history_page_size
+        try:
+            data, cursor = self.__metadata_storage.get_page(pattern, request.start, stop, max_items, request.cursor)
+        except ValueError as e:
+            rospy.logwarn("[MonitoringNode] Rejected a history page request: %s" % e)
+            raise rospy.ServiceException("%s, request the first page with an empty cursor." % e)
+        response = StatisticHistoryPageResponse()
+        for container in data:
+            if self.__add_to_history_response(response, container):
+                response.stamps.append(container.timestamp)
+                response.seuids.append(container.identifier)
+        response.next_cursor = cursor
         return response
 
+    def rollup_server(self, request):
+        """
+        Returns the stored statistics rolled up to the resolution fitting the requested time range.
+
+        :param request: The request containing a seuid pattern, a time range and the maximum amount of windows.
+        :type request: StatisticRollupHistoryRequest.
+        :returns: StatisticRollupHistoryResponse
+        """
+        pattern = request.seuid_pattern if request.seuid_pattern else "*"
+        stop = request.stop if not request.stop.is_zero() else None
+        resolution, rollups = self.__metadata_storage.get_rollups(pattern, request.start, stop, request.max_points)
+        response = StatisticRollupHistoryResponse()
+        response.resolution = resolution
+        for seuid, rollup in rollups:
+            msg = StatisticRollup()
+            msg.seuid = seuid
+            msg.window_start = rollup.window_start
+            msg.window_stop = rollup.window_stop
+            msg.count = rollup.count
+            for field in sorted(rollup.fields.keys()):
+                msg.field.append(field)
+                msg.min.append(rollup.fields[field][0])
+                msg.max.append(rollup.fields[field][1])
+                msg.mean.append(rollup.mean(field))
+            response.rollups.append(msg)
+        return response
+
+    def __add_to_history_response(self, response, container):
+        """
+        Adds a StorageContainer to a history response if the seuid it belongs to is still alive.
+        Topic ratings are left out of StatisticHistoryResponse, it has no field for them.
+
+        :param response: A StatisticHistoryResponse or StatisticHistoryPageResponse.
+        :param container: The StorageContainer to add.
+        :type container: StorageContainer
+        :returns: bool, whether the StorageContainer was added.
+        """
+        if not self.__alive_checker.is_alive(container.identifier):
+            print("no longer alive - not reporting.")
+            return False
+        if container.identifier[0] == "h":
+            response.host_statistics.append(container.data_raw)
+            response.rated_host_statistics.append(container.data_rated)
+        elif container.identifier[0] == "n":
+            response.node_statistics.append(container.data_raw)
+            response.rated_node_statistics.append(container.data_rated)
+        elif container.identifier[0] == "c":
+            response.topic_statistics.append(container.data_raw)
+            response.rated_topic_statistics.append(container.data_rated)
+        elif container.identifier[0] == "t" and hasattr(response, "rated_topics"):
+            # only the history pages have a field for the topic ratings
+            response.rated_topics.append(container.data_rated)
+        else:
+            return False
+        return True
+
     def listener(self):
         """
         Sets up all necessary subscribers and services.
         """
-        rospy.Subscriber('/statistics', rosgraph_msgs.msg.TopicStatistics, self.receive_data)
-        rospy.Subscriber('/statistics_host', arni_msgs.msg.HostStatistics, self.receive_data)
-        rospy.Subscriber('/statistics_node', arni_msgs.msg.NodeStatistics, self.receive_data)
-        rospy.Subscriber('/statistics_master', arni_msgs.msg.MasterApi, self.receive_master_api_data)
-        rospy.Service('~reload_specifications', std_srvs.srv.Empty, self.__specification_handler.reload_specifications)
+        if self.__shard_ring is None:
+            rospy.Subscriber('/statistics', rosgraph_msgs.msg.TopicStatistics, self.receive_data)
+            rospy.Subscriber('/statistics_host', arni_msgs.msg.HostStatistics, self.receive_data)
+            rospy.Subscriber('/statistics_node', arni_msgs.msg.NodeStatistics, self.receive_data)
+        else:
+            rospy.Subscriber('/statistics', rospy.AnyMsg, self.receive_serialized_data, TopicStatistics)
+            rospy.Subscriber('/statistics_host', rospy.AnyMsg, self.receive_serialized_data, HostStatistics)
+            rospy.Subscriber('/statistics_node', rospy.AnyMsg, self.receive_serialized_data, NodeStatistics)
+            rospy.Service('~get_shard_status', std_srvs.srv.Trigger, self.shard_status_server)
+        if self.__master_api_delta:
+            rospy.Subscriber(master_api.DELTA_TOPIC, arni_msgs.msg.MasterApiDelta, self.receive_master_api_data)
+        else:
+            rospy.Subscriber(master_api.TOPIC, arni_msgs.msg.MasterApi, self.receive_master_api_data)
+        rospy.Service('~reload_specifications', ReloadSpecifications, self.reload_specifications)
         rospy.Service('~get_statistic_history', arni_msgs.srv.StatisticHistory, self.storage_server)
+        rospy.Service('~get_statistic_history_page', arni_msgs.srv.StatisticHistoryPage, self.history_page_server)
+        rospy.Service('~get_statistic_rollups', arni_msgs.srv.StatisticRollupHistory, self.rollup_server)
+        rospy.Service('~get_queue_statistics', std_srvs.srv.Trigger, self.queue_statistics_server)
+        if self.__metrics is not None:
+            rospy.Service('~get_monitoring_metrics', MonitoringMetricsSnapshot, self.metrics_server)
+        for queue in self.__rating_queues:
+            worker = threading.Thread(target=self.__rating_worker, args=(queue,))
+            worker.daemon = True
+            worker.start()
         rospy.spin()
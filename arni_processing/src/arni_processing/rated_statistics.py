@@ -1,5 +1,46 @@
-from arni_msgs.msg import RatedStatistics, RatedStatisticsEntity
+from arni_msgs.msg import RatedStatistics, RatedStatisticsEntity, RatedStatisticsNumeric, RatedStatisticsNumericEntity
 from arni_gui.helper_functions import prepare_number_for_representation
+import genpy
+
+#: fields which describe the rated statistics themselves and are not sent as entities
+META_FIELDS = ("host", "node", "node_sub", "node_pub", "topic", "window_start", "window_stop")
+
+
+def to_float(value):
+    """
+    Converts an actual or expected value to a float for the numeric wire format.
+
+    :param value: A number, a boolean, a rospy.Time, a rospy.Duration or their string representation.
+    :return: The float, NaN if the value is unknown.
+    """
+    if value is None:
+        return float("nan")
+    if isinstance(value, (genpy.Time, genpy.Duration)):
+        return value.to_sec()
+    if value == "True":
+        return 1.0
+    if value == "False":
+        return 0.0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def to_bounds(expected):
+    """
+    Converts the expected value of a single value to a (lower, upper) tuple of floats.
+
+    :param expected: A list with the lower and upper limit, a single expected value or None.
+    :return: The tuple, both NaN if there are no limits.
+    """
+    if isinstance(expected, (list, tuple)):
+        if len(expected) < 2:
+            return float("nan"), float("nan")
+        return to_float(expected[0]), to_float(expected[1])
+    value = to_float(expected)
+    return value, value
+
 
 class RatedStatisticsContainer:
     """
@@ -79,7 +120,7 @@ class RatedStatisticsContainer:
         except KeyError:
             r.window_start = r.window_stop = None
         for k in self.keys():
-            if k in ("host", "node", "node_sub", "node_pub", "topic", "window_start", "window_stop"):
+            if k in META_FIELDS:
                 continue
             re = RatedStatisticsEntity()
             re.statistic_type = k
@@ -104,6 +145,52 @@ class RatedStatisticsContainer:
             r.rated_statistics_entity.append(re)
         return r
 
+    def to_numeric_msg_type(self):
+        """
+        Creates a RatedStatisticsNumeric message based on the current data, without formatting any value as string.
+
+        :return: A RatedStatisticsNumeric object from the current data.
+        """
+        r = RatedStatisticsNumeric()
+        r.seuid = self.seuid
+        if self.seuid[0] == "h":
+            r.host = self.seuid[2:]
+        else:
+            r.host = self.host
+        try:
+            r.window_start = self.get_value("window_start")["actual"]
+            r.window_stop = self.get_value("window_stop")["actual"]
+        except KeyError:
+            r.window_start = r.window_stop = None
+        for index, k in enumerate(self.metatype):
+            if k in META_FIELDS:
+                continue
+            re = RatedStatisticsNumericEntity()
+            re.statistic_type = k
+            actual = self.actual[index]
+            expected = self.expected[index]
+            state = self.state[index]
+            if isinstance(actual, (list, tuple)):
+                re.actual_value = [to_float(v) for v in actual]
+                try:
+                    re.state = list(state)
+                except TypeError:
+                    re.state = [state] * len(actual)
+                try:
+                    bounds = [to_bounds(e) for e in expected]
+                except TypeError:
+                    bounds = [(float("nan"), float("nan"))] * len(actual)
+                re.lower_bound = [b[0] for b in bounds]
+                re.upper_bound = [b[1] for b in bounds]
+            else:
+                lower, upper = to_bounds(expected)
+                re.actual_value = [to_float(actual)]
+                re.lower_bound = [lower]
+                re.upper_bound = [upper]
+                re.state = [state]
+            r.rated_statistics_entity.append(re)
+        return r
+
     def get_value(self, metatype):
         """
         Returns values of the given metatype.
@@ -0,0 +1,277 @@
+from itertools import chain
+from operator import attrgetter
+import numpy as np
+import rospy
+
+#: fields whose limits are given in seconds but compared against rospy.Duration values
+DURATION_FIELDS = ("stamp_age_max", "stamp_age_mean", "stamp_age_stddev", "period_max", "period_mean", "period_stddev")
+
+#: raw fields which are only used to derive other fields and are not rated themselves
+EXCLUDED_FIELDS = ("delivered_msgs", "traffic")
+
+#: fields derived from the raw fields of connection statistics
+DERIVED_FIELDS = ("bandwidth", "frequency")
+
+#: element types of array fields which are rated with numpy
+NUMERIC_TYPES = ("int8", "int16", "int32", "int64", "uint16", "uint32", "uint64", "float32", "float64")
+
+#: the maximum amount of cached limit vector layouts per RatingPlan
+MAX_LAYOUTS = 64
+
+#: the minimum total length of the rated numeric arrays of a message for rating them with numpy,
+#: shorter ones are rated faster element by element, see test/benchmark_array_rating.py
+MIN_VECTOR_LENGTH = 40
+
+
+def parse_limits(specification, field, offset=0):
+    """
+    Reads the limits of a field from a Specification object.
+
+    :param specification: The Specification object.
+    :type specification: Specification
+    :param field: The rated field.
+    :type field: str
+    :param offset: The index inside an array field.
+    :type offset: int
+    :return: A list with the lower and upper limit, None if the specification does not define any.
+    """
+    if specification is None or field is None:
+        return None
+    try:
+        specs = specification.get(field)[1]
+        if isinstance(specs, list) and len(specs) > 0 and isinstance(specs[0], list):
+            if len(specs) > offset:
+                specs = specs[offset]
+            else:
+                return None
+        limits = specs[0:2]
+        if len(specs) > 2 and specs[2][0].lower() == "r":
+            if limits[1] > 1:
+                limits[1] -= 1
+            m = limits[0]
+            r = limits[1]
+            limits[0] = m - m * r
+            limits[1] = m + m * r
+    except TypeError:
+        limits = None
+    except AttributeError:
+        limits = None
+    if limits is not None and field in DURATION_FIELDS:
+        limits = [rospy.Duration.from_sec(limits[0]), rospy.Duration.from_sec(limits[1])]
+    return limits
+
+
+def get_bounds(limits):
+    """
+    Sorts the given limits in place and returns them as a (lower, upper) tuple.
+
+    :param limits: A list with two limits.
+    :return: The tuple, None if the limits can not be used for rating.
+    """
+    if not isinstance(limits, list) or len(limits) < 2 or \
+            not isinstance(limits[0], (int, long, float, complex)) or \
+            not isinstance(limits[1], (int, long, float, complex)):
+        return None
+    limits.sort()
+    return limits[0], limits[1]
+
+
+def rate(value, bounds):
+    """
+    Rates a value against the bounds computed by get_bounds.
+
+    :return: 0 if the value is too high, 1 if it is too low, 3 if it is within the bounds and 2 if there are no bounds.
+    """
+    if bounds is None:
+        return 2
+    if bounds[0] > value:
+        return 1
+    if bounds[1] < value:
+        return 0
+    return 3
+
+
+def rate_vector(values, lower, upper, known):
+    """
+    Rates all values of an array field at once.
+
+    :param values: The values to rate.
+    :type values: numpy.ndarray
+    :param lower: The lower limit per value.
+    :type lower: numpy.ndarray or float
+    :param upper: The upper limit per value.
+    :type upper: numpy.ndarray or float
+    :param known: Whether there are limits per value, values without limits are rated 2.
+    :type known: numpy.ndarray
+    :return: A numpy.ndarray with the states, see rate.
+    """
+    states = np.where(values < lower, 1, np.where(values > upper, 0, 3))
+    states[~known] = 2
+    return states
+
+
+class RatingPlan:
+    """
+    The precompiled comparison between one message type and one specification.
+
+    Lists the rated fields of the message type together with their limits, so rating a message
+    does not need any reflection or limit lookups. All numeric array fields of a message are
+    rated together in one numpy pass against precomputed limit vectors if they are long enough.
+    """
+
+    def __init__(self, message_class, identifier, specification=None, vectorize=True,
+                 min_vector_length=MIN_VECTOR_LENGTH):
+        """
+        Compiles the plan.
+
+        :param message_class: The class of the messages to rate.
+        :type message_class: type
+        :param identifier: A seuid of the rated messages, only its type is considered.
+        :type identifier: str
+        :param specification: The Specification object the messages are compared with.
+        :type specification: Specification
+        :param vectorize: Whether to rate numeric array fields with numpy instead of element by element.
+        :type vectorize: bool
+        :param min_vector_length: The minimum total length of the numeric arrays of a message for rating them
+            with numpy.
+        :type min_vector_length: int
+        """
+        slot_types = dict(zip(message_class.__slots__, getattr(message_class, "_slot_types", [])))
+        fields = [f for f in sorted(message_class.__slots__)
+                  if f[0] != "_" and "serialize" not in f and f not in EXCLUDED_FIELDS]
+        if identifier[0] == "c":
+            fields.extend(DERIVED_FIELDS)
+        self.__entries = []
+        self.__vector_fields = []
+        for field in fields:
+            getter = None if field in DERIVED_FIELDS else attrgetter(field)
+            limits = parse_limits(specification, field)
+            bounds = get_bounds(limits)
+            per_index = None
+            if specification is not None and specification.has_field(field):
+                specs = specification.get(field)[1]
+                if isinstance(specs, list) and len(specs) > 0 and isinstance(specs[0], list):
+                    per_index = []
+                    for i in range(len(specs)):
+                        index_limits = parse_limits(specification, field, i)
+                        per_index.append((index_limits, get_bounds(index_limits)))
+            vectorized = vectorize and self.__is_numeric_array(slot_types.get(field)) and \
+                (bounds is not None or per_index is not None)
+            if vectorized:
+                self.__vector_fields.append((field, getter, limits, bounds, per_index))
+            self.__entries.append((field, getter, limits, bounds, per_index, vectorized))
+        #: limit vectors of the vectorized fields by the lengths of their arrays
+        self.__layouts = {}
+        self.__min_vector_length = min_vector_length
+
+    def __is_numeric_array(self, slot_type):
+        return slot_type is not None and slot_type.endswith("[]") and slot_type[:-2] in NUMERIC_TYPES
+
+    def rate(self, data, result):
+        """
+        Rates a message and adds the outcome to a RatedStatisticsContainer.
+
+        :param data: The message to rate.
+        :param result: The container collecting the outcome.
+        :type result: RatedStatisticsContainer
+        """
+        vector_states = self.__rate_vector_fields(data) if self.__vector_fields else None
+        window_len = None
+        for field, getter, limits, bounds, per_index, vectorized in self.__entries:
+            if vector_states is not None and vectorized:
+                value, expected, states = vector_states[field]
+                result.add_value(field, list(value), expected, states)
+                continue
+            if getter is None:
+                if window_len is None:
+                    window_len = (data.window_stop - data.window_start).to_sec()
+                    if window_len == 0:
+                        window_len = 1.0
+                if field == "bandwidth":
+                    value = data.traffic / window_len
+                else:
+                    value = data.delivered_msgs / window_len
+            else:
+                value = getter(data)
+            if value is None:
+                continue
+            if isinstance(value, (list, tuple)):
+                states, expected = self.__rate_elements(value, limits, bounds, per_index)
+                result.add_value(field, list(value), expected, states)
+            else:
+                result.add_value(field, value, limits, rate(value, bounds))
+
+    def __rate_elements(self, value, limits, bounds, per_index):
+        """
+        Rates an array field element by element.
+
+        :return: A tuple of the list of states and the list of expected values.
+        """
+        if per_index is None:
+            return [rate(v, bounds) for v in value], [limits] * len(value)
+        states = []
+        expected = []
+        count = len(per_index)
+        for i, v in enumerate(value):
+            if i < count:
+                index_limits, index_bounds = per_index[i]
+            else:
+                index_limits, index_bounds = None, None
+            states.append(rate(v, index_bounds))
+            expected.append(index_limits)
+        return states, expected
+
+    def __rate_vector_fields(self, data):
+        """
+        Rates all vectorized array fields of a message in one numpy pass.
+
+        :return: A dictionary mapping each field to its values, expected values and states, None if the arrays are
+            too short and have to be rated element by element.
+        """
+        values = [getter(data) for field, getter, limits, bounds, per_index in self.__vector_fields]
+        lengths = tuple(len(v) for v in values)
+        if sum(lengths) < self.__min_vector_length:
+            return None
+        layout = self.__layouts.get(lengths)
+        if layout is None:
+            layout = self.__build_layout(lengths)
+        lower, upper, known, expected = layout
+        flat = np.fromiter(chain.from_iterable(values), np.float64, len(known))
+        states = rate_vector(flat, lower, upper, known).tolist()
+        rated = {}
+        offset = 0
+        for i, entry in enumerate(self.__vector_fields):
+            end = offset + lengths[i]
+            rated[entry[0]] = (values[i], expected[i][:], states[offset:end])
+            offset = end
+        return rated
+
+    def __build_layout(self, lengths):
+        """
+        Concatenates the limits of all vectorized fields for arrays of the given lengths.
+
+        :param lengths: The length of each vectorized array field.
+        :type lengths: tuple
+        :return: A tuple of the lower limits, the upper limits, the mask of known limits
+            and the expected values per field.
+        """
+        lower = []
+        upper = []
+        known = []
+        expected = []
+        for (field, getter, limits, bounds, per_index), count in zip(self.__vector_fields, lengths):
+            if per_index is None:
+                index_entries = [(limits, bounds)] * count
+            else:
+                index_entries = per_index[:count] + [(None, None)] * (count - len(per_index))
+            for index_limits, index_bounds in index_entries:
+                known.append(index_bounds is not None)
+                lower.append(index_bounds[0] if index_bounds is not None else np.nan)
+                upper.append(index_bounds[1] if index_bounds is not None else np.nan)
+            expected.append([index_limits for index_limits, index_bounds in index_entries])
+        layout = (np.array(lower, dtype=np.float64), np.array(upper, dtype=np.float64),
+                  np.array(known, dtype=bool), expected)
+        if len(self.__layouts) >= MAX_LAYOUTS:
+            self.__layouts.clear()
+        self.__layouts[lengths] = layout
+        return layout
@@ -0,0 +1,115 @@
+from collections import deque
+import threading
+
+
+class RatingQueue:
+    """
+    A bounded queue between the topic callbacks receiving statistics and the workers rating them.
+
+    Every message covers its own window, so as long as the queue is not full every message is kept.
+    When the queue is full the overload policy decides which message is dropped:
+
+    - ``latest_per_seuid``: a new message replaces the newest pending one of the same seuid. If no message of
+      its seuid is pending the oldest pending message is dropped.
+    - ``drop_oldest``: the oldest pending message is dropped.
+    - ``drop_newest``: the new message is dropped.
+    """
+
+    POLICIES = ("latest_per_seuid", "drop_oldest", "drop_newest")
+
+    def __init__(self, max_size=1000, policy="latest_per_seuid"):
+        """
+        Creates an empty queue.
+
+        :param max_size: The maximum amount of pending messages.
+        :type max_size: int.
+        :param policy: The overload policy, one of POLICIES.
+        :type policy: str.
+        :raises ValueError: If the policy is unknown.
+        """
+        if policy not in RatingQueue.POLICIES:
+            raise ValueError("[RatingQueue] Unknown overload policy %s." % policy)
+        self.max_size = max_size
+        self.policy = policy
+        #: the pending [seuid, message] entries, oldest first
+        self.__order = deque()
+        #: seuid -> its newest entry in the queue
+        self.__newest = {}
+        self.__condition = threading.Condition(threading.Lock())
+        #: the amount of messages accepted by put
+        self.enqueued = 0
+        #: the amount of messages dropped because the queue was full
+        self.dropped = 0
+        #: the amount of messages replaced by a newer one of the same seuid
+        self.coalesced = 0
+        #: the highest amount of pending messages seen so far
+        self.max_depth = 0
+
+    def __len__(self):
+        return len(self.__order)
+
+    def put(self, seuid, data):
+        """
+        Adds a message to the queue, never blocks.
+
+        :param seuid: The seuid of the message.
+        :type seuid: str.
+        :param data: The message.
+        :return: False if the message was dropped right away.
+        """
+        with self.__condition:
+            if len(self.__order) >= self.max_size:
+                if self.policy == "latest_per_seuid":
+                    entry = self.__newest.get(seuid)
+                    if entry is not None:
+                        entry[1] = data
+                        self.coalesced += 1
+                        return True
+                elif self.policy == "drop_newest":
+                    self.dropped += 1
+                    return False
+                self.__pop()
+                self.dropped += 1
+            entry = [seuid, data]
+            self.__order.append(entry)
+            self.__newest[seuid] = entry
+            self.enqueued += 1
+            self.max_depth = max(self.max_depth, len(self.__order))
+            self.__condition.notify()
+            return True
+
+    def get(self, timeout=None):
+        """
+        Removes and returns the oldest pending message.
+
+        :param timeout: Seconds to wait for a message, None to wait forever.
+        :type timeout: float.
+        :return: A tuple (seuid, message) or None if the timeout expired.
+        """
+        with self.__condition:
+            if not self.__order:
+                self.__condition.wait(timeout)
+                if not self.__order:
+                    return None
+            return self.__pop()
+
+    def __pop(self):
+        """
+        Removes the oldest pending entry, the condition has to be held.
+
+        :return: A tuple (seuid, message).
+        """
+        entry = self.__order.popleft()
+        if self.__newest.get(entry[0]) is entry:
+            del self.__newest[entry[0]]
+        return entry[0], entry[1]
+
+    def statistics(self):
+        """
+        Returns the counters of the queue.
+
+        :return: A dictionary with the keys *depth*, *max_depth*, *enqueued*, *dropped* and *coalesced*.
+        """
+        with self.__condition:
+            return {"depth": len(self.__order), "max_depth": self.max_depth, "enqueued": self.enqueued,
+                    "dropped": self.dropped, "coalesced": self.coalesced}
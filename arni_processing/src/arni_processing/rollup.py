@@ -0,0 +1,201 @@
+from fnmatch import fnmatchcase
+from operator import attrgetter
+import threading
+import rospy
+from storage_buffer import StorageBuffer
+
+#: field types which are rolled up, durations are rolled up in seconds
+ROLLUP_TYPES = ("int8", "int16", "int32", "int64", "uint16", "uint32", "uint64", "float32", "float64", "duration")
+
+#: the maximum amount of cached array field names
+MAX_ARRAY_NAMES = 1024
+
+#: getters of the rolled up fields by message class
+_layouts = {}
+
+#: (field, length) -> the names the elements of an array field are rolled up as
+_array_names = {}
+
+
+def numeric_fields(message_class):
+    """
+    Returns the rolled up fields of a message class.
+
+    :param message_class: A message class like HostStatistics.
+    :return: A list of (field, getter, is_array, is_duration) tuples.
+    """
+    layout = _layouts.get(message_class)
+    if layout is None:
+        layout = []
+        for field, slot_type in zip(message_class.__slots__, getattr(message_class, "_slot_types", [])):
+            is_array = slot_type.endswith("[]")
+            base = slot_type[:-2] if is_array else slot_type
+            if base in ROLLUP_TYPES:
+                layout.append((field, attrgetter(field), is_array, base == "duration"))
+        _layouts[message_class] = layout
+    return layout
+
+
+def array_names(field, length):
+    """
+    Returns the names the elements of an array field are rolled up as, like *field_0*.
+
+    :param field: The name of the array field.
+    :type field: str
+    :param length: The length of the array.
+    :type length: int
+    :return: tuple of str
+    """
+    names = _array_names.get((field, length))
+    if names is None:
+        names = tuple("%s_%d" % (field, i) for i in range(length))
+        if len(_array_names) >= MAX_ARRAY_NAMES:
+            _array_names.clear()
+        _array_names[(field, length)] = names
+    return names
+
+
+class Rollup(object):
+    """
+    The minimum, maximum, sum and count of every numeric field of the statistics of one seuid in one time window.
+    Array fields are rolled up per index, named like *field_0*.
+    """
+
+    __slots__ = ("window_start", "window_stop", "count", "fields")
+
+    def __init__(self, window_start, window_stop):
+        self.window_start = window_start
+        self.window_stop = window_stop
+        self.count = 0
+        #: field -> [minimum, maximum, sum, count]
+        self.fields = {}
+
+    def add(self, message):
+        """
+        Adds the numeric fields of a statistics message.
+
+        :param message: A HostStatistics, NodeStatistics or TopicStatistics message.
+        """
+        self.count += 1
+        fields = self.fields
+        for field, getter, is_array, is_duration in numeric_fields(message.__class__):
+            value = getter(message)
+            if is_array:
+                values = zip(array_names(field, len(value)), value)
+            else:
+                values = ((field, value),)
+            for name, v in values:
+                if is_duration:
+                    v = v.to_sec()
+                entry = fields.get(name)
+                if entry is None:
+                    fields[name] = [v, v, v, 1]
+                else:
+                    if v < entry[0]:
+                        entry[0] = v
+                    if v > entry[1]:
+                        entry[1] = v
+                    entry[2] += v
+                    entry[3] += 1
+
+    def mean(self, field):
+        """
+        Returns the mean of a field.
+        """
+        entry = self.fields[field]
+        return float(entry[2]) / entry[3]
+
+
+class RollupTier:
+    """
+    Rolls up the statistics of every seuid into windows of a fixed resolution and keeps them for some time.
+    Rollups are updated as the statistics are stored.
+    """
+
+    def __init__(self, resolution, retention):
+        """
+        Creates an empty tier.
+
+        :param resolution: The length of a window in seconds.
+        :type resolution: int.
+        :param retention: The amount of seconds rollups are kept.
+        :type retention: int.
+        """
+        self.resolution = int(resolution)
+        self.retention = retention
+        self.__rollups = {}
+        self.__lock = threading.Lock()
+
+    def add(self, timestamp, identifier, message):
+        """
+        Adds a statistics message to the rollup of its window.
+
+        :param timestamp: The time the message was stored.
+        :type timestamp: rospy.Time.
+        :param identifier: The seuid of the message.
+        :type identifier: str.
+        :param message: A HostStatistics, NodeStatistics or TopicStatistics message.
+        """
+        start = rospy.Time(timestamp.secs - timestamp.secs % self.resolution)
+        with self.__lock:
+            buff = self.__rollups.get(identifier)
+            if buff is None:
+                buff = StorageBuffer(0)
+                self.__rollups[identifier] = buff
+            rollup = buff.latest()
+            if rollup is None or rollup.window_start != start:
+                found = buff.between(start, start)
+                if found:
+                    rollup = found[0]
+                else:
+                    rollup = Rollup(start, start + rospy.Duration(self.resolution))
+                    buff.add(start, rollup)
+            rollup.add(message)
+
+    def get(self, pattern="*", start=rospy.Time(0), stop=None):
+        """
+        Returns the rollups of the seuids matching a pattern whose windows overlap a time range.
+
+        :param pattern: A glob pattern the seuids have to match.
+        :type pattern: str.
+        :param start: The start of the time range.
+        :type start: rospy.Time.
+        :param stop: The end of the time range, None for no limit.
+        :type stop: rospy.Time.
+        :returns: A list of (seuid, Rollup) tuples ordered by seuid and time.
+        """
+        first = rospy.Time(start.secs - start.secs % self.resolution)
+        results = []
+        with self.__lock:
+            for identifier in sorted(self.__rollups.keys()):
+                if not fnmatchcase(identifier, pattern):
+                    continue
+                buff = self.__rollups[identifier]
+                rollups = buff.since(first) if stop is None else buff.between(first, stop)
+                results.extend((identifier, rollup) for rollup in rollups)
+        return results
+
+    def covers(self, start, now):
+        """
+        Returns whether the rollups since the given time are still kept.
+        """
+        return now.secs - start.secs <= self.retention
+
+    def expire(self, now):
+        """
+        Removes the rollups which are older than the retention.
+
+        :param now: The current time.
+        :type now: rospy.Time.
+        :returns: The amount of removed rollups.
+        """
+        if now.secs <= self.retention:
+            return 0
+        oldest = rospy.Time(now.secs - self.retention - self.resolution)
+        removed = 0
+        with self.__lock:
+            for identifier in self.__rollups.keys():
+                removed += self.__rollups[identifier].expire(oldest)
+                if not len(self.__rollups[identifier]):
+                    del self.__rollups[identifier]
+        return removed
@@ -0,0 +1,252 @@
+from fnmatch import fnmatchcase
+import errno
+import mmap
+import os
+import struct
+import threading
+import rospy
+from arni_msgs.msg import HostStatistics, NodeStatistics, RatedStatistics
+from rosgraph_msgs.msg import TopicStatistics
+from storage_container import StorageContainer
+
+#: secs, nsecs, length of the identifier, type of the raw data, length of the raw data, length of the rated data
+RECORD_HEADER = struct.Struct("<IIHBII")
+
+#: the message types of the raw data by the code stored in the record header, 0 means no raw data
+RAW_TYPES = (None, HostStatistics, NodeStatistics, TopicStatistics)
+
+#: file name suffix of the segments
+SEGMENT_SUFFIX = ".seg"
+
+
+class SegmentStore:
+    """
+    Keeps StorageContainer objects on disk in append-only segment files.
+
+    Every segment holds the containers of one time partition of *segment_duration* seconds, the file is named
+    after the start of the partition. Segments are memory-mapped for reading, so only the containers matching
+    a query are deserialized. Whole segments are deleted once they are older than *max_age* or the segments
+    use more than *max_size* bytes.
+    """
+
+    def __init__(self, directory, segment_duration=600, max_age=21600, max_size=1024 * 1024 * 1024):
+        """
+        Opens the segment store in the given directory, which is created if it does not exist.
+
+        :param directory: The directory holding the segment files.
+        :type directory: str.
+        :param segment_duration: The time span of one segment in seconds.
+        :type segment_duration: int.
+        :param max_age: Segments ending more than this amount of seconds ago are deleted.
+        :type max_age: int.
+        :param max_size: The maximum size of all segments in bytes, 0 for no limit.
+        :type max_size: int.
+        """
+        self.directory = os.path.expanduser(directory)
+        self.segment_duration = int(segment_duration)
+        self.max_age = max_age
+        self.max_size = max_size
+        self.__lock = threading.Lock()
+        self.__file = None
+        self.__file_start = None
+        try:
+            os.makedirs(self.directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+    def __segments(self):
+        """
+        Returns the start times of all segments on disk, oldest first.
+        """
+        starts = []
+        for name in os.listdir(self.directory):
+            if name.endswith(SEGMENT_SUFFIX):
+                try:
+                    starts.append(int(name[:-len(SEGMENT_SUFFIX)]))
+                except ValueError:
+                    continue
+        starts.sort()
+        return starts
+
+    def __path(self, start):
+        return os.path.join(self.directory, "%d%s" % (start, SEGMENT_SUFFIX))
+
+    def append(self, container):
+        """
+        Appends a StorageContainer to the segment of its timestamp.
+
+        :param container: The container to store.
+        :type container: StorageContainer
+        """
+        # the container keeps its messages serialized already
+        raw_type = RAW_TYPES.index(container.raw_class) if container.raw_class in RAW_TYPES else 0
+        raw = container.raw_buffer if raw_type else ""
+        rated = container.rated_buffer if container.rated_buffer is not None else ""
+        identifier = container.identifier
+        header = RECORD_HEADER.pack(container.timestamp.secs, container.timestamp.nsecs, len(identifier),
+                                    raw_type, len(raw), len(rated))
+        start = container.timestamp.secs - container.timestamp.secs % self.segment_duration
+        with self.__lock:
+            if start != self.__file_start:
+                self.__open(start)
+            self.__file.write(header + identifier + raw + rated)
+
+    def __open(self, start):
+        """
+        Closes the current segment and opens the one starting at the given time for appending.
+        A record cut off by a crash at the end of an existing segment is removed first.
+        """
+        self.__close()
+        path = self.__path(start)
+        if os.path.exists(path):
+            valid = self.__valid_length(path)
+            if valid < os.path.getsize(path):
+                with open(path, "r+b") as f:
+                    f.truncate(valid)
+        self.__file = open(path, "ab")
+        self.__file_start = start
+
+    def __close(self):
+        if self.__file is not None:
+            self.__file.close()
+        self.__file = None
+        self.__file_start = None
+
+    def __valid_length(self, path):
+        """
+        Returns the length of the complete records at the beginning of a segment.
+        """
+        valid = 0
+        for offset, header in self.__records(path):
+            valid = offset + RECORD_HEADER.size + header[2] + header[4] + header[5]
+        return valid
+
+    def __records(self, path):
+        """
+        Yields the offset and the header of every complete record of a segment.
+        """
+        size = os.path.getsize(path)
+        if size == 0:
+            return
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                offset = 0
+                while offset + RECORD_HEADER.size <= size:
+                    header = RECORD_HEADER.unpack_from(data, offset)
+                    end = offset + RECORD_HEADER.size + header[2] + header[4] + header[5]
+                    if end > size:
+                        break
+                    yield offset, header
+                    offset = end
+            finally:
+                data.close()
+
+    def read(self, pattern="*", start=rospy.Time(0), stop=None, limit=None, skip=None):
+        """
+        Returns the StorageContainers on disk matching the given pattern within the given time range.
+        Segments are read newest first.
+
+        :param pattern: A glob pattern the identifiers have to match.
+        :type pattern: str.
+        :param start: The oldest timestamp to include.
+        :type start: rospy.Time.
+        :param stop: The newest timestamp to include, None for no limit.
+        :type stop: rospy.Time.
+        :param limit: Stop reading older segments once this amount of containers was found.
+        :type limit: int.
+        :param skip: Optionally called with the timestamp and the identifier of a record, which is left out if it
+            returns True.
+        :type skip: callable.
+        :returns: A list of StorageContainers, unordered.
+        """
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.flush()
+            segments = self.__segments()
+        first = start.secs - start.secs % self.segment_duration
+        results = []
+        for segment in reversed(segments):
+            if segment + self.segment_duration <= first:
+                break
+            if stop is not None and segment > stop.secs:
+                continue
+            try:
+                results.extend(self.__read_segment(self.__path(segment), pattern, start, stop, skip))
+            except (IOError, OSError):
+                # deleted by the cleanup in the meantime
+                continue
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+    def __read_segment(self, path, pattern, start, stop, skip):
+        """
+        Returns the matching StorageContainers of a segment, deserializing only the matching records.
+        """
+        results = []
+        size = os.path.getsize(path)
+        if size == 0:
+            return results
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                offset = 0
+                while offset + RECORD_HEADER.size <= size:
+                    secs, nsecs, id_len, raw_type, raw_len, rated_len = RECORD_HEADER.unpack_from(data, offset)
+                    begin = offset + RECORD_HEADER.size
+                    offset = begin + id_len + raw_len + rated_len
+                    if offset > size:
+                        break
+                    timestamp = rospy.Time(secs, nsecs)
+                    if timestamp < start or (stop is not None and timestamp > stop):
+                        continue
+                    identifier = data[begin:begin + id_len]
+                    if not fnmatchcase(identifier, pattern) or (skip is not None and skip(timestamp, identifier)):
+                        continue
+                    begin += id_len
+                    # the messages are only rebuilt once the container is asked for them
+                    raw = data[begin:begin + raw_len] if raw_type else None
+                    begin += raw_len
+                    rated = data[begin:begin + rated_len] if rated_len else None
+                    results.append(StorageContainer.from_buffers(timestamp, identifier, RAW_TYPES[raw_type], raw,
+                                                                 RatedStatistics if rated_len else None, rated))
+            finally:
+                data.close()
+        return results
+
+    def expire(self, now=None):
+        """
+        Deletes the segments which are too old or exceed the size limit, oldest first.
+        The segment currently written to is kept.
+
+        :param now: The current time, defaults to rospy.Time.now().
+        :type now: rospy.Time.
+        :returns: The amount of deleted segments.
+        """
+        if now is None:
+            now = rospy.Time.now()
+        deleted = 0
+        with self.__lock:
+            segments = [s for s in self.__segments() if s != self.__file_start]
+            sizes = dict((s, os.path.getsize(self.__path(s))) for s in segments)
+            total = sum(sizes.values())
+            if self.__file_start is not None:
+                total += os.path.getsize(self.__path(self.__file_start))
+            for segment in segments:
+                if segment + self.segment_duration < now.secs - self.max_age or \
+                        (self.max_size and total > self.max_size):
+                    os.remove(self.__path(segment))
+                    total -= sizes[segment]
+                    deleted += 1
+                else:
+                    break
+        return deleted
+
+    def close(self):
+        """
+        Closes the segment currently written to.
+        """
+        with self.__lock:
+            self.__close()
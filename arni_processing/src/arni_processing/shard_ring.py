@@ -0,0 +1,115 @@
+from bisect import bisect
+from hashlib import md5
+import struct
+from arni_msgs.msg import HostStatistics, NodeStatistics
+from rosgraph_msgs.msg import TopicStatistics
+from arni_core.helper import SEUID_DELIMITER
+
+#: the length prefix of a serialized string
+_LENGTH = struct.Struct("<I")
+
+#: the amount of cached owners after which the cache is cleared
+MAX_CACHED_OWNERS = 100000
+
+
+def _hash(key):
+    return struct.unpack(">Q", md5(key).digest()[:8])[0]
+
+
+def shard_key(seuid):
+    """
+    Returns the key a seuid is assigned to a shard by. Connections are assigned by their topic,
+    so a topic and all its connections are rated and aggregated by the same shard.
+
+    :param seuid: The seuid.
+    :type seuid: str
+    :return: str
+    """
+    if seuid[0] == "c":
+        return "t" + SEUID_DELIMITER + seuid.split(SEUID_DELIMITER)[2]
+    return seuid
+
+
+def _read_string(buff, offset):
+    length = _LENGTH.unpack_from(buff, offset)[0]
+    offset += _LENGTH.size
+    return buff[offset:offset + length], offset + length
+
+
+def peek_shard_key(message_class, buff):
+    """
+    Returns the shard key of a serialized statistics message, reading only its leading strings.
+
+    :param message_class: HostStatistics, NodeStatistics or TopicStatistics.
+    :param buff: The serialized message.
+    :type buff: str
+    :return: str
+    :raises TypeError: If the message class is none of the mentioned ones.
+    :raises struct.error: If the message is cut off.
+    """
+    first, offset = _read_string(buff, 0)
+    if message_class is HostStatistics:
+        return "h" + SEUID_DELIMITER + first
+    elif message_class is NodeStatistics:
+        return "n" + SEUID_DELIMITER + _read_string(buff, offset)[0]
+    elif message_class is TopicStatistics:
+        return "t" + SEUID_DELIMITER + first
+    raise TypeError("Cannot peek the shard key of a %s message." % message_class)
+
+
+class ShardRing:
+    """
+    Assigns shard keys to the members of a consistent hash ring.
+
+    Every member is placed on the ring *replicas* times. A key belongs to the member following its hash on the
+    ring, so a joining or leaving member only moves the keys next to its own places. Owners are cached until
+    the members change.
+    """
+
+    def __init__(self, replicas=64):
+        """
+        Creates a ring without members.
+
+        :param replicas: The amount of places of every member on the ring.
+        :type replicas: int
+        """
+        self.replicas = replicas
+        #: (sorted member tuple, sorted hashes, owners of the hashes, owner cache), replaced as a whole
+        self.__state = ((), [], [], {})
+
+    @property
+    def members(self):
+        return list(self.__state[0])
+
+    def set_members(self, members):
+        """
+        Replaces the members of the ring.
+
+        :param members: The names of the members.
+        :type members: list
+        :return: Whether the members changed.
+        """
+        members = tuple(sorted(set(members)))
+        if members == self.__state[0]:
+            return False
+        points = sorted((_hash("%s#%d" % (member, i)), member) for member in members for i in range(self.replicas))
+        self.__state = (members, [p[0] for p in points], [p[1] for p in points], {})
+        return True
+
+    def owner(self, key):
+        """
+        Returns the member a shard key belongs to.
+
+        :param key: The shard key.
+        :type key: str
+        :return: The name of the member, None if the ring has no members.
+        """
+        members, hashes, owners, cache = self.__state
+        owner = cache.get(key)
+        if owner is None and hashes:
+            index = bisect(hashes, _hash(key))
+            owner = owners[index if index < len(hashes) else 0]
+            if len(cache) >= MAX_CACHED_OWNERS:
+                cache.clear()
+            cache[key] = owner
+        return owner
@@ -60,4 +60,25 @@ class Specification:
         output = ""
         for k, t in self.__values.iteritems():
             output += "- %s: %s\n" % (str(k), str(t))
-        return output
\ No newline at end of file
+        return output
+
+    def __eq__(self, other):
+        """
+        Returns whether another Specification has the same seuid and values.
+
+        :param other: The object to compare with.
+        :type other: object
+        :return: bool
+        """
+        return isinstance(other, Specification) and self.seuid == other.seuid and \
+            self.__values == other.__values
+
+    def __ne__(self, other):
+        """
+        Returns whether another object is not an equal Specification.
+
+        :param other: The object to compare with.
+        :type other: object
+        :return: bool
+        """
+        return not self == other
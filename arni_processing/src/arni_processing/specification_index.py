@@ -0,0 +1,129 @@
+from fnmatch import translate
+import re
+from arni_core.helper import SEUID_DELIMITER
+
+#: specification keys with this prefix are regular expressions the whole seuid has to match
+REGEX_PREFIX = "re:"
+
+#: characters which make a specification key a glob pattern
+GLOB_CHARS = "*?["
+
+#: the seuid types a pattern can be restricted to
+SEUID_TYPES = "nhtc"
+
+
+def is_pattern(key):
+    """
+    Returns whether a specification key is a glob pattern or a regular expression instead of a seuid.
+
+    :param key: The specification key.
+    :type key: str
+    :return: bool
+    """
+    return key.startswith(REGEX_PREFIX) or any(c in key for c in GLOB_CHARS)
+
+
+def has_alternation(expression):
+    """
+    Returns whether a regular expression has a ``|`` outside of groups and character classes.
+
+    :param expression: The regular expression.
+    :type expression: str
+    :return: bool
+    """
+    depth = 0
+    class_start = None
+    escaped = False
+    for i, c in enumerate(expression):
+        if escaped:
+            escaped = False
+        elif c == "\\":
+            escaped = True
+        elif class_start is not None:
+            # a ] right after the opening [ or [^ is a literal
+            if c == "]" and i > class_start + 1 and expression[class_start + 1:i] != "^":
+                class_start = None
+        elif c == "[":
+            class_start = i
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+        elif c == "|" and depth == 0:
+            return True
+    return False
+
+
+class SpecificationIndex:
+    """
+    Finds the Specification objects whose glob or regex patterns match a seuid.
+
+    The patterns are compiled when they are added and grouped by the seuid type they are restricted to.
+    Every pattern also keeps its literal prefix, so most patterns are ruled out by a plain string comparison.
+    If several patterns match the most specific one wins, that is the one with the most literal characters.
+    Patterns of equal specificity are tried in the order they were added.
+    """
+
+    def __init__(self):
+        #: seuid type -> list of (specificity, order, prefix, compiled pattern, Specification)
+        self.__buckets = {}
+        self.__count = 0
+
+    def __len__(self):
+        return self.__count
+
+    def add(self, pattern, specification):
+        """
+        Adds a pattern.
+
+        :param pattern: A glob pattern like ``n!/camera_*`` or a regular expression prefixed with ``re:``.
+        :type pattern: str
+        :param specification: The Specification object of the seuids matching the pattern.
+        :type specification: Specification
+        :raises ValueError: If the pattern is not a valid regular expression.
+        """
+        if pattern.startswith(REGEX_PREFIX):
+            expression = pattern[len(REGEX_PREFIX):]
+            prefix = ""
+            specificity = len(expression)
+            # grouped, so the anchor applies to every branch of an alternation
+            source = r"(?:%s)\Z" % expression
+            # only a literal type prefix restricts the seuid type, an alternation or a quantifier may match others
+            typed = expression[2:3] not in ("*", "+", "?", "{") and not has_alternation(expression)
+        else:
+            expression = pattern
+            end = min([i for i in (pattern.find(c) for c in GLOB_CHARS) if i >= 0] or [len(pattern)])
+            prefix = pattern[:end]
+            specificity = len([c for c in pattern if c not in GLOB_CHARS])
+            source = translate(pattern)
+            typed = True
+        try:
+            compiled = re.compile(source)
+        except re.error as e:
+            raise ValueError("[SpecificationIndex] Invalid pattern %s: %s" % (pattern, e))
+        if typed and len(expression) > 1 and expression[0] in SEUID_TYPES and expression[1] == SEUID_DELIMITER:
+            bucket = expression[0]
+        else:
+            bucket = None
+        entries = self.__buckets.setdefault(bucket, [])
+        entries.append((-specificity, self.__count, prefix, compiled, specification))
+        entries.sort()
+        self.__count += 1
+
+    def match(self, identifier):
+        """
+        Returns the Specification object of the most specific pattern matching the given seuid.
+
+        :param identifier: The seuid.
+        :type identifier: str
+        :return: The Specification object, None if no pattern matches.
+        """
+        best = None
+        for bucket in (identifier[:1], None):
+            for entry in self.__buckets.get(bucket, ()):
+                if best is not None and entry[:2] > best[:2]:
+                    break
+                if identifier.startswith(entry[2]) and entry[3].match(identifier):
+                    best = entry
+                    break
+        return best[4] if best is not None else None
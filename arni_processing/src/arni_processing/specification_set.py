@@ -0,0 +1,161 @@
+from collections import namedtuple
+import rospy
+from arni_core.helper import SEUID_DELIMITER
+from specification_index import SpecificationIndex
+
+#: the maximum amount of cached seuid resolutions
+MAX_RESOLUTIONS = 100000
+
+#: what a reload changed, the keys are seuids or patterns
+SpecificationChanges = namedtuple("SpecificationChanges", ["version", "added", "removed", "changed"])
+
+
+class SpecificationSet:
+    """
+    One version of the loaded specifications together with the resolutions, limits and rating plans compiled
+    from them.
+
+    The specifications of a set are never modified once it is built, only its caches fill up. A reload builds a
+    new set next to the active one, takes over the cache entries which are not affected by the changes and then
+    replaces the active set at once, so concurrent ratings always see one complete version.
+    """
+
+    def __init__(self, version=0, specifications=None, patterns=()):
+        """
+        Builds a set and compiles its patterns.
+
+        :param version: The version of the set, increased by every reload.
+        :type version: int
+        :param specifications: seuid -> Specification object.
+        :type specifications: dict
+        :param patterns: (pattern, Specification object) tuples in the order they were loaded.
+        :type patterns: list
+        """
+        self.version = version
+        self.specifications = specifications if specifications is not None else {}
+        #: pattern -> Specification object of the valid patterns
+        self.patterns = {}
+        self.index = SpecificationIndex()
+        #: the valid patterns in the order they were loaded
+        self.__order = []
+        for pattern, spec in patterns:
+            try:
+                self.index.add(pattern, spec)
+            except ValueError as e:
+                rospy.logwarn(str(e))
+                continue
+            self.patterns[pattern] = spec
+            self.__order.append(pattern)
+        #: seuid -> resolved Specification object or None
+        self.resolved = {}
+        #: (specification key, field, offset) -> parsed limits
+        self.limit_cache = {}
+        #: (message class, seuid) and (message class, seuid type, specification key) -> RatingPlan
+        self.plans = {}
+
+    def keys(self):
+        """
+        Returns the keys of all specifications, seuids and patterns.
+
+        :return: set
+        """
+        return set(self.specifications.keys()) | set(self.patterns.keys())
+
+    def __getitem__(self, key):
+        spec = self.specifications.get(key)
+        return spec if spec is not None else self.patterns[key]
+
+    def get(self, identifier):
+        """
+        Returns the Specification object of a seuid, caching the result.
+
+        :param identifier: The seuid.
+        :type identifier: str
+        :return: The Specification object, None if there is none.
+        """
+        try:
+            return self.resolved[identifier]
+        except KeyError:
+            pass
+        spec = self.resolve(identifier)
+        if len(self.resolved) >= MAX_RESOLUTIONS:
+            self.resolved.clear()
+        self.resolved[identifier] = spec
+        return spec
+
+    def resolve(self, identifier):
+        """
+        Looks up the Specification object of a seuid without the cache.
+
+        A specification for the seuid itself is preferred, for connections followed by one for their topic.
+        Otherwise the most specific pattern matching the seuid or, for connections, their topic is used.
+        """
+        topic = None
+        if identifier[0] == "c":
+            parts = identifier.split(SEUID_DELIMITER)
+            if len(parts) == 4:
+                topic = "t" + SEUID_DELIMITER + parts[2]
+        for key in (identifier, topic):
+            if key in self.specifications:
+                return self.specifications[key]
+        if len(self.index):
+            for key in (identifier, topic):
+                if key is not None:
+                    spec = self.index.match(key)
+                    if spec is not None:
+                        return spec
+        return None
+
+    def reuse(self, old):
+        """
+        Replaces the specifications equal to those of an older set by the older objects and returns the changes.
+        Has to be called before the set is used.
+
+        :param old: The previous set.
+        :type old: SpecificationSet
+        :return: SpecificationChanges
+        """
+        old_keys = old.keys()
+        new_keys = self.keys()
+        changed = []
+        for key in old_keys & new_keys:
+            if old[key] == self[key]:
+                if key in self.specifications:
+                    self.specifications[key] = old[key]
+                else:
+                    self.patterns[key] = old[key]
+            else:
+                changed.append(key)
+        if self.patterns:
+            # the index has to hold the reused objects as well
+            self.index = SpecificationIndex()
+            for pattern in self.__order:
+                self.index.add(pattern, self.patterns[pattern])
+        return SpecificationChanges(self.version, sorted(new_keys - old_keys), sorted(old_keys - new_keys),
+                                    sorted(changed))
+
+    def take_over(self, old, changes):
+        """
+        Copies the cache entries of an older set which are not affected by the changes.
+
+        A resolution is kept if the seuid still resolves to the same Specification object, the limits and shared
+        plans of unchanged specifications are kept as well as the plans of seuids whose resolution was kept.
+
+        :param old: The previous set.
+        :type old: SpecificationSet
+        :param changes: The changes returned by reuse.
+        :type changes: SpecificationChanges
+        """
+        stale = set(changes.added) | set(changes.removed) | set(changes.changed)
+        for identifier, spec in old.resolved.items():
+            if self.resolve(identifier) is spec:
+                self.resolved[identifier] = spec
+        for key, plan in old.plans.items():
+            if len(key) == 3:
+                if key[2] not in stale:
+                    self.plans[key] = plan
+            elif key[1] in self.resolved:
+                self.plans[key] = plan
+        for key, limits in old.limit_cache.items():
+            if key[0] not in stale:
+                self.limit_cache[key] = limits
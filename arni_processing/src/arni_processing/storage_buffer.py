@@ -0,0 +1,110 @@
+from bisect import bisect_left, bisect_right
+
+
+class StorageBuffer:
+    """
+    Holds the StorageContainer objects of a single seuid ordered by their timestamp.
+
+    The entries are kept in two parallel lists (timestamps and containers) with a moving start offset,
+    so lookups by time are binary searches and expiring old entries only touches the expired part.
+    """
+
+    def __init__(self, max_entries=1000):
+        """
+        Creates an empty buffer.
+
+        :param max_entries: The maximum amount of containers kept. The oldest ones are dropped first.
+        :type max_entries: int.
+        """
+        self.__stamps = []
+        self.__items = []
+        self.__start = 0
+        self.max_entries = max_entries
+        #: the newest timestamp dropped because the buffer was full, None if none was dropped
+        self.evicted = None
+
+    def __len__(self):
+        return len(self.__stamps) - self.__start
+
+    def add(self, timestamp, item):
+        """
+        Inserts an item at the position given by its timestamp. An item with the very same timestamp is replaced.
+
+        :param timestamp: The timestamp of the item.
+        :type timestamp: rospy.Time.
+        :param item: The object to store.
+        """
+        stamps = self.__stamps
+        if len(stamps) == self.__start or stamps[-1] < timestamp:
+            stamps.append(timestamp)
+            self.__items.append(item)
+        else:
+            index = bisect_left(stamps, timestamp, self.__start)
+            if index < len(stamps) and stamps[index] == timestamp:
+                self.__items[index] = item
+            else:
+                stamps.insert(index, timestamp)
+                self.__items.insert(index, item)
+        if self.max_entries and len(self) > self.max_entries:
+            index = len(stamps) - self.max_entries
+            self.evicted = stamps[index - 1]
+            self.__drop_until(index)
+
+    def since(self, timestamp):
+        """
+        Returns all items with a timestamp newer or equal to the given one, oldest first.
+
+        :param timestamp: The oldest timestamp to include.
+        :type timestamp: rospy.Time.
+        :return: list
+        """
+        index = bisect_left(self.__stamps, timestamp, self.__start)
+        return self.__items[index:]
+
+    def between(self, start, stop):
+        """
+        Returns all items with a timestamp within the closed interval [start, stop], oldest first.
+
+        :param start: The oldest timestamp to include.
+        :type start: rospy.Time.
+        :param stop: The newest timestamp to include.
+        :type stop: rospy.Time.
+        :return: list
+        """
+        first = bisect_left(self.__stamps, start, self.__start)
+        last = bisect_right(self.__stamps, stop, first)
+        return self.__items[first:last]
+
+    def latest(self):
+        """
+        Returns the newest item or None if the buffer is empty.
+        """
+        if not len(self):
+            return None
+        return self.__items[-1]
+
+    def expire(self, timestamp):
+        """
+        Removes all items older than the given timestamp.
+
+        :param timestamp: Items with an older timestamp are removed.
+        :type timestamp: rospy.Time.
+        :return: The amount of removed items.
+        """
+        before = len(self)
+        self.__drop_until(bisect_left(self.__stamps, timestamp, self.__start))
+        return before - len(self)
+
+    def __drop_until(self, index):
+        """
+        Moves the start offset to the given index and compacts the lists once
+        the dropped part makes up more than half of them.
+        """
+        if index <= self.__start:
+            return
+        self.__items[self.__start:index] = [None] * (index - self.__start)
+        self.__start = index
+        if self.__start * 2 >= len(self.__stamps):
+            del self.__stamps[:self.__start]
+            del self.__items[:self.__start]
+            self.__start = 0
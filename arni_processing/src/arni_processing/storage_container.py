@@ -1,22 +1,85 @@
-class StorageContainer:
+from cStringIO import StringIO
+
+
+def _serialize(msg):
+    buff = StringIO()
+    msg.serialize(buff)
+    return buff.getvalue()
+
+
+class StorageContainer(object):
     """
     Contains the data received from the ros topics, the rated data, the time it got rated and the
     seuid identifying the package.
+
+    The raw and the rated data are kept serialized in the message wire format, one packed string each instead of
+    a message object with its fields, lists and strings. The messages are rebuilt on every access of *data_raw*
+    and *data_rated*, consumers using them repeatedly should keep the returned objects.
     """
 
+    __slots__ = ("timestamp", "identifier", "raw_class", "raw_buffer", "rated_class", "rated_buffer")
+
     def __init__(self, timestamp, identifier, data_raw, data_rated):
         """
         Creates a storage container for raw and rated metadata.
-        
+
         :param timestamp: The timestamp of capture of the raw data.
         :type timestamp: rospy.Time.
         :param identifier: The seuid identifying the source of the data.
         :type identifier: str.
-        :param data_raw: The raw data as the source sent it.
+        :param data_raw: The raw data as the source sent it, None for aggregated topics.
         :param data_rated: The rated data.
-        :type data_rated: RatedStatisticsContainer.
+        :type data_rated: RatedStatistics.
         """
         self.timestamp = timestamp
         self.identifier = identifier
-        self.data_raw = data_raw
-        self.data_rated = data_rated
\ No newline at end of file
+        self.raw_class = None
+        self.raw_buffer = None
+        self.rated_class = None
+        self.rated_buffer = None
+        if data_raw is not None:
+            self.raw_class = data_raw.__class__
+            self.raw_buffer = _serialize(data_raw)
+        if data_rated is not None:
+            self.rated_class = data_rated.__class__
+            self.rated_buffer = _serialize(data_rated)
+
+    @classmethod
+    def from_buffers(cls, timestamp, identifier, raw_class, raw_buffer, rated_class, rated_buffer):
+        """
+        Creates a storage container from already serialized messages.
+
+        :param raw_class: The message class of the raw data, None if there is none.
+        :param raw_buffer: The serialized raw data.
+        :type raw_buffer: str.
+        :param rated_class: The message class of the rated data, None if there is none.
+        :param rated_buffer: The serialized rated data.
+        :type rated_buffer: str.
+        :returns: StorageContainer
+        """
+        container = cls(timestamp, identifier, None, None)
+        if raw_class is not None:
+            container.raw_class = raw_class
+            container.raw_buffer = raw_buffer
+        if rated_class is not None:
+            container.rated_class = rated_class
+            container.rated_buffer = rated_buffer
+        return container
+
+    @property
+    def data_raw(self):
+        """
+        The raw data rebuilt from its serialized form, None if there is none.
+        """
+        if self.raw_buffer is None:
+            return None
+        return self.raw_class().deserialize(self.raw_buffer)
+
+    @property
+    def data_rated(self):
+        """
+        The rated data rebuilt from its serialized form, None if there is none.
+        """
+        if self.rated_buffer is None:
+            return None
+        return self.rated_class().deserialize(self.rated_buffer)
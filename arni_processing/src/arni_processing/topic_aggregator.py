@@ -0,0 +1,135 @@
+import math
+import rospy
+from arni_core.helper import SEUID_DELIMITER
+
+
+class _Accumulator(object):
+    """
+    Running sums and maxima over TopicStatistics messages.
+    """
+
+    __slots__ = ("topic", "count", "window_min", "window_max", "frequency", "bandwidth", "dropped_msgs", "traffic",
+                 "stamp_age_mean", "stamp_age_max", "weight", "weighted_mean", "weighted_square")
+
+    def __init__(self, topic):
+        self.topic = topic
+        self.count = 0
+        self.window_min = None
+        self.window_max = None
+        self.frequency = 0.0
+        self.bandwidth = 0.0
+        self.dropped_msgs = 0.0
+        self.traffic = 0.0
+        self.stamp_age_mean = 0.0
+        self.stamp_age_max = 0.0
+        #: the amount of delivered messages the stamp ages were computed from
+        self.weight = 0.0
+        #: sum of weight * mean, the numerator of the pooled mean
+        self.weighted_mean = 0.0
+        #: sum of weight * (stddev^2 + mean^2), the numerator of the pooled second moment
+        self.weighted_square = 0.0
+
+    def add_window(self, window_start, window_stop):
+        if self.window_min is None or window_start < self.window_min:
+            self.window_min = window_start
+        if self.window_max is None or window_stop > self.window_max:
+            self.window_max = window_stop
+
+    def add_moments(self, weight, mean, stddev):
+        self.weight += weight
+        self.weighted_mean += weight * mean
+        self.weighted_square += weight * (stddev * stddev + mean * mean)
+
+    def pooled_stddev(self):
+        """
+        Returns the standard deviation of the stamp age over all messages pooled into this accumulator.
+        """
+        if self.weight <= 0:
+            return 0.0
+        mean = self.weighted_mean / self.weight
+        return math.sqrt(max(self.weighted_square / self.weight - mean * mean, 0.0))
+
+
+class TopicAggregator:
+    """
+    Aggregates TopicStatistics messages of all connections per topic.
+
+    Every message updates the running sums of its connection in constant time. Emitting averages the sums
+    per connection, combines the connections of each topic and starts over with empty sums.
+    """
+
+    def __init__(self):
+        self.__connections = {}
+
+    def __len__(self):
+        return len(self.__connections)
+
+    def add(self, message, connection):
+        """
+        Adds a TopicStatistics message to the sums of its connection.
+
+        :param message: The message to add.
+        :type message: TopicStatistics
+        :param connection: The seuid of the connection the message describes.
+        :type connection: str
+        """
+        acc = self.__connections.get(connection)
+        if acc is None:
+            acc = _Accumulator(message.topic)
+            self.__connections[connection] = acc
+        window_len = (message.window_stop - message.window_start).to_sec()
+        if window_len == 0:
+            window_len = 1.0
+        acc.count += 1
+        acc.add_window(message.window_start, message.window_stop)
+        acc.frequency += message.delivered_msgs / window_len
+        acc.bandwidth += message.traffic / window_len
+        acc.dropped_msgs += message.dropped_msgs
+        acc.traffic += message.traffic
+        stamp_age_mean = message.stamp_age_mean.to_sec()
+        acc.stamp_age_mean += stamp_age_mean
+        acc.stamp_age_max = max(acc.stamp_age_max, message.stamp_age_max.to_sec())
+        acc.add_moments(message.delivered_msgs, stamp_age_mean, message.stamp_age_stddev.to_sec())
+
+    def emit(self):
+        """
+        Returns the aggregated values of all topics and clears the sums.
+
+        :return: A dictionary mapping topic seuids to dictionaries with the keys *window_min*, *window_max*,
+            *dropped_msgs*, *frequency*, *traffic*, *bandwidth*, *stamp_age_mean*, *stamp_age_stddev*
+            and *stamp_age_max*.
+        """
+        by_topic = {}
+        for connection in self.__connections.values():
+            topic = by_topic.get(connection.topic)
+            if topic is None:
+                topic = _Accumulator(connection.topic)
+                by_topic[connection.topic] = topic
+            count = float(connection.count)
+            topic.count += 1
+            topic.add_window(connection.window_min, connection.window_max)
+            # averages per connection are summed up per topic
+            topic.frequency += connection.frequency / count
+            topic.bandwidth += connection.bandwidth / count
+            topic.dropped_msgs += connection.dropped_msgs / count
+            topic.traffic += connection.traffic / count
+            topic.stamp_age_mean += connection.stamp_age_mean / count
+            topic.stamp_age_max = max(topic.stamp_age_max, connection.stamp_age_max)
+            topic.weight += connection.weight
+            topic.weighted_mean += connection.weighted_mean
+            topic.weighted_square += connection.weighted_square
+        self.__connections = {}
+        result = {}
+        for name, topic in by_topic.iteritems():
+            result["t" + SEUID_DELIMITER + name] = {
+                "window_min": topic.window_min,
+                "window_max": topic.window_max,
+                "dropped_msgs": topic.dropped_msgs,
+                "frequency": topic.frequency,
+                "traffic": topic.traffic,
+                "bandwidth": topic.bandwidth,
+                "stamp_age_mean": rospy.Duration.from_sec(topic.stamp_age_mean / topic.count),
+                "stamp_age_stddev": rospy.Duration.from_sec(topic.pooled_stddev()),
+                "stamp_age_max": rospy.Duration.from_sec(topic.stamp_age_max),
+            }
+        return result
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""
+Compares the vectorized rating of HostStatistics array fields with the element by element rating
+for hosts of different sizes, MIN_VECTOR_LENGTH in rating_plan is taken from its results.
+
+Usage: benchmark_array_rating.py [repetitions]
+"""
+
+import random
+import sys
+import timeit
+
+from arni_msgs.msg import HostStatistics
+from arni_processing.rating_plan import RatingPlan
+from arni_processing.specification import Specification
+
+CORE_FIELDS = ("cpu_usage_core_mean", "cpu_usage_core_stddev", "cpu_usage_core_max",
+               "cpu_temp_core_mean", "cpu_temp_core_stddev", "cpu_temp_core_max")
+INTERFACE_FIELDS = ("bandwidth_mean", "bandwidth_stddev", "bandwidth_max",
+                    "message_frequency_mean", "message_frequency_stddev", "message_frequency_max")
+DRIVE_FIELDS = ("drive_free_space", "drive_read", "drive_write")
+
+#: (cores, network interfaces, drives) of the benchmarked hosts
+HOSTS = ((1, 1, 1), (2, 2, 1), (4, 2, 2), (8, 3, 2), (16, 4, 4), (32, 8, 8), (64, 8, 8))
+
+
+class Collector:
+    """
+    Stands in for a RatedStatisticsContainer.
+    """
+
+    def add_value(self, metatype, actual, expected, state):
+        pass
+
+
+def generate_message(cores, interfaces=8, drives=8):
+    msg = HostStatistics()
+    msg.host = "127.0.0.1"
+    # deserialized messages hold their arrays as tuples
+    for field in CORE_FIELDS:
+        setattr(msg, field, tuple(random.uniform(0, 100) for i in range(cores)))
+    for field in INTERFACE_FIELDS:
+        setattr(msg, field, tuple(random.randint(0, 10000) for i in range(interfaces)))
+    for field in DRIVE_FIELDS:
+        setattr(msg, field, tuple(random.randint(0, 10000) for i in range(drives)))
+    return msg
+
+
+def generate_specification(cores):
+    spec = Specification()
+    spec.seuid = "h!127.0.0.1"
+    for field in CORE_FIELDS:
+        spec.add_tuple((field, [[10, 90]] * cores))
+    for field in INTERFACE_FIELDS + DRIVE_FIELDS:
+        spec.add_tuple((field, [100, 9000]))
+    return spec
+
+
+def measure(plan, msg, repetitions):
+    return min(timeit.repeat(lambda: plan.rate(msg, Collector()), number=repetitions, repeat=3)) / repetitions * 1e6
+
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print("cores interfaces drives  elements  element by element  vectorized")
+    for cores, interfaces, drives in HOSTS:
+        msg = generate_message(cores, interfaces, drives)
+        spec = generate_specification(cores)
+        elements = len(CORE_FIELDS) * cores + len(INTERFACE_FIELDS) * interfaces + len(DRIVE_FIELDS) * drives
+        scalar = measure(RatingPlan(HostStatistics, spec.seuid, spec, False), msg, repetitions)
+        vectorized = measure(RatingPlan(HostStatistics, spec.seuid, spec, True, 0), msg, repetitions)
+        print("%5d %10d %6d  %8d  %15.1f us  %7.1f us" % (cores, interfaces, drives, elements, scalar, vectorized))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+"""
+Feeds statistics messages through the rating pipeline of the monitoring node as fast as possible, without a ROS
+master, and reports the throughput, the latency percentiles of every stage and the peak memory as JSON.
+
+The messages are either read from a bag recorded from /statistics, /statistics_host and /statistics_node or
+generated for N hosts with M nodes each, every node publishing K connections. Like the monitoring node every
+message is parsed into a seuid, compared with its specification, stored and serialized for publishing, the
+connections are aggregated into their topics once per aggregation window.
+
+Usage: benchmark_pipeline.py [--bag FILE | --hosts N --nodes M --connections K --rounds R]
+                             [--specifications FILE] [--output FILE]
+"""
+
+import argparse
+import json
+import random
+import resource
+import time
+from cStringIO import StringIO
+
+import rospy
+import rospy.client
+import rospy.names
+import rospy.rostime
+import yaml
+from arni_core.helper import SEUID
+from arni_msgs.msg import HostStatistics, NodeStatistics
+from rosgraph_msgs.msg import TopicStatistics
+from arni_processing.metadata_storage import MetadataStorage
+from arni_processing.specification_handler import SpecificationHandler
+from arni_processing.storage_container import StorageContainer
+from arni_processing.topic_aggregator import TopicAggregator
+
+STAGES = ("parse", "compare", "compare_topic", "store", "publish")
+
+#: the message classes of the statistics topics
+TOPICS = {"/statistics": TopicStatistics, "/statistics_host": HostStatistics, "/statistics_node": NodeStatistics}
+
+
+class OfflineParameters(object):
+    """
+    Stands in for the parameter server, so the pipeline runs without a ROS master.
+    """
+
+    def __init__(self, params):
+        """
+        :param params: The parameter tree as nested dictionaries.
+        :type params: dict
+        """
+        self.params = params
+
+    def __lookup(self, key):
+        value = self.params
+        for part in rospy.names.resolve_name(key).strip("/").split("/"):
+            if not isinstance(value, dict) or part not in value:
+                raise KeyError(key)
+            value = value[part]
+        return value
+
+    def __getitem__(self, key):
+        return self.__lookup(key)
+
+    def __contains__(self, key):
+        try:
+            self.__lookup(key)
+            return True
+        except KeyError:
+            return False
+
+
+def synthetic_messages(hosts, nodes, connections, rounds):
+    """
+    Generates the statistics of N hosts with M nodes each, every node publishing K topics to the next node.
+
+    :return: An iterator over (time in seconds, message) tuples.
+    """
+    for r in range(rounds):
+        stamp = rospy.Time(r + 1)
+        start = rospy.Time(r)
+        for h in range(hosts):
+            host = "10.0.%d.%d" % (h // 256, h % 256)
+            msg = HostStatistics(host=host, window_start=start, window_stop=stamp)
+            msg.cpu_usage_mean = random.uniform(0, 100)
+            msg.ram_usage_mean = random.uniform(0, 100)
+            msg.cpu_usage_core_mean = [random.uniform(0, 100) for i in range(4)]
+            yield r, msg
+            for n in range(nodes):
+                node = "/host_%d/node_%d" % (h, n)
+                msg = NodeStatistics(host=host, node=node, window_start=start, window_stop=stamp)
+                msg.node_cpu_usage_mean = random.uniform(0, 100)
+                msg.node_ramusage_mean = random.uniform(0, 1e9)
+                yield r, msg
+                for c in range(connections):
+                    msg = TopicStatistics(topic="%s/topic_%d" % (node, c), node_pub=node,
+                                          node_sub="/host_%d/node_%d" % (h, (n + 1) % nodes),
+                                          window_start=start, window_stop=stamp)
+                    msg.delivered_msgs = random.randint(0, 100)
+                    msg.traffic = msg.delivered_msgs * 100
+                    msg.period_mean = rospy.Duration(0, 10000000)
+                    msg.stamp_age_mean = rospy.Duration(0, random.randint(0, 10000000))
+                    yield r, msg
+
+
+def bag_messages(path):
+    """
+    Reads the statistics messages of a bag.
+
+    :return: An iterator over (time in seconds, message) tuples.
+    """
+    import rosbag
+    with rosbag.Bag(path) as bag:
+        # raw messages are deserialized into the generated classes, the seuids rely on them
+        for topic, raw, stamp in bag.read_messages(topics=TOPICS.keys(), raw=True):
+            yield stamp.to_sec(), TOPICS[topic]().deserialize(raw[1])
+
+
+def synthetic_specifications(hosts, nodes):
+    specifications = {"c!*": {"frequency": [50, 150], "stamp_age_mean": [0, 0.005]},
+                      "t!*": {"frequency": [50, 150], "dropped_msgs": [0, 5]}}
+    for h in range(hosts):
+        specifications["h!10.0.%d.%d" % (h // 256, h % 256)] = {"cpu_usage_mean": [0, 80], "ram_usage_mean": [0, 90],
+                                                                 "cpu_usage_core_mean": [[0, 80]] * 4}
+        for n in range(nodes):
+            specifications["n!/host_%d/node_%d" % (h, n)] = {"node_cpu_usage_mean": [0, 50]}
+    return specifications
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def serialize(msg):
+    buff = StringIO()
+    msg.serialize(buff)
+    return buff.getvalue()
+
+
+def run(messages, aggregation_window=3):
+    """
+    Rates the messages like the monitoring node does.
+
+    :param messages: An iterator over (time in seconds, message) tuples.
+    :param aggregation_window: The time after which the connections are aggregated into their topics in seconds.
+    :return: A tuple of the amount of messages, the seconds spent processing them, the latencies by stage and the
+        storage. Reading or generating the messages is not included.
+    """
+    handler = SpecificationHandler()
+    storage = MetadataStorage()
+    aggregate = TopicAggregator()
+    aggregate_start = None
+    latencies = dict((stage, []) for stage in STAGES)
+    count = 0
+    seconds = 0.0
+
+    def rate(result, identifier, data, started):
+        if result is None:
+            # the seuid is invalid, the monitoring node fails on it as well
+            return
+        rated_msg = result.to_msg_type()
+        container = StorageContainer(rospy.Time.now(), identifier, data, rated_msg)
+        rated = time.time()
+        latencies["compare_topic" if data is None else "compare"].append(rated - started)
+        storage.store(container, data)
+        stored = time.time()
+        latencies["store"].append(stored - rated)
+        serialize(rated_msg)
+        serialize(result.to_numeric_msg_type())
+        latencies["publish"].append(time.time() - stored)
+
+    for stamp, data in messages:
+        count += 1
+        begin = started = time.time()
+        seuid = SEUID.parse(data)
+        identifier = str(seuid)
+        latencies["parse"].append(time.time() - started)
+        if identifier[0] == "c":
+            if aggregate_start is None:
+                aggregate_start = stamp
+            if stamp - aggregate_start >= aggregation_window:
+                for topic, values in aggregate.emit().iteritems():
+                    started = time.time()
+                    rate(handler.rate_topic(topic, values), topic, None, started)
+                aggregate_start = stamp
+            aggregate.add(data, identifier)
+        started = time.time()
+        rate(handler.compare(data, identifier), identifier, data, started)
+        seconds += time.time() - begin
+    return count, seconds, latencies, storage
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the rating pipeline of the monitoring node.")
+    parser.add_argument("--bag", help="a bag with statistics messages, otherwise they are generated")
+    parser.add_argument("--hosts", type=int, default=10, help="generated hosts (default: %(default)s)")
+    parser.add_argument("--nodes", type=int, default=10, help="generated nodes per host (default: %(default)s)")
+    parser.add_argument("--connections", type=int, default=5,
+                        help="generated connections per node (default: %(default)s)")
+    parser.add_argument("--rounds", type=int, default=20, help="generated statistics per seuid (default: %(default)s)")
+    parser.add_argument("--specifications", help="a yaml file with specifications, otherwise they are generated")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the generated values (default: %(default)s)")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    if args.specifications:
+        with open(args.specifications) as f:
+            specifications = yaml.safe_load(f)
+    elif args.bag:
+        specifications = {}
+    else:
+        specifications = synthetic_specifications(args.hosts, args.nodes)
+    # the pipeline reads its parameters through rospy, which talks to the master unless it has a parameter server
+    rospy.client._param_server = OfflineParameters({
+        "arni": {"specifications": [specifications]},
+        rospy.names.get_caller_id().strip("/"): {"storage": {"auto_cleanup": False}}})
+    rospy.rostime.set_rostime_initialized(True)
+    random.seed(args.seed)
+
+    if args.bag:
+        messages = bag_messages(args.bag)
+        source = args.bag
+    else:
+        messages = synthetic_messages(args.hosts, args.nodes, args.connections, args.rounds)
+        source = "synthetic %d hosts x %d nodes x %d connections, %d rounds" % (
+            args.hosts, args.nodes, args.connections, args.rounds)
+    try:
+        count, seconds, latencies, storage = run(messages)
+        seuids, statistics = storage.size()
+    finally:
+        rospy.signal_shutdown("benchmark finished")
+
+    stages = {}
+    for stage in STAGES:
+        ordered = sorted(latencies[stage])
+        if not ordered:
+            continue
+        stages[stage] = {
+            "count": len(ordered),
+            "mean_us": sum(ordered) / len(ordered) * 1e6,
+            "p50_us": percentile(ordered, 0.5) * 1e6,
+            "p90_us": percentile(ordered, 0.9) * 1e6,
+            "p99_us": percentile(ordered, 0.99) * 1e6,
+            "max_us": ordered[-1] * 1e6,
+        }
+    report = {
+        "source": source,
+        "messages": count,
+        "seconds": seconds,
+        "messages_per_second": count / seconds if seconds > 0 else 0.0,
+        "stages": stages,
+        "stored_seuids": seuids,
+        "stored_statistics": statistics,
+        # kilobytes on Linux
+        "peak_memory_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+
+import unittest
+import rospy
+from arni_processing.alive_checker import AliveChecker
+from arni_core.seuid_registry import get_registry
+
+PKG = "arni_processing"
+
+
+class TestAliveChecker(unittest.TestCase):
+
+    def setUp(self):
+        self.checker = AliveChecker(lambda seuid: rospy.Duration(10), rospy.Duration(5))
+
+    def test_report_and_expire(self):
+        self.checker.report("n!a", rospy.Time(0))
+        self.assertEqual(self.checker.check(rospy.Time(9)), [])
+        self.assertTrue(self.checker.is_alive("n!a", rospy.Time(9)))
+        self.assertEqual(self.checker.check(rospy.Time(10)), [("n!a", rospy.Time(0))])
+        self.assertFalse(self.checker.is_alive("n!a", rospy.Time(10)))
+
+    def test_report_resets_deadline(self):
+        self.checker.report("n!a", rospy.Time(0))
+        self.checker.report("n!a", rospy.Time(8))
+        self.assertEqual(self.checker.check(rospy.Time(12)), [])
+        self.assertEqual(self.checker.check(rospy.Time(18)), [("n!a", rospy.Time(8))])
+
+    def test_expired_until_reported(self):
+        self.checker.report("n!a", rospy.Time(0))
+        self.assertEqual(len(self.checker.check(rospy.Time(10))), 1)
+        self.assertEqual(len(self.checker.check(rospy.Time(11))), 1)
+        self.checker.report("n!a", rospy.Time(12))
+        self.assertEqual(self.checker.check(rospy.Time(13)), [])
+        self.assertEqual(len(self.checker.check(rospy.Time(22))), 1)
+
+    def test_discard(self):
+        self.checker.report("n!a", rospy.Time(0))
+        self.checker.report("n!b", rospy.Time(0))
+        self.checker.discard("n!a")
+        self.assertEqual(self.checker.seuids(), ["n!b"])
+        self.assertEqual(self.checker.check(rospy.Time(10)), [("n!b", rospy.Time(0))])
+
+    def test_ids_released(self):
+        self.checker.report("n!/released_a", rospy.Time(0))
+        self.checker.report("n!/released_b", rospy.Time(0))
+        self.checker.discard("n!/released_a")
+        self.assertIsNone(get_registry().find("n!/released_a"))
+        self.checker.check(rospy.Time(16))
+        self.assertIsNone(get_registry().find("n!/released_b"))
+
+    def test_forget_unspecified(self):
+        self.checker.report("n!a", rospy.Time(0))
+        self.checker.set_timeout("n!b", rospy.Duration(10), True, rospy.Time(0))
+        self.assertEqual(len(self.checker.check(rospy.Time(10))), 2)
+        self.assertEqual(self.checker.check(rospy.Time(16)), [("n!b", rospy.Time(0))])
+        self.assertEqual(len(self.checker), 1)
+        self.assertTrue(self.checker.is_alive("n!a", rospy.Time(16)))
+
+    def test_set_timeout(self):
+        self.checker.report("n!a", rospy.Time(0))
+        self.checker.set_timeout("n!a", rospy.Duration(20), True, rospy.Time(0))
+        self.assertEqual(self.checker.check(rospy.Time(15)), [])
+        self.assertEqual(self.checker.check(rospy.Time(20)), [("n!a", rospy.Time(0))])
+
+    def test_hold(self):
+        self.checker.report("n!a", rospy.Time(0))
+        self.checker.hold("n!a", rospy.Time(5))
+        self.checker.hold("n!b", rospy.Time(5))
+        self.assertEqual(self.checker.check(rospy.Time(100)), [])
+        self.assertTrue(self.checker.is_alive("n!a", rospy.Time(100)))
+        self.checker.release("n!a", rospy.Time(100))
+        self.checker.release("n!b", rospy.Time(100))
+        self.assertEqual(self.checker.check(rospy.Time(109)), [])
+        self.assertEqual(sorted(self.checker.check(rospy.Time(110))),
+                         [("n!a", rospy.Time(100)), ("n!b", rospy.Time(100))])
+
+    def test_hold_expired(self):
+        self.checker.report("n!a", rospy.Time(0))
+        self.assertEqual(len(self.checker.check(rospy.Time(10))), 1)
+        self.checker.hold("n!a", rospy.Time(11))
+        self.assertEqual(self.checker.check(rospy.Time(11)), [])
+
+    def test_timeout_without_lock(self):
+        # the timeout may use the checker, it is not called while the lock is held
+        checker = AliveChecker(lambda seuid: rospy.Duration(10 if checker.is_alive(seuid, rospy.Time(0)) else 0))
+        checker.report("n!a", rospy.Time(0))
+        checker.hold("n!b", rospy.Time(0))
+        self.assertEqual(checker.check(rospy.Time(9)), [])
+
+
+if __name__ == '__main__':
+    import rosunit
+
+    rosunit.unitrun(PKG, 'test_alive_checker', TestAliveChecker)
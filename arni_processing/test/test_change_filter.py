@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+
+import unittest
+from arni_processing.change_filter import ChangeFilter
+from arni_processing.rated_statistics import RatedStatisticsContainer
+
+import rospy
+
+PKG = "arni_processing"
+
+
+def rating(cpu_usage, state, cores=(1, 2)):
+    r = RatedStatisticsContainer("h!127.0.0.1")
+    r.add_value("window_start", rospy.Time(0), None, None)
+    r.add_value("cpu_usage_mean", cpu_usage, [0, 50], state)
+    r.add_value("cpu_usage_core_mean", list(cores), [[0, 50]] * len(cores), [3] * len(cores))
+    return r
+
+
+class TestChangeFilter(unittest.TestCase):
+
+    def setUp(self):
+        self.filter = ChangeFilter(0.1, rospy.Duration(10))
+
+    def test_unchanged(self):
+        self.assertTrue(self.filter.should_publish(rating(20, 3), rospy.Time(0)))
+        self.assertFalse(self.filter.should_publish(rating(21, 3), rospy.Time(1)))
+        self.assertEqual(self.filter.suppressed, 1)
+
+    def test_state_change(self):
+        self.filter.should_publish(rating(20, 3), rospy.Time(0))
+        self.assertTrue(self.filter.should_publish(rating(20, 0), rospy.Time(1)))
+
+    def test_value_change(self):
+        self.filter.should_publish(rating(20, 3), rospy.Time(0))
+        self.assertTrue(self.filter.should_publish(rating(25, 3), rospy.Time(1)))
+        self.assertTrue(self.filter.should_publish(rating(25, 3, (1, 2, 3)), rospy.Time(2)))
+
+    def test_heartbeat(self):
+        self.filter.should_publish(rating(20, 3), rospy.Time(0))
+        self.assertFalse(self.filter.should_publish(rating(20, 3), rospy.Time(9)))
+        self.assertTrue(self.filter.should_publish(rating(20, 3), rospy.Time(10)))
+        self.assertFalse(self.filter.should_publish(rating(20, 3), rospy.Time(11)))
+
+    def test_expire(self):
+        self.filter.should_publish(rating(20, 3), rospy.Time(0))
+        other = rating(20, 3)
+        other.seuid = "h!other"
+        self.filter.should_publish(other, rospy.Time(20))
+        self.assertEqual(self.filter.expire(rospy.Time(29)), 0)
+        self.assertEqual(self.filter.expire(rospy.Time(30)), 1)
+        self.assertEqual(len(self.filter), 1)
+        self.assertTrue(self.filter.should_publish(rating(20, 3), rospy.Time(31)))
+
+    def test_clear(self):
+        self.filter.should_publish(rating(20, 3), rospy.Time(0))
+        self.filter.clear()
+        self.assertTrue(self.filter.should_publish(rating(20, 3), rospy.Time(1)))
+
+
+if __name__ == '__main__':
+    import rosunit
+
+    rosunit.unitrun(PKG, 'test_change_filter', TestChangeFilter)
@@ -28,6 +28,28 @@ test_spec = [
     }
 ]
 test_spec2 = {}
+pattern_spec = [
+    {
+        'n!/camera_*': {
+            'node_cpu_usage_mean': [0.1, 0.2]
+        }
+    },
+    {
+        'n!/camera_front*': {
+            'node_cpu_usage_mean': [0.3, 0.4]
+        }
+    },
+    {
+        're:c!.*!/tf!.*': {
+            'frequency': [10, 20]
+        }
+    },
+    {
+        'n!/camera_left': {
+            'node_cpu_usage_mean': [0.5, 0.6]
+        }
+    }
+]
 
 
 class TestLoadingSpecifications(unittest.TestCase):
@@ -96,6 +118,69 @@ class TestLoadingSpecifications(unittest.TestCase):
         for k in test_spec[0][test_spec[0].keys()[0]].keys():
             self.assertEqual(test_spec[0][test_spec[0].keys()[0]][k], sp.get(k)[1])
 
+    def test_patterns(self):
+        """
+        Checks if specifications are resolved through glob and regex patterns, preferring exact and specific ones.
+        """
+        rospy.set_param(self.__namespace, pattern_spec)
+        sh = SpecificationHandler()
+        self.assertEqual(sh.loaded_specifications(), ['n!/camera_left'])
+        self.assertEqual(sh.get('n!/camera_left').seuid, 'n!/camera_left')
+        self.assertEqual(sh.get('n!/camera_front_1').seuid, 'n!/camera_front*')
+        self.assertEqual(sh.get('n!/camera_rear').seuid, 'n!/camera_*')
+        self.assertEqual(sh.get('c!/a!/tf!/b').seuid, 're:c!.*!/tf!.*')
+        self.assertEqual(sh.get('n!/lidar'), None)
+        self.assertEqual(sh.get('c!/a!/tf_static!/b'), None)
+
+    def test_regex_alternation(self):
+        """
+        Checks if every branch of a regex pattern has to match the whole seuid, whatever its type.
+        """
+        rospy.set_param(self.__namespace, [{'re:n!/a|h!b': {'cpu_temp_mean': [30, 60]}},
+                                           {'re:n!/c(x|y)': {'node_cpu_usage_mean': [0.1, 0.2]}}])
+        sh = SpecificationHandler()
+        self.assertEqual(sh.get('n!/a').seuid, 're:n!/a|h!b')
+        self.assertEqual(sh.get('h!b').seuid, 're:n!/a|h!b')
+        self.assertEqual(sh.get('n!/abc'), None)
+        self.assertEqual(sh.get('h!bc'), None)
+        self.assertEqual(sh.get('n!/cy').seuid, 're:n!/c(x|y)')
+        self.assertEqual(sh.get('n!/cz'), None)
+
+    def test_patterns_reload(self):
+        """
+        Checks if resolved patterns are forgotten when reloading the specifications.
+        """
+        rospy.set_param(self.__namespace, pattern_spec[0:1])
+        sh = SpecificationHandler()
+        self.assertEqual(sh.get('n!/camera_front_1').seuid, 'n!/camera_*')
+        rospy.set_param(self.__namespace, pattern_spec[0:2])
+        sh.reload_specifications()
+        self.assertEqual(sh.get('n!/camera_front_1').seuid, 'n!/camera_front*')
+
+    def test_reload_changes(self):
+        """
+        Checks if a reload reports the changed specifications and keeps the unchanged ones.
+        """
+        rospy.set_param(self.__namespace, test_spec[0:2] + pattern_spec[0:1])
+        sh = SpecificationHandler()
+        version = sh.version
+        host = sh.get('h!127.0.0.1')
+        camera = sh.get('n!/camera_rear')
+        changed = {'n!test_node': {'node_cpu_usage_mean': [0.01, 0.09]}}
+        rospy.set_param(self.__namespace, [changed] + pattern_spec[0:2])
+        changes = sh.reload_specifications()
+        self.assertEqual(changes.version, version + 1)
+        self.assertEqual(changes.added, ['n!/camera_front*'])
+        self.assertEqual(changes.removed, ['h!127.0.0.1'])
+        self.assertEqual(changes.changed, ['n!test_node'])
+        self.assertIs(sh.get('n!/camera_rear'), camera)
+        self.assertEqual(sh.get('n!/camera_front_1').seuid, 'n!/camera_front*')
+        self.assertEqual(sh.get('n!test_node').get('node_cpu_usage_mean')[1], [0.01, 0.09])
+        self.assertIsNone(sh.get('h!127.0.0.1'))
+        self.assertIsNotNone(host)
+        changes = sh.reload_specifications()
+        self.assertEqual((changes.added, changes.removed, changes.changed), ([], [], []))
+
 
 if __name__ == '__main__':
     import rosunit
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+
+import shutil
+import tempfile
+import unittest
+from arni_processing.metadata_storage import MetadataStorage
+from arni_processing.storage_container import StorageContainer
+from arni_msgs.msg import HostStatistics, RatedStatistics
+
+import rospy
+
+PKG = "arni_processing"
+
+
+class TestMetadataStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        rospy.set_param("~storage/max_entries", 5)
+        rospy.set_param("~storage/rollup/tiers", [])
+        rospy.set_param("~storage/auto_cleanup", False)
+        rospy.set_param("~storage/disk/enabled", True)
+        rospy.set_param("~storage/disk/path", self.directory)
+        self.storage = MetadataStorage()
+        self.now = rospy.Time.now()
+
+    def tearDown(self):
+        self.storage.segments.close()
+        shutil.rmtree(self.directory)
+
+    @classmethod
+    def tearDownClass(cls):
+        # stops the cleanup threads
+        rospy.signal_shutdown("test finished")
+
+    def add(self, secs_ago, identifier="h!127.0.0.1", storage=None):
+        raw = HostStatistics()
+        raw.host = identifier[2:]
+        rated = RatedStatistics()
+        rated.seuid = identifier
+        storage = storage if storage is not None else self.storage
+        storage.store(StorageContainer(self.now - rospy.Duration(secs_ago), identifier, raw, rated))
+
+    def test_evicted_within_duration(self):
+        # all of them are within the storage duration, the full buffer only keeps the newest five in memory
+        for i in range(20, 0, -1):
+            self.add(i)
+        self.add(1, "h!other")
+        self.assertEqual(self.storage.size(), (2, 6))
+        result = self.storage.get("h!127.0.0.1", self.now - rospy.Duration(100))
+        self.assertEqual(sorted(c.timestamp for c in result),
+                         [self.now - rospy.Duration(i) for i in range(20, 0, -1)])
+        self.assertEqual(len(self.storage.get("*", self.now - rospy.Duration(100))), 21)
+
+    def test_page_evicted_within_duration(self):
+        for i in range(20, 0, -1):
+            self.add(i)
+        seen = []
+        page, cursor = self.storage.get_page("h!*", self.now - rospy.Duration(100), None, 8)
+        seen.extend(page)
+        while cursor:
+            page, cursor = self.storage.get_page("h!*", self.now - rospy.Duration(100), None, 8, cursor)
+            seen.extend(page)
+        self.assertEqual([c.timestamp for c in seen], [self.now - rospy.Duration(i) for i in range(1, 21)])
+
+    def test_restart(self):
+        for i in range(20, 0, -1):
+            self.add(i)
+        self.storage.segments.close()
+        # the statistics of the previous run are only on disk, all of them within the storage duration
+        self.storage = MetadataStorage()
+        self.assertEqual(len(self.storage.get("*", self.now - rospy.Duration(100))), 20)
+        self.add(0.5)
+        result = self.storage.get("*", self.now - rospy.Duration(100))
+        self.assertEqual(sorted(c.timestamp for c in result),
+                         [self.now - rospy.Duration(i) for i in range(20, 0, -1)] + [self.now - rospy.Duration(0.5)])
+        page, cursor = self.storage.get_page("*", self.now - rospy.Duration(100), None, 100)
+        self.assertEqual(len(page), 21)
+
+    def test_default_tiers(self):
+        rospy.delete_param("~storage/rollup/tiers")
+        rospy.set_param("~storage/disk/enabled", False)
+        storage = MetadataStorage()
+        self.assertEqual([tier.resolution for tier in storage.tiers], [10, 60])
+
+    def test_rollups_counted(self):
+        rospy.set_param("~storage/rollup/tiers", [[10, 1000]])
+        rospy.set_param("~storage/disk/enabled", False)
+        rospy.set_param("~storage/max_entries", 1000)
+        storage = MetadataStorage()
+        # ten statistics per second, more than fit into a span of three seconds
+        for i in range(30):
+            self.add(i / 10.0, storage=storage)
+        resolution, rollups = storage.get_rollups("*", self.now - rospy.Duration(3), None, 10)
+        self.assertEqual(resolution, 10)
+        # one statistic every ten seconds, fewer than the span in seconds
+        for i in range(5):
+            self.add(10 * i, "n!/node", storage)
+        resolution, rollups = storage.get_rollups("n!*", self.now - rospy.Duration(50), None, 10)
+        self.assertEqual(resolution, 0)
+        self.assertEqual(len(rollups), 5)
+
+
+if __name__ == '__main__':
+    import rostest
+
+    rospy.init_node("test_metadata_storage", anonymous=True)
+    rostest.rosrun(PKG, 'test_metadata_storage', TestMetadataStorage)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+
+import threading
+import unittest
+from arni_processing.monitoring_metrics import LatencyHistogram, MonitoringMetrics, STAGES
+
+import rospy
+
+PKG = "arni_processing"
+
+
+class TestMonitoringMetrics(unittest.TestCase):
+
+    def test_empty_histogram(self):
+        histogram = LatencyHistogram((0.001, 0.01))
+        self.assertEqual(histogram.percentile(0.5), 0.0)
+
+    def test_percentiles(self):
+        histogram = LatencyHistogram((0.001, 0.01, 0.1))
+        for i in range(90):
+            histogram.record(0.0005)
+        for i in range(9):
+            histogram.record(0.005)
+        histogram.record(0.5)
+        self.assertEqual(histogram.counts, [90, 9, 0, 1])
+        self.assertEqual(histogram.percentile(0.5), 0.001)
+        self.assertEqual(histogram.percentile(0.95), 0.01)
+        # above the last bound the maximum is the best estimate
+        self.assertEqual(histogram.percentile(1.0), 0.5)
+        msg = histogram.to_msg("compare")
+        self.assertEqual(msg.count, 100)
+        self.assertEqual(msg.max, 0.5)
+        self.assertEqual(msg.p90, 0.001)
+
+    def test_snapshot(self):
+        metrics = MonitoringMetrics("/monitoring_node")
+        start = rospy.Time.now()
+        metrics.received = 20
+        metrics.rated = 10
+        metrics.record("store", 0.002)
+        msg = metrics.snapshot({"rating_queue_depth": 3}, start + rospy.Duration(10), reset=False)
+        self.assertAlmostEqual(msg.received_per_second, 2.0)
+        self.assertAlmostEqual(msg.rated_per_second, 1.0)
+        self.assertEqual(msg.rating_queue_depth, 3)
+        self.assertEqual([h.stage for h in msg.latencies], list(STAGES))
+        metrics.snapshot(now=start + rospy.Duration(10))
+        metrics.received = 30
+        msg = metrics.snapshot(now=start + rospy.Duration(20))
+        self.assertAlmostEqual(msg.received_per_second, 1.0)
+        self.assertAlmostEqual(msg.rated_per_second, 0.0)
+
+    def test_counters(self):
+        metrics = MonitoringMetrics("/monitoring_node")
+
+        def count():
+            for i in range(1000):
+                metrics.count_received()
+                metrics.count_rated()
+        threads = [threading.Thread(target=count) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual((metrics.received, metrics.rated), (4000, 4000))
+
+
+if __name__ == '__main__':
+    import rosunit
+
+    rosunit.unitrun(PKG, 'test_monitoring_metrics', TestMonitoringMetrics)
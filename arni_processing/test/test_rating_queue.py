@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+
+import unittest
+from arni_processing.rating_queue import RatingQueue
+
+PKG = "arni_processing"
+
+
+class TestRatingQueue(unittest.TestCase):
+
+    def test_fifo(self):
+        q = RatingQueue(10)
+        q.put("n!a", 1)
+        q.put("n!b", 2)
+        self.assertEqual(q.get(0), ("n!a", 1))
+        self.assertEqual(q.get(0), ("n!b", 2))
+        self.assertEqual(q.get(0), None)
+
+    def test_latest_per_seuid_not_full(self):
+        q = RatingQueue(10)
+        q.put("n!a", 1)
+        q.put("n!b", 2)
+        q.put("n!a", 3)
+        self.assertEqual(len(q), 3)
+        self.assertEqual(q.get(0), ("n!a", 1))
+        self.assertEqual(q.get(0), ("n!b", 2))
+        self.assertEqual(q.get(0), ("n!a", 3))
+        self.assertEqual(q.statistics()["coalesced"], 0)
+
+    def test_latest_per_seuid(self):
+        q = RatingQueue(3)
+        q.put("n!a", 1)
+        q.put("n!a", 2)
+        q.put("n!b", 3)
+        q.put("n!a", 4)
+        self.assertEqual(len(q), 3)
+        self.assertEqual(q.get(0), ("n!a", 1))
+        self.assertEqual(q.get(0), ("n!a", 4))
+        self.assertEqual(q.statistics()["coalesced"], 1)
+        self.assertEqual(q.dropped, 0)
+
+    def test_latest_per_seuid_full(self):
+        q = RatingQueue(2)
+        q.put("n!a", 1)
+        q.put("n!b", 2)
+        q.put("n!c", 3)
+        self.assertEqual(q.dropped, 1)
+        self.assertEqual(q.get(0), ("n!b", 2))
+        self.assertEqual(q.get(0), ("n!c", 3))
+        # the dropped entry is no longer replaced
+        q.put("n!a", 4)
+        self.assertEqual(q.get(0), ("n!a", 4))
+
+    def test_drop_oldest(self):
+        q = RatingQueue(2, "drop_oldest")
+        for i in range(4):
+            self.assertTrue(q.put("n!a", i))
+        self.assertEqual(q.get(0), ("n!a", 2))
+        self.assertEqual(q.statistics()["dropped"], 2)
+
+    def test_drop_newest(self):
+        q = RatingQueue(2, "drop_newest")
+        self.assertTrue(q.put("n!a", 0))
+        self.assertTrue(q.put("n!a", 1))
+        self.assertFalse(q.put("n!a", 2))
+        self.assertEqual(q.get(0), ("n!a", 0))
+        self.assertEqual(q.statistics()["max_depth"], 2)
+
+    def test_invalid_policy(self):
+        self.assertRaises(ValueError, RatingQueue, 10, "invalid")
+
+
+if __name__ == '__main__':
+    import rosunit
+
+    rosunit.unitrun(PKG, 'test_rating_queue', TestRatingQueue)
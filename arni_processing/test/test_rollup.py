@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+
+import unittest
+from arni_processing.rollup import Rollup, RollupTier, array_names
+from arni_msgs.msg import HostStatistics
+
+import rospy
+
+PKG = "arni_processing"
+
+
+def host_statistics(cpu_usage, cores):
+    msg = HostStatistics()
+    msg.host = "127.0.0.1"
+    msg.cpu_usage_mean = cpu_usage
+    msg.cpu_usage_core_mean = cores
+    return msg
+
+
+class TestRollup(unittest.TestCase):
+
+    def test_rollup(self):
+        r = Rollup(rospy.Time(0), rospy.Time(10))
+        r.add(host_statistics(10, [1, 2]))
+        r.add(host_statistics(30, [3]))
+        self.assertEqual(r.count, 2)
+        self.assertEqual(r.fields["cpu_usage_mean"][:2], [10, 30])
+        self.assertEqual(r.mean("cpu_usage_mean"), 20)
+        self.assertEqual(r.mean("cpu_usage_core_mean_0"), 2)
+        self.assertEqual(r.fields["cpu_usage_core_mean_1"][3], 1)
+        self.assertFalse("host" in r.fields)
+        self.assertFalse("window_start" in r.fields)
+
+    def test_array_names(self):
+        names = array_names("cpu_usage_core_mean", 2)
+        self.assertEqual(names, ("cpu_usage_core_mean_0", "cpu_usage_core_mean_1"))
+        self.assertIs(array_names("cpu_usage_core_mean", 2), names)
+
+    def test_tier(self):
+        tier = RollupTier(10, 100)
+        for i in range(25):
+            tier.add(rospy.Time(i), "h!127.0.0.1", host_statistics(i, []))
+        tier.add(rospy.Time(3), "h!127.0.0.1", host_statistics(100, []))
+        tier.add(rospy.Time(3), "n!/node", host_statistics(0, []))
+        rollups = tier.get("h!*")
+        self.assertEqual([r.window_start.secs for s, r in rollups], [0, 10, 20])
+        self.assertEqual([r.count for s, r in rollups], [11, 10, 5])
+        self.assertEqual(rollups[0][1].fields["cpu_usage_mean"][1], 100)
+        self.assertEqual(len(tier.get("*", rospy.Time(15), rospy.Time(19))), 1)
+
+    def test_expire(self):
+        tier = RollupTier(10, 100)
+        for i in range(0, 200, 10):
+            tier.add(rospy.Time(i), "h!127.0.0.1", host_statistics(i, []))
+        self.assertTrue(tier.covers(rospy.Time(100), rospy.Time(200)))
+        self.assertFalse(tier.covers(rospy.Time(99), rospy.Time(200)))
+        tier.expire(rospy.Time(200))
+        self.assertEqual(tier.get()[0][1].window_start.secs, 90)
+
+
+if __name__ == '__main__':
+    import rosunit
+
+    rosunit.unitrun(PKG, 'test_rollup', TestRollup)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+
+import os
+import shutil
+import tempfile
+import unittest
+from arni_processing.segment_store import SegmentStore
+from arni_processing.storage_container import StorageContainer
+from arni_msgs.msg import HostStatistics, RatedStatistics
+
+import rospy
+
+PKG = "arni_processing"
+
+
+class TestSegmentStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = SegmentStore(self.directory, segment_duration=10, max_age=100, max_size=0)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def add(self, secs, identifier="h!127.0.0.1"):
+        raw = HostStatistics()
+        raw.host = identifier[2:]
+        rated = RatedStatistics()
+        rated.seuid = identifier
+        self.store.append(StorageContainer(rospy.Time(secs), identifier, raw, rated))
+
+    def test_read(self):
+        for i in range(30):
+            self.add(i)
+        self.assertEqual(len(os.listdir(self.directory)), 3)
+        result = self.store.read("*", rospy.Time(5), rospy.Time(14))
+        self.assertItemsEqual([c.timestamp.secs for c in result], range(5, 15))
+        self.assertEqual(result[0].data_raw.host, "127.0.0.1")
+        self.assertEqual(result[0].data_rated.seuid, "h!127.0.0.1")
+
+    def test_read_pattern_and_limit(self):
+        for i in range(30):
+            self.add(i, "h!a")
+            self.add(i, "n!b")
+        self.assertEqual(len(self.store.read("n!*")), 30)
+        # whole segments are read newest first
+        self.assertItemsEqual([c.timestamp.secs for c in self.store.read("n!*", limit=5)], range(20, 30))
+
+    def test_skip(self):
+        for i in range(5):
+            self.add(i)
+        result = self.store.read(skip=lambda timestamp, identifier: timestamp.secs % 2)
+        self.assertItemsEqual([c.timestamp.secs for c in result], [0, 2, 4])
+
+    def test_truncated_record(self):
+        self.add(1)
+        self.add(2)
+        self.store.close()
+        path = os.path.join(self.directory, "0.seg")
+        with open(path, "r+b") as f:
+            f.truncate(os.path.getsize(path) - 1)
+        self.assertEqual(len(self.store.read()), 1)
+        self.add(3)
+        self.assertItemsEqual([c.timestamp.secs for c in self.store.read()], [1, 3])
+
+    def test_expire(self):
+        for i in range(0, 200, 10):
+            self.add(i)
+        self.assertEqual(self.store.expire(rospy.Time(200)), 9)
+        self.assertEqual(min(c.timestamp.secs for c in self.store.read()), 90)
+
+
+if __name__ == '__main__':
+    import rosunit
+
+    rosunit.unitrun(PKG, 'test_segment_store', TestSegmentStore)
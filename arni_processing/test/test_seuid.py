@@ -2,7 +2,9 @@
 
 import unittest
 from arni_core.helper import *
+import arni_core.helper
 from arni_msgs.msg import HostStatistics
+from rosgraph_msgs.msg import TopicStatistics
 
 import rospy
 
@@ -84,6 +86,65 @@ class TestSeuid(unittest.TestCase):
         s = SEUID(hs)
         self.assertRaises(KeyError, s.get_seuid, "node")
 
+    def test_slots(self):
+        s = SEUID("n!test_node")
+        self.assertRaises(AttributeError, setattr, s, "foo", "bar")
+
+    def test_parse_shared(self):
+        s = SEUID.parse("t!/shared_topic")
+        self.assertIs(s, SEUID.parse("t!/shared_topic"))
+        self.assertEqual(s.topic, "/shared_topic")
+        self.assertEqual(s.node, None)
+
+    def test_parse_invalid(self):
+        self.assertRaises(NameError, SEUID.parse, "n!0Node")
+        self.assertRaises(NameError, SEUID.parse, "n!0Node")
+        self.assertRaises(TypeError, SEUID.parse, ("hello", "world"))
+
+    def test_parse_serialized(self):
+        s = SEUID.parse("n!/serialized_node")
+        self.assertIs(s, SEUID.parse(s.serialize()))
+        self.assertFalse(is_seuid(s.serialize()))
+        self.assertFalse(SEUID().is_valid(s.serialize()))
+
+    def test_parse_message(self):
+        msg = TopicStatistics(topic="/myTopic", node_sub="/mySubscriber", node_pub="/myPublisher")
+        s = SEUID.parse(msg)
+        self.assertEqual(str(s), "c!/mySubscriber!/myTopic!/myPublisher")
+        self.assertIs(s, SEUID.parse("c!/mySubscriber!/myTopic!/myPublisher"))
+        self.assertEqual(s.publisher, "/myPublisher")
+        # instances created by the constructor are not shared
+        t = SEUID(msg)
+        self.assertIsNot(s, t)
+        self.assertEqual(t.topic, "/myTopic")
+        self.assertRaises(NameError, SEUID.parse, TopicStatistics(topic="/myTopic", node_sub="0sub", node_pub="/p"))
+
+    def test_parse_bounded(self):
+        limit = arni_core.helper.MAX_PARSED_SEUIDS
+        arni_core.helper.MAX_PARSED_SEUIDS = 10
+        try:
+            for i in range(25):
+                SEUID.parse("n!/bounded_%d" % i)
+                self.assertLessEqual(len(arni_core.helper._parsed), 10)
+            # a full cache only drops some of its seuids
+            self.assertGreaterEqual(len(arni_core.helper._parsed), 8)
+            self.assertIn("n!/bounded_24", arni_core.helper._parsed)
+        finally:
+            arni_core.helper.MAX_PARSED_SEUIDS = limit
+
+    def test_from_message_variants(self):
+        msg = TopicStatistics(topic="/myTopic", node_sub="/mySubscriber", node_pub="/myPublisher")
+        s = SEUID()
+        self.assertEqual(s.from_message(msg, topic=True), "t!/myTopic")
+        self.assertEqual(s.from_message(msg, sub=True), "c!/mySubscriber!/myTopic!/myPublisher--sub")
+        self.assertEqual(s.from_message(hs, topic=True), "h!127.0.0.1")
+
+    def test_is_seuid(self):
+        self.assertTrue(is_seuid("h!localhost"))
+        SEUID.parse("h!localhost")
+        self.assertTrue(is_seuid("h!localhost"))
+        self.assertFalse(is_seuid("x!localhost"))
+
 
 if __name__ == '__main__':
     import rosunit
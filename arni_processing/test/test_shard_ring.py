@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+
+import unittest
+from cStringIO import StringIO
+from arni_processing.shard_ring import ShardRing, shard_key, peek_shard_key
+from arni_msgs.msg import HostStatistics, NodeStatistics
+from rosgraph_msgs.msg import TopicStatistics
+
+PKG = "arni_processing"
+
+KEYS = ["t!/topic_%d" % i for i in range(1000)]
+
+
+def serialize(msg):
+    buff = StringIO()
+    msg.serialize(buff)
+    return buff.getvalue()
+
+
+class TestShardRing(unittest.TestCase):
+
+    def setUp(self):
+        self.ring = ShardRing()
+        self.ring.set_members(["/shard_a", "/shard_b", "/shard_c"])
+
+    def test_empty(self):
+        self.assertIsNone(ShardRing().owner("t!/topic"))
+
+    def test_set_members(self):
+        self.assertFalse(self.ring.set_members(["/shard_c", "/shard_b", "/shard_a"]))
+        self.assertEqual(self.ring.members, ["/shard_a", "/shard_b", "/shard_c"])
+
+    def test_balanced(self):
+        owners = [self.ring.owner(key) for key in KEYS]
+        for member in self.ring.members:
+            self.assertGreater(owners.count(member), 200)
+
+    def test_rebalance(self):
+        before = dict((key, self.ring.owner(key)) for key in KEYS)
+        self.assertTrue(self.ring.set_members(["/shard_a", "/shard_b", "/shard_c", "/shard_d"]))
+        after = dict((key, self.ring.owner(key)) for key in KEYS)
+        moved = [key for key in KEYS if before[key] != after[key]]
+        # only keys taken over by the new member move
+        self.assertTrue(all(after[key] == "/shard_d" for key in moved))
+        self.assertLess(len(moved), 500)
+        self.ring.set_members(["/shard_a", "/shard_b", "/shard_c"])
+        self.assertEqual(before, dict((key, self.ring.owner(key)) for key in KEYS))
+
+    def test_shard_key(self):
+        self.assertEqual(shard_key("c!/sub!/topic!/pub"), "t!/topic")
+        self.assertEqual(shard_key("t!/topic"), "t!/topic")
+        self.assertEqual(shard_key("n!/node"), "n!/node")
+
+    def test_peek_shard_key(self):
+        self.assertEqual(peek_shard_key(HostStatistics, serialize(HostStatistics(host="10.0.0.1"))), "h!10.0.0.1")
+        node = NodeStatistics(host="10.0.0.1", node="/talker")
+        self.assertEqual(peek_shard_key(NodeStatistics, serialize(node)), "n!/talker")
+        topic = TopicStatistics(topic="/chatter", node_pub="/talker", node_sub="/listener")
+        self.assertEqual(peek_shard_key(TopicStatistics, serialize(topic)), "t!/chatter")
+
+
+if __name__ == '__main__':
+    import rosunit
+
+    rosunit.unitrun(PKG, 'test_shard_ring', TestShardRing)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+
+import unittest
+from arni_processing.storage_buffer import StorageBuffer
+
+import rospy
+
+PKG = "arni_processing"
+
+
+class TestStorageBuffer(unittest.TestCase):
+
+    def test_since(self):
+        b = StorageBuffer()
+        for i in range(10):
+            b.add(rospy.Time(i), i)
+        self.assertEqual(b.since(rospy.Time(7)), [7, 8, 9])
+        self.assertEqual(b.since(rospy.Time(0)), range(10))
+        self.assertEqual(b.since(rospy.Time(20)), [])
+
+    def test_between(self):
+        b = StorageBuffer()
+        for i in range(10):
+            b.add(rospy.Time(i), i)
+        self.assertEqual(b.between(rospy.Time(3), rospy.Time(5)), [3, 4, 5])
+
+    def test_out_of_order(self):
+        b = StorageBuffer()
+        b.add(rospy.Time(5), 5)
+        b.add(rospy.Time(1), 1)
+        b.add(rospy.Time(3), 3)
+        b.add(rospy.Time(3), "replaced")
+        self.assertEqual(b.since(rospy.Time(0)), [1, "replaced", 5])
+        self.assertEqual(b.latest(), 5)
+
+    def test_expire(self):
+        b = StorageBuffer()
+        for i in range(10):
+            b.add(rospy.Time(i), i)
+        self.assertEqual(b.expire(rospy.Time(4)), 4)
+        self.assertEqual(len(b), 6)
+        self.assertEqual(b.since(rospy.Time(0)), [4, 5, 6, 7, 8, 9])
+        self.assertEqual(b.expire(rospy.Time(4)), 0)
+        self.assertEqual(b.expire(rospy.Time(100)), 6)
+        self.assertEqual(b.latest(), None)
+
+    def test_max_entries(self):
+        b = StorageBuffer(3)
+        for i in range(10):
+            b.add(rospy.Time(i), i)
+        self.assertEqual(len(b), 3)
+        self.assertEqual(b.since(rospy.Time(0)), [7, 8, 9])
+        self.assertEqual(b.evicted, rospy.Time(6))
+        b.expire(rospy.Time(8))
+        self.assertEqual(b.evicted, rospy.Time(6))
+
+
+if __name__ == '__main__':
+    import rosunit
+
+    rosunit.unitrun(PKG, 'test_storage_buffer', TestStorageBuffer)
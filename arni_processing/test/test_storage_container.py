@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+
+import unittest
+from arni_processing.storage_container import StorageContainer
+from arni_msgs.msg import HostStatistics, RatedStatistics, RatedStatisticsEntity
+
+import rospy
+
+PKG = "arni_processing"
+
+
+def rated_statistics(seuid):
+    rated = RatedStatistics()
+    rated.seuid = seuid
+    rated.rated_statistics_entity.append(RatedStatisticsEntity("cpu_usage_mean", ["12.5"], ["0 - 50"], [3]))
+    return rated
+
+
+class TestStorageContainer(unittest.TestCase):
+
+    def test_rebuild(self):
+        raw = HostStatistics()
+        raw.host = "127.0.0.1"
+        raw.cpu_usage_core_mean = [1.5, 2.5]
+        container = StorageContainer(rospy.Time(5), "h!127.0.0.1", raw, rated_statistics("h!127.0.0.1"))
+        self.assertEqual(container.data_raw.host, "127.0.0.1")
+        self.assertEqual(container.data_raw.cpu_usage_core_mean, (1.5, 2.5))
+        entity = container.data_rated.rated_statistics_entity[0]
+        self.assertEqual(entity.statistic_type, "cpu_usage_mean")
+        self.assertEqual(entity.actual_value, ["12.5"])
+        self.assertEqual(ord(entity.state[0]), 3)
+
+    def test_no_raw_data(self):
+        container = StorageContainer(rospy.Time(5), "t!/topic", None, rated_statistics("t!/topic"))
+        self.assertIsNone(container.data_raw)
+        self.assertEqual(container.data_rated.seuid, "t!/topic")
+
+    def test_from_buffers(self):
+        original = StorageContainer(rospy.Time(5), "t!/topic", None, rated_statistics("t!/topic"))
+        container = StorageContainer.from_buffers(original.timestamp, original.identifier, None, None,
+                                                  RatedStatistics, original.rated_buffer)
+        self.assertIsNone(container.data_raw)
+        self.assertEqual(container.data_rated.seuid, "t!/topic")
+
+
+if __name__ == '__main__':
+    import rosunit
+
+    rosunit.unitrun(PKG, 'test_storage_container', TestStorageContainer)